@@ -1,17 +1,27 @@
 import os
 import glob
+import time
+import hashlib
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-#azure components import
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import AzureSearch
+#run from complianceQAPipeline/: python -m backend.scripts.index_documents
+from backend.src.services.clients import registry, EMBEDDING_MODEL_NAME
+from backend.src.services.retriever import (
+    create_vector_store,
+    load_index_manifest,
+    save_index_manifest,
+    VECTOR_STORE_BACKEND
+)
+from backend.src.services.cache import file_sha256
 
-#setup logging 
+#setup logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
@@ -19,111 +29,258 @@ logging.basicConfig(
 
 logger = logging.getLogger("indexer")
 
-def index_docs():
+EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "64"))
+UPLOAD_BATCH_SIZE = int(os.getenv("INDEX_UPLOAD_BATCH_SIZE", "500"))
+UPLOAD_MAX_RETRIES = int(os.getenv("INDEX_UPLOAD_MAX_RETRIES", "3"))
+PARSE_WORKERS = int(os.getenv("INDEX_PARSE_WORKERS", str(os.cpu_count() or 2)))
+
+
+def chunk_id(file_hash, index):
+    '''
+    Deterministic chunk key: same file content => same ids
+    '''
+    return hashlib.sha256(f"{file_hash}:{index}".encode()).hexdigest()[:32]
+
+
+def load_and_split(pdf_path):
+    '''
+    Loads and chunks one PDF. Runs in a worker process, so it returns plain
+    (text, metadata) tuples rather than Document objects.
+    '''
+    loader = PyPDFLoader(pdf_path)
+    raw_docs = loader.load()
+
+    #chunking strategy
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+    splits = text_splitter.split_documents(raw_docs)
+    return [
+        (split.page_content, {**split.metadata, "source": os.path.basename(pdf_path)})
+        for split in splits
+    ]
+
+
+def upload_with_retries(vector_store, texts, vectors, metadatas, ids):
     '''
-    Reads the PDFs , chunks them, and upload them to Azure AI Search
+    Uploads pre-computed embeddings in UPLOAD_BATCH_SIZE batches, retrying
+    each batch with exponential backoff
     '''
-    
+    for start in range(0, len(texts), UPLOAD_BATCH_SIZE):
+        end = start + UPLOAD_BATCH_SIZE
+        for attempt in range(1, UPLOAD_MAX_RETRIES + 1):
+            try:
+                vector_store.add_embeddings(
+                    zip(texts[start:end], vectors[start:end]),
+                    metadatas=metadatas[start:end],
+                    keys=ids[start:end]
+                )
+                break
+            except Exception as e:
+                if attempt == UPLOAD_MAX_RETRIES:
+                    raise
+                wait = 2 ** attempt
+                logger.warning(f"Upload batch {start}-{end} failed ({e}), retry {attempt} in {wait}s")
+                time.sleep(wait)
+
+
+def index_docs(full_rebuild=False):
+    '''
+    Incrementally indexes the PDFs in backend/data.
+
+    A manifest records each file's hash and chunk ids. Only new or changed
+    PDFs are parsed (in a process pool), embedded (in batches) and uploaded
+    (in batches, with retries). Chunks of removed PDFs are deleted; the old
+    chunks of a changed PDF only once its new ones are uploaded.
+    '''
+
     #define paths, we look for data folder
     current_dir = os.path.dirname(os.path.abspath(__file__))
     data_folder = os.path.join(current_dir, "../../backend/data")
-    
+
     #check the env variable
     logger.info("="*60)
     logger.info("Environment Configuration Check:")
     logger.info(f"HUGGINGFACEHUB_API_TOKEN: {os.getenv('HUGGINGFACEHUB_API_TOKEN')}")
     logger.info(f"AZURE_SEARCH_ENDPOINT : {os.getenv('AZURE_SEARCH_ENDPOINT')}")
     logger.info(f"AZURE_SEARCH_INDEX_NAME : {os.getenv('AZURE_SEARCH_INDEX_NAME')}")
+    logger.info(f"VECTOR_STORE_BACKEND : {VECTOR_STORE_BACKEND}")
     logger.info("="*60)
-    
+
     #validate required env variable
-    required_vars=[
-        "HUGGINGFACEHUB_API_TOKEN",
-        "AZURE_SEARCH_ENDPOINT",
-        "AZURE_SEARCH_API_KEY",
-        "AZURE_SEARCH_INDEX_NAME"
-    ]
-    
+    required_vars=["HUGGINGFACEHUB_API_TOKEN"]
+    if VECTOR_STORE_BACKEND == "azure":
+        required_vars += [
+            "AZURE_SEARCH_ENDPOINT",
+            "AZURE_SEARCH_API_KEY",
+            "AZURE_SEARCH_INDEX_NAME"
+        ]
+
     missing_vars =[ var for var in required_vars if not os.getenv(var) ]
-    
+
     if missing_vars:
         logger.error(f"Missing required environment variable : {missing_vars}")
         logger.error("Please check your .env file and ensure all the variable are set")
         return
-    
+
+    timings = {}
+
     #initialize the embedding model: turns text into vectors
     try:
-        logger.info("Initializing sentence-transformers/all-MiniLM-L6-v2 embedding model......")
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        stage_start = time.perf_counter()
+        logger.info(f"Initializing {EMBEDDING_MODEL_NAME} embedding model......")
+        #shared batched + cached embedding service: unchanged chunks are never re-embedded
+        embeddings = registry.get_embeddings()
         logger.info("Embedding model initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize embeddings: {e}")
         logger.error("Please verify your Huggingface hub api key or model name and permission!")
         return
-    
-    #initialize the Azure AI Search
+
+    #initialize the vector store (Azure AI Search or the local index)
     try:
-        logger.info("Initializing Azure AI Search vector store...")
-        index_name = os.getenv("AZURE_SEARCH_INDEX_NAME")
-        vector_store = AzureSearch(
-            azure_search_endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-            azure_search_key=os.getenv("AZURE_SEARCH_API_KEY"),
-            index_name=index_name,
-            embedding_function=embeddings.embed_query
-        )
+        logger.info(f"Initializing {VECTOR_STORE_BACKEND} vector store...")
+        index_name = os.getenv("AZURE_SEARCH_INDEX_NAME") if VECTOR_STORE_BACKEND == "azure" else "local"
+        vector_store = create_vector_store(embeddings)
         logger.info(f"✓ Vector store initialized for index: {index_name}")
     except Exception as e:
-        logger.error(f"Failed to initialize Azure Search: {e}")
+        logger.error(f"Failed to initialize the vector store: {e}")
         logger.error("Please verify your Azure Search endpoint, API key, and index name.")
         return
-    
-    #find PDF files
+    timings["init"] = time.perf_counter() - stage_start
+
+    #find PDF files and work out what changed since the last run
+    stage_start = time.perf_counter()
     pdf_files = glob.glob(os.path.join(data_folder, "*.pdf"))
     if not pdf_files:
         logger.warning(f"No PDFs found in {data_folder}. Please add files.")
-    logger.info(f"Found {len(pdf_files)} PDFs to process : {[os.path.basename(f) for f in pdf_files]}")
-    
-    all_splits= []
-    
-    #process each pdf
-    for pdf_path in pdf_files:
+    logger.info(f"Found {len(pdf_files)} PDFs : {[os.path.basename(f) for f in pdf_files]}")
+
+    manifest = load_index_manifest()
+    #an index built for another backend does not exist in this one
+    if manifest.get("backend") not in (None, VECTOR_STORE_BACKEND):
+        manifest = {"version": None, "files": {}}
+    indexed_files = manifest.get("files", {})
+
+    current_hashes = {os.path.basename(path): file_sha256(path) for path in pdf_files}
+    changed = [
+        path for path in pdf_files
+        if full_rebuild
+        or indexed_files.get(os.path.basename(path), {}).get("sha256") != current_hashes[os.path.basename(path)]
+    ]
+    removed = [name for name in indexed_files if name not in current_hashes]
+    timings["scan"] = time.perf_counter() - stage_start
+
+    logger.info(f"{len(changed)} new/changed PDFs, {len(removed)} removed, "
+                f"{len(pdf_files) - len(changed)} unchanged")
+
+    #delete the chunks of removed PDFs, and the leftovers of a previous run
+    #that could not delete a changed PDF's old chunks. Changed PDFs keep
+    #theirs until the new ones are uploaded, so a failed parse or upload
+    #never leaves their rules out of the index.
+    stage_start = time.perf_counter()
+    stale_ids = manifest.get("orphan_chunk_ids", []) + [
+        chunk for name in removed
+        for chunk in indexed_files.get(name, {}).get("chunk_ids", [])
+    ]
+    if stale_ids:
+        logger.info(f"Deleting {len(stale_ids)} stale chunks")
+        try:
+            vector_store.delete(ids=stale_ids)
+        except Exception as e:
+            logger.error(f"Failed to delete stale chunks: {e}")
+            return
+    for name in removed:
+        indexed_files.pop(name, None)
+    manifest["orphan_chunk_ids"] = []
+    timings["delete"] = time.perf_counter() - stage_start
+
+    #parse the changed PDFs in parallel
+    stage_start = time.perf_counter()
+    parsed = {}
+    if changed:
+        with ProcessPoolExecutor(max_workers=min(PARSE_WORKERS, len(changed))) as pool:
+            futures = {pool.submit(load_and_split, path): path for path in changed}
+            for future, pdf_path in futures.items():
+                try:
+                    parsed[pdf_path] = future.result()
+                    logger.info(f"Loaded {os.path.basename(pdf_path)}: {len(parsed[pdf_path])} chunks.")
+                except Exception as e:
+                    logger.error(f"Failed to process {pdf_path}: {e}")
+    timings["parse"] = time.perf_counter() - stage_start
+
+    #embed in batches, then upload in batches; the manifest is saved per file
+    timings["embed"] = 0.0
+    timings["upload"] = 0.0
+    for pdf_path, chunks in parsed.items():
+        name = os.path.basename(pdf_path)
+        texts = [text for text, _ in chunks]
+        metadatas = [metadata for _, metadata in chunks]
+        ids = [chunk_id(current_hashes[name], i) for i in range(len(chunks))]
+
         try:
-            logger.info(f"Loading: {os.path.basename(pdf_path)}.......")
-            loader = PyPDFLoader(pdf_path)
-            raw_docs = loader.load()
-            
-            #chunking strategy
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200 
-            )
-            splits = text_splitter.split_documents(raw_docs)
-            for split in splits:
-                split.metadata["source"]= os.path.basename(pdf_path)
-                
-            all_splits.extend(splits)
-            logger.info(f"Split into {len(splits)} chunks.")
-        
+            stage_start = time.perf_counter()
+            vectors = []
+            for start in range(0, len(texts), EMBED_BATCH_SIZE):
+                vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+            timings["embed"] += time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            logger.info(f"Uploading {len(texts)} chunks of {name} to index '{index_name}'")
+            upload_with_retries(vector_store, texts, vectors, metadatas, ids)
+            timings["upload"] += time.perf_counter() - stage_start
         except Exception as e:
-            logger.error(f"Failed to process {pdf_path}: {e}")
-        
-        #Upload to Azure
-        if all_splits:
-            logger.info(f"Uploading {len(all_splits)} chunks to Azure AI Search Index '{index_name}")
+            logger.error(f"Failed to upload {name}: {e}")
+            logger.error("Please check the vector store configuration and try again")
+            continue
+
+        #new ids are keyed on the file hash; ids shared with the old version
+        #(a --full rebuild of an unchanged file) were just overwritten
+        new_ids = set(ids)
+        old_ids = [chunk for chunk in indexed_files.get(name, {}).get("chunk_ids", []) if chunk not in new_ids]
+        if old_ids:
+            stage_start = time.perf_counter()
             try:
-                vector_store.add_documents(documents=all_splits)
-                logger.info("="*60)
-                logger.info("Indexing Complete! Knowledge Base is ready....")
-                logger.info("="*60)
-                
+                vector_store.delete(ids=old_ids)
             except Exception as e:
-                logger.error(f"Failed to upload the documents to Azure Search: {e}")
-                logger.error("Please check the Azure Search configuration and try again")
-        else:
-            logger.warning("No documents were processed.")
-            
+                logger.error(f"Failed to delete {len(old_ids)} old chunks of {name}, retried next run: {e}")
+                manifest["orphan_chunk_ids"] = manifest.get("orphan_chunk_ids", []) + old_ids
+            timings["delete"] += time.perf_counter() - stage_start
+
+        indexed_files[name] = {
+            "sha256": current_hashes[name],
+            "chunk_ids": ids,
+            "indexed_at": time.time()
+        }
+        manifest["files"] = indexed_files
+        save_index_manifest(manifest)
+
+    #the index version changes whenever the set of indexed files changes
+    manifest["files"] = indexed_files
+    manifest["backend"] = VECTOR_STORE_BACKEND
+    manifest["version"] = hashlib.sha256(
+        "|".join(f"{name}:{entry['sha256']}" for name, entry in sorted(indexed_files.items())).encode()
+    ).hexdigest()[:16]
+    save_index_manifest(manifest)
+    #retrieval caches key on the version: other processes pick the new one up
+    #from the manifest, this one is cleared right away
+    registry.invalidate_retrieval_cache()
+
+    logger.info("="*60)
+    if parsed or stale_ids:
+        logger.info(f"Indexing Complete! Knowledge Base version {manifest['version']} is ready....")
+    else:
+        logger.info("Knowledge Base is already up to date.")
+    for stage, seconds in timings.items():
+        logger.info(f"  {stage:<7}: {seconds:.2f}s")
+    logger.info(f"Embedding stats: {registry.embedding_stats()}")
+    logger.info("="*60)
+    return timings
+
 
 if __name__=="__main__":
-    index_docs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index the rulebook PDFs into the vector store")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-index every PDF")
+    args = parser.parse_args()
+    index_docs(full_rebuild=args.full)
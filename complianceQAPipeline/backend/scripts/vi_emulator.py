@@ -0,0 +1,320 @@
+'''
+Offline stand-in for Azure Video Indexer.
+
+Implements the endpoints VideoIndexerService calls, with the same paths and
+response shapes, so the whole pipeline (and load tests) can run without an
+Azure account:
+
+  POST   /arm/subscriptions/.../generateAccessToken    account token (JWT)
+  POST   /{location}/Accounts/{account}/Videos         upload (file or videoUrl)
+  GET    /{location}/Accounts/{account}/Videos/{id}/Index
+  DELETE /{location}/Accounts/{account}/Videos/{id}
+
+A video reports "Processing" with a growing processingProgress for
+--processing-seconds after upload, then "Processed" with insights
+(transcript, OCR, duration) generated from a seed derived from its id. If a
+callbackUrl was given, it is called when processing finishes.
+
+Usage (from complianceQAPipeline/):
+    python -m backend.scripts.vi_emulator --port 8090 --processing-seconds 10
+    VI_EMULATOR_URL=http://localhost:8090 uvicorn backend.src.api.server:app
+'''
+
+import os
+import json
+import time
+import uuid
+import base64
+import random
+import hashlib
+import logging
+import argparse
+import threading
+
+import requests
+import uvicorn
+from fastapi import FastAPI, Request, Response, Query, HTTPException
+from fastapi.responses import JSONResponse
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("vi-emulator")
+
+#defaults, overridable from the command line
+EMULATOR_CONFIG = {
+    "processing_seconds": float(os.getenv("VI_EMULATOR_PROCESSING_SECONDS", "10")),
+    "jitter": float(os.getenv("VI_EMULATOR_JITTER", "0.2")),
+    "transcript_lines": int(os.getenv("VI_EMULATOR_TRANSCRIPT_LINES", "40")),
+    "ocr_lines": int(os.getenv("VI_EMULATOR_OCR_LINES", "10")),
+    "failure_rate": float(os.getenv("VI_EMULATOR_FAILURE_RATE", "0")),
+    "throttle_rate": float(os.getenv("VI_EMULATOR_THROTTLE_RATE", "0")),
+}
+TOKEN_TTL_SECONDS = 3600
+
+#mix of neutral ad copy and lines the auditor should flag
+TRANSCRIPT_LINES = [
+    "Hey everyone, welcome back to the channel.",
+    "Today I am showing you my new morning routine.",
+    "This serum is the only thing that worked for my skin.",
+    "It is guaranteed to clear your acne in just seven days.",
+    "Doctors hate this one simple trick.",
+    "Use my code SAVE20 for twenty percent off, link in bio.",
+    "I have been using it every day for a month now.",
+    "It cured my eczema completely, no more creams.",
+    "Make sure to like and subscribe for more videos.",
+    "The texture is light and it absorbs really quickly.",
+    "Results may vary, but I honestly love it.",
+    "This is the best product on the market, period.",
+    "You will lose ten pounds in the first week.",
+    "Thanks to the brand for sending this over.",
+    "Let me know in the comments what you think.",
+]
+OCR_LINES = [
+    "SAVE20",
+    "LINK IN BIO",
+    "LIMITED OFFER",
+    "100% GUARANTEED",
+    "#ad",
+    "Clinically proven*",
+    "FREE SHIPPING",
+    "Before / After",
+    "Shop now",
+]
+
+app = FastAPI(title="Video Indexer Emulator")
+
+_videos = {}
+_lock = threading.Lock()
+
+
+def _vi_time(seconds):
+    #VI formats offsets as H:MM:SS.ff
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours)}:{int(minutes):02d}:{secs:05.2f}"
+
+
+def _jwt(claims):
+    #unsigned token with a readable "exp", like the real account token
+    def encode(part):
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.emulator"
+
+
+def build_insights(video_id, name, transcript_lines, ocr_lines):
+    '''
+    Index JSON shaped like a processed Video Indexer result
+    '''
+    rng = random.Random(hashlib.sha256(video_id.encode()).hexdigest())
+    transcript, cursor = [], 0.0
+    for index in range(transcript_lines):
+        length = rng.uniform(2.0, 6.0)
+        transcript.append({
+            "id": index + 1,
+            "text": rng.choice(TRANSCRIPT_LINES),
+            "confidence": round(rng.uniform(0.8, 0.99), 4),
+            "speakerId": 1,
+            "language": "en-US",
+            "instances": [{
+                "adjustedStart": _vi_time(cursor),
+                "adjustedEnd": _vi_time(cursor + length),
+                "start": _vi_time(cursor),
+                "end": _vi_time(cursor + length),
+            }],
+        })
+        cursor += length
+    duration = cursor
+
+    ocr = []
+    for index in range(ocr_lines):
+        start = rng.uniform(0, max(duration - 3, 0))
+        ocr.append({
+            "id": index + 1,
+            "text": rng.choice(OCR_LINES),
+            "confidence": round(rng.uniform(0.7, 0.99), 4),
+            "language": "en-US",
+            "instances": [{
+                "adjustedStart": _vi_time(start),
+                "adjustedEnd": _vi_time(start + 3),
+                "start": _vi_time(start),
+                "end": _vi_time(start + 3),
+            }],
+        })
+
+    return {
+        "transcript": transcript,
+        "ocr": ocr,
+        "duration": _vi_time(duration),
+        "duration_seconds": round(duration, 2),
+    }
+
+
+def _index_json(video, now):
+    elapsed = now - video["created"]
+    processed = elapsed >= video["processing_seconds"]
+    state = video["final_state"] if processed else "Processing"
+    progress = 100 if processed else int(100 * elapsed / video["processing_seconds"])
+    insights = video["insights"] if state == "Processed" else {}
+
+    return {
+        "accountId": video["account"],
+        "id": video["id"],
+        "name": video["name"],
+        "state": state,
+        "durationInSeconds": insights.get("duration_seconds", 0),
+        "summarizedInsights": {
+            "name": video["name"],
+            "id": video["id"],
+            "duration": {
+                "time": insights.get("duration", "0:00:00"),
+                "seconds": insights.get("duration_seconds", 0),
+            },
+        },
+        "videos": [{
+            "accountId": video["account"],
+            "id": video["id"],
+            "state": state,
+            "processingProgress": f"{progress}%",
+            "failureMessage": "Emulated indexing failure" if state == "Failed" else "",
+            "insights": {
+                "version": "1.0.0.0",
+                "duration": insights.get("duration", "0:00:00"),
+                "sourceLanguage": "en-US",
+                "language": "en-US",
+                "transcript": insights.get("transcript", []),
+                "ocr": insights.get("ocr", []),
+            } if insights else {},
+        }],
+    }
+
+
+def _notify(video):
+    #fires the callbackUrl once processing is over, like VI does
+    delay = max(video["created"] + video["processing_seconds"] - time.time(), 0)
+    time.sleep(delay)
+    try:
+        requests.post(video["callback_url"], params={"id": video["id"], "state": video["final_state"]}, timeout=10)
+    except requests.RequestException as e:
+        logger.warning(f"Callback for {video['id']} failed: {e}")
+
+
+def _check_token(access_token):
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Missing accessToken")
+
+
+def _maybe_throttle():
+    if random.random() < EMULATOR_CONFIG["throttle_rate"]:
+        return JSONResponse(status_code=429, content={"ErrorType": "TOO_MANY_REQUESTS"}, headers={"Retry-After": "1"})
+    return None
+
+
+@app.post("/arm/subscriptions/{subscription}/resourceGroups/{group}/providers/Microsoft.VideoIndexer/accounts/{account}/generateAccessToken")
+def generate_access_token(subscription: str, group: str, account: str, request: Request):
+    if not request.headers.get("Authorization", "").startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing ARM bearer token")
+    claims = {"AccountId": account, "Permission": "Contributor", "exp": int(time.time()) + TOKEN_TTL_SECONDS}
+    return {"accessToken": _jwt(claims)}
+
+
+@app.post("/{location}/Accounts/{account}/Videos")
+async def upload_video(
+    location: str,
+    account: str,
+    request: Request,
+    name: str = Query("video"),
+    accessToken: str = Query(None),
+    videoUrl: str = Query(None),
+    callbackUrl: str = Query(None),
+):
+    _check_token(accessToken)
+    throttled = _maybe_throttle()
+    if throttled:
+        return throttled
+
+    #discard the uploaded bytes as they arrive
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    if not size and not videoUrl:
+        raise HTTPException(status_code=400, detail="Either a file or videoUrl is required")
+
+    video_id = uuid.uuid4().hex[:10]
+    jitter = EMULATOR_CONFIG["jitter"]
+    video = {
+        "id": video_id,
+        "name": name,
+        "account": account,
+        "created": time.time(),
+        "processing_seconds": max(EMULATOR_CONFIG["processing_seconds"] * random.uniform(1 - jitter, 1 + jitter), 0),
+        "final_state": "Failed" if random.random() < EMULATOR_CONFIG["failure_rate"] else "Processed",
+        "callback_url": callbackUrl,
+        "insights": build_insights(video_id, name, EMULATOR_CONFIG["transcript_lines"], EMULATOR_CONFIG["ocr_lines"]),
+    }
+    with _lock:
+        _videos[video_id] = video
+    if callbackUrl:
+        threading.Thread(target=_notify, args=(video,), daemon=True).start()
+
+    logger.info(f"Uploaded {name} as {video_id} ({size} bytes{', url ' + videoUrl if videoUrl else ''})")
+    return {"accountId": account, "id": video_id, "name": name, "state": "Uploaded"}
+
+
+@app.get("/{location}/Accounts/{account}/Videos/{video_id}/Index")
+def get_index(location: str, account: str, video_id: str, accessToken: str = Query(None)):
+    _check_token(accessToken)
+    throttled = _maybe_throttle()
+    if throttled:
+        return throttled
+    with _lock:
+        video = _videos.get(video_id)
+    if video is None:
+        raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
+    return _index_json(video, time.time())
+
+
+@app.delete("/{location}/Accounts/{account}/Videos/{video_id}")
+def delete_video(location: str, account: str, video_id: str, accessToken: str = Query(None)):
+    _check_token(accessToken)
+    with _lock:
+        _videos.pop(video_id, None)
+    return Response(status_code=204)
+
+
+@app.get("/health")
+def health():
+    with _lock:
+        return {"status": "ok", "videos": len(_videos), "config": EMULATOR_CONFIG}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--processing-seconds", type=float, default=EMULATOR_CONFIG["processing_seconds"],
+                        help="time from upload to Processed")
+    parser.add_argument("--jitter", type=float, default=EMULATOR_CONFIG["jitter"],
+                        help="relative random spread of the processing time")
+    parser.add_argument("--transcript-lines", type=int, default=EMULATOR_CONFIG["transcript_lines"])
+    parser.add_argument("--ocr-lines", type=int, default=EMULATOR_CONFIG["ocr_lines"])
+    parser.add_argument("--failure-rate", type=float, default=EMULATOR_CONFIG["failure_rate"],
+                        help="fraction of videos that end in state Failed")
+    parser.add_argument("--throttle-rate", type=float, default=EMULATOR_CONFIG["throttle_rate"],
+                        help="fraction of upload / index calls answered with 429")
+    args = parser.parse_args()
+
+    EMULATOR_CONFIG.update(
+        processing_seconds=args.processing_seconds,
+        jitter=args.jitter,
+        transcript_lines=args.transcript_lines,
+        ocr_lines=args.ocr_lines,
+        failure_rate=args.failure_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
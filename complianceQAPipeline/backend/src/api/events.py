@@ -0,0 +1,89 @@
+'''
+Per-job progress events, served as Server-Sent Events.
+
+Audit workers publish from their threads (node start/finish, Video Indexer
+progress, issues as each auditor branch finishes, the final result); any
+number of SSE clients read them from the event loop. Every event gets an
+increasing id, so a client that reconnects with Last-Event-ID only receives
+what it missed.
+'''
+
+import os
+import json
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+#events kept per job for late or reconnecting subscribers
+EVENT_HISTORY_LIMIT = int(os.getenv("AUDIT_EVENT_HISTORY", "1000"))
+#idle SSE connections get a comment line this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = float(os.getenv("AUDIT_SSE_HEARTBEAT_SECONDS", "15"))
+
+
+class EventStream:
+    '''
+    Append-only event log of one job with async subscribers
+    '''
+
+    def __init__(self, history: int = EVENT_HISTORY_LIMIT):
+        self._events = deque(maxlen=history)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._waiters = set()
+        self.closed = False
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None, final: bool = False):
+        '''
+        Records an event and wakes the subscribers. final=True ends the stream.
+        '''
+        with self._lock:
+            if self.closed:
+                return
+            self._events.append((self._next_id, event, data or {}))
+            self._next_id += 1
+            self.closed = final
+            waiters = list(self._waiters)
+        for loop, wake in waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                #the subscriber's loop is gone
+                pass
+
+    async def subscribe(self, after: int = -1, heartbeat: float = SSE_HEARTBEAT_SECONDS):
+        '''
+        Yields (id, event, data) for every event newer than `after`, then
+        waits for more until the stream is closed. Yields None on heartbeats.
+        '''
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                with self._lock:
+                    pending = [entry for entry in self._events if entry[0] > after]
+                    closed = self.closed
+                for entry in pending:
+                    after = entry[0]
+                    yield entry
+                if closed:
+                    return
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def format_sse(entry) -> str:
+    '''
+    Serializes one subscribe() item as an SSE frame
+    '''
+    if entry is None:
+        return ": keep-alive\n\n"
+    event_id, event, data = entry
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,207 @@
+'''
+In-process job queue for audits.
+
+Audits run on a bounded thread pool so the event loop stays free while
+Video Indexer processes a video. The number of queued + running jobs is
+capped; past that limit submissions are rejected so the API can answer 429
+instead of piling up work it cannot finish.
+
+Every job carries an EventStream with its progress and a cancel event that
+the running audit checks between steps.
+'''
+
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from typing import Dict
+
+from backend.src.api.events import EventStream
+
+logger = logging.getLogger("api-jobs")
+
+MAX_CONCURRENT_AUDITS = int(os.getenv("AUDIT_MAX_CONCURRENCY", "4"))
+MAX_QUEUE_DEPTH = int(os.getenv("AUDIT_MAX_QUEUE_DEPTH", "32"))
+#finished jobs are kept this long so clients can still poll the result
+JOB_RETENTION_SECONDS = int(os.getenv("AUDIT_JOB_RETENTION_SECONDS", "3600"))
+
+
+class QueueFullError(Exception):
+    '''
+    Raised when the job queue is at capacity
+    '''
+
+
+class JobExistsError(Exception):
+    '''
+    Raised when a job with the requested id is still queued or running
+    '''
+
+
+class AuditJob:
+    '''
+    Tracks one audit submitted to the JobManager
+    '''
+
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+    def __init__(self, job_id: str, temp_path: str = None):
+        self.job_id = job_id
+        #upload owned by the job, removed if it is cancelled before it starts
+        self.temp_path = temp_path
+        self.status = AuditJob.QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.events = EventStream()
+        self.cancel_event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (AuditJob.COMPLETED, AuditJob.FAILED, AuditJob.CANCELLED)
+
+    def emit(self, event: str, **data):
+        '''
+        Publishes a progress event to the job's subscribers
+        '''
+        self.events.publish(event, data)
+
+    def _finish(self, status: str, error: str = None):
+        if self.done:
+            return
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.events.publish("status", {"status": status, "error": error}, final=True)
+
+
+class JobManager:
+    '''
+    Runs audit callables on a bounded worker pool and keeps their status
+    '''
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_AUDITS, max_queue_depth: int = MAX_QUEUE_DEPTH):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audit-worker")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        '''
+        Number of jobs that are queued or running
+        '''
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def status_counts(self) -> Dict[str, int]:
+        '''
+        Number of unfinished jobs per status (QUEUED / RUNNING)
+        '''
+        counts = {AuditJob.QUEUED: 0, AuditJob.RUNNING: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.done:
+                    counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def submit(self, fn, *args, job_id: str = None, temp_path: str = None, **kwargs) -> AuditJob:
+        '''
+        Schedules fn(*args, **kwargs). Raises QueueFullError when the queue is
+        full, JobExistsError when job_id is still queued or running (checked
+        under the same lock as the insert, so two submits cannot both pass).
+        temp_path is a file fn would delete when done; it is deleted here
+        instead if the job is cancelled before fn runs.
+        '''
+        job = AuditJob(job_id or str(uuid.uuid4()), temp_path)
+        with self._lock:
+            self._prune()
+            existing = self._jobs.get(job.job_id)
+            if existing is not None and not existing.done:
+                raise JobExistsError(f"Audit {job.job_id} is still running.")
+            active = sum(1 for j in self._jobs.values() if not j.done)
+            if active >= self.max_queue_depth:
+                raise QueueFullError(
+                    f"Audit queue is full ({active}/{self.max_queue_depth} jobs in progress)"
+                )
+            self._jobs[job.job_id] = job
+            job.events.publish("status", {"status": job.status})
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+            #also covers futures cancelled through asyncio.wrap_future or shutdown
+            job.future.add_done_callback(lambda future: self._on_done(job, future))
+        logger.info(f"Queued audit job {job.job_id} (depth {active + 1}/{self.max_queue_depth})")
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        '''
+        Cancels a job: a queued job never starts, a running one stops at its
+        next checkpoint (Video Indexer wait or graph step). Returns the job,
+        or None if unknown.
+        '''
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_event.set()
+        #a queued job is finished by _on_done
+        job.future.cancel()
+        logger.info(f"Cancellation requested for audit job {job_id}")
+        return job
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _on_done(self, job: AuditJob, future):
+        if not future.cancelled():
+            return
+        #fn never ran, so nothing else cleans up after the job
+        if job.temp_path and os.path.exists(job.temp_path):
+            try:
+                os.remove(job.temp_path)
+            except OSError as e:
+                logger.warning(f"Could not remove {job.temp_path} of cancelled job {job.job_id}: {e}")
+        job._finish(AuditJob.CANCELLED, "Cancelled by client")
+        logger.info(f"Audit job {job.job_id} cancelled before it started")
+
+    def _run(self, job: AuditJob, fn, args, kwargs):
+        job.status = AuditJob.RUNNING
+        job.started_at = time.time()
+        job.events.publish("status", {"status": job.status})
+        try:
+            job.result = fn(*args, **kwargs)
+            job._finish(AuditJob.COMPLETED)
+            return job.result
+        except CancelledError:
+            logger.info(f"Audit job {job.job_id} cancelled")
+            job._finish(AuditJob.CANCELLED, "Cancelled by client")
+            raise
+        except Exception as e:
+            logger.error(f"Audit job {job.job_id} failed: {e}")
+            job._finish(AuditJob.FAILED, str(e))
+            raise
+
+    def _prune(self):
+        #caller holds the lock
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
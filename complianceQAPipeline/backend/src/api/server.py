@@ -1,28 +1,93 @@
 import uuid
+import json
+import time
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware 
-from fastapi import UploadFile, File
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi import UploadFile, File, Form, Query, Response, Header
 import os
 from pydantic import BaseModel
-from typing import List,Optional
+from typing import List, Optional, Union, Literal
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
-from backend.src.api.telemetry import setup_telemetry
+from backend.src.api.telemetry import setup_telemetry, instrument_app
 setup_telemetry()
 
 from backend.src.graph.workflow import app as compliance_graph
+from backend.src.graph.checkpoints import checkpointer, thread_config, resume_point, discard_completed
+from backend.src.services.clients import registry
+from backend.src.graph.prompts import prompt_registry, LLM_PREFIX_WARMUP
+from concurrent.futures import CancelledError
+from backend.src.api.jobs import job_manager, QueueFullError, JobExistsError, AuditJob
+from backend.src.api.events import format_sse
+from backend.src.api.uploads import save_upload_to_temp
+from backend.src.graph.batch import parse_manifest, result_record, error_record, BatchSummary
+from backend.src.services.cache import cache_stats
+from backend.src.services.vi_poller import shared_poller
+from backend.src.services.video_indexer import validate_video_url, redact_url, run_sync
+from backend.src.services.instrumentation import tracer, observe
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("api-server")
 
+#"sync" keeps the original blocking contract, "job" returns a job id right away
+DEFAULT_AUDIT_MODE = os.getenv("AUDIT_DEFAULT_MODE", "sync")
+#batch audits: videos in flight per request, and where manifest paths live
+BATCH_PARALLELISM = int(os.getenv("AUDIT_BATCH_PARALLELISM", "8"))
+BATCH_MANIFEST_ROOT = os.getenv("AUDIT_BATCH_ROOT")
+
+
+def _cache_counts():
+    #running hit / miss totals of every cache, for the cache.requests metric
+    caches = {**cache_stats(), "retrieval": registry.retrieval_stats()}
+    embedding = registry.embedding_stats()
+    if embedding:
+        caches["embeddings"] = {"hits": embedding["cache_hits"], "misses": embedding["cache_misses"]}
+    for name, stats in caches.items():
+        if "hits" in stats:
+            yield stats["hits"], {"cache": name, "result": "hit"}
+            yield stats["misses"], {"cache": name, "result": "miss"}
+
+
+observe("audit.queue_depth", "Audits waiting for a worker",
+        lambda: [(job_manager.status_counts()[AuditJob.QUEUED], {})])
+observe("audit.in_flight", "Audits running on a worker",
+        lambda: [(job_manager.status_counts()[AuditJob.RUNNING], {})])
+observe("vi.videos_in_flight", "Videos tracked by the Video Indexer poller",
+        lambda: [(shared_poller.in_flight, {})])
+observe("llm.in_flight", "LLM backend calls in progress",
+        lambda: [(registry.llm_stats().get("in_flight", 0), {})])
+observe("cache.requests", "Cache lookups by cache and result", _cache_counts, kind="counter")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    '''
+    Warms up the shared clients (embedding model, LLM, vector store) at startup
+    so the first audit does not pay for model loading, and optionally primes
+    the LLM server's prefix cache with the shared audit prompt.
+    '''
+    if os.getenv("WARMUP_CLIENTS", "true").lower() == "true":
+        logger.info("Warming up shared clients......")
+        registry.warmup()
+    if LLM_PREFIX_WARMUP:
+        prompt_registry.prime(registry.get_llm())
+    yield
+    job_manager.shutdown()
+
 app = FastAPI(
     title="Brand Gaurdian AI API",
     description= "API for auditing video content against the brand compliance rules.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+instrument_app(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -50,6 +115,8 @@ class ComplianceIssue(BaseModel):
     category: str
     severity: str
     description: str
+    #H:MM:SS (or a H:MM:SS-H:MM:SS window) where the issue was found, when known
+    timestamp: Optional[str] = None
     
 class AuditResponse(BaseModel):
     session_id: str
@@ -60,38 +127,212 @@ class AuditResponse(BaseModel):
     
     
     
-@app.post("/audit", response_model=AuditResponse)
-async def audit_video(file: UploadFile = File(...)):
+class AuditJobAccepted(BaseModel):
+    job_id: str
+    session_id: str
+    status: str
+    status_url: str
+
+class AuditJobStatus(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[AuditResponse] = None
+    error: Optional[str] = None
+    
+    
+def _execute_graph(inputs: Optional[dict], config: dict, job: Optional[AuditJob]) -> dict:
+    '''
+    Runs (inputs) or resumes (inputs=None) the graph under `config`.
+    With a job, node start/finish and each branch's issues are published to
+    its event stream, and the run stops between steps once it is cancelled.
+
+    The graph runs async (ainvoke / astream) on the shared Video Indexer
+    event loop, so the indexer awaits Video Indexer instead of blocking a
+    thread per call; the calling job worker still waits for the whole run,
+    so AUDIT_MAX_CONCURRENCY keeps bounding the audits in flight.
+    '''
+    final_state = run_sync(_aexecute_graph(inputs, config, job))
+    #a clean run has nothing left to resume
+    discard_completed(checkpointer, config["configurable"]["thread_id"], final_state)
+    return final_state
+
+
+async def _aexecute_graph(inputs: Optional[dict], config: dict, job: Optional[AuditJob]) -> dict:
+    if job is None:
+        return await compliance_graph.ainvoke(inputs, config)
+
+    config["configurable"].update(emit=job.emit, cancel_event=job.cancel_event)
+    final_state = inputs or {}
+    started = {}
+    async for mode, chunk in compliance_graph.astream(inputs, config, stream_mode=["tasks", "values"]):
+        if mode == "values":
+            final_state = chunk
+        elif "input" in chunk:
+            started[chunk["id"]] = time.monotonic()
+            job.emit("node_start", node=chunk["name"])
+        else:
+            elapsed = time.monotonic() - started.pop(chunk["id"], time.monotonic())
+            result = chunk.get("result") or {}
+            job.emit("node_end", node=chunk["name"], elapsed_seconds=round(elapsed, 2),
+                     error=str(chunk["error"]) if chunk.get("error") else None)
+            #partial results: each auditor branch's issues as soon as it is done
+            if result.get("compliance_results"):
+                job.emit("issues", node=chunk["name"], issues=result["compliance_results"])
+        if job.cancel_event.is_set():
+            raise CancelledError(f"Audit {job.job_id} cancelled")
+    return final_state
+
+
+def run_graph(video_id: str, video_path: Optional[str], video_hash: Optional[str] = None, cleanup: bool = True,
+              job_id: Optional[str] = None, video_url: Optional[str] = None) -> dict:
+    '''
+    Runs the compliance graph for one saved video, or one video URL that
+    Video Indexer fetches itself (on a job worker thread), and returns the
+    final state. Temp uploads are always removed afterwards.
+
+    The state is checkpointed under the job id (the session id), so a run
+    that fails part-way can be continued with resume_graph.
+    '''
+    #parent span of every node / Video Indexer span of this audit
+    with tracer.start_as_current_span("audit", attributes={"audit.video_id": video_id, "audit.job_id": job_id or ""}):
+        try:
+            initial_inputs = {
+                "video_path": video_path,
+                "video_url": video_url,
+                "video_id": video_id,
+                "video_hash": video_hash,
+                "compliance_results": [],
+                "errors": []
+            }
+            job = job_manager.get(job_id) if job_id else None
+            return _execute_graph(initial_inputs, thread_config(job_id or str(uuid.uuid4())), job)
+
+        finally:
+            # 🔥 Always delete local temp file
+            if cleanup and video_path and os.path.exists(video_path):
+                os.remove(video_path)
+
+
+def resume_graph(session_id: str) -> dict:
+    '''
+    Continues an audit from its last completed node (the indexer is not run
+    again once it finished) and returns the final state
+    '''
+    with tracer.start_as_current_span("audit.resume", attributes={"audit.job_id": session_id}):
+        config = resume_point(compliance_graph, session_id)
+        if config is None:
+            raise ValueError(f"Nothing to resume for session {session_id}")
+        logger.info(f"Resuming audit {session_id} from checkpoint {config['configurable'].get('checkpoint_id', 'latest')}")
+        return _execute_graph(None, config, job_manager.get(session_id))
+
+
+def _audit_response(session_id: str, final_state: dict) -> AuditResponse:
+    #shapes the final state into the API response, and publishes it as the job result event
+    result = AuditResponse(
+        session_id=session_id,
+        video_id=final_state.get("video_id"),
+        status=final_state.get("final_status", "UNKNOWN"),
+        final_report=final_state.get("final_report", "No Report Generated."),
+        compliance_results=final_state.get("compliance_results", [])
+    )
+    job = job_manager.get(session_id)
+    if job is not None:
+        job.emit("result", **result.model_dump())
+    return result
+
+
+def run_audit(session_id: str, video_id: str, temp_file_path: Optional[str], video_hash: Optional[str] = None,
+              video_url: Optional[str] = None) -> AuditResponse:
+    '''
+    Runs one audit and shapes the final state into the API response
+    '''
+    return _audit_response(
+        session_id, run_graph(video_id, temp_file_path, video_hash, job_id=session_id, video_url=video_url)
+    )
+
+
+def run_resume(session_id: str) -> AuditResponse:
+    '''
+    Resumes one audit and shapes the final state into the API response
+    '''
+    return _audit_response(session_id, resume_graph(session_id))
+
+
+@app.post("/audit", response_model=Union[AuditResponse, AuditJobAccepted])
+async def audit_video(
+    response: Response,
+    file: Optional[UploadFile] = File(None),
+    video_url: Optional[str] = Form(None),
+    mode: Literal["sync", "job"] = Query(DEFAULT_AUDIT_MODE)
+):
+    '''
+    Audits an uploaded video, or a video_url (public or blob SAS URL) that
+    Video Indexer downloads directly, so large masters never pass through
+    this server.
+    mode=sync waits for the report; mode=job returns a job id immediately,
+    poll GET /audit/{job_id} for the result.
+    '''
+    if (file is None) == (not video_url):
+        raise HTTPException(status_code=400, detail="Provide either a file or a video_url.")
+    if video_url:
+        try:
+            video_url = validate_video_url(video_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     session_id = str(uuid.uuid4())
     video_id_short = f"vid_{session_id[:8]}"
 
-    logger.info(f"Received audit file: {file.filename} (Session: {session_id})")
+    source = file.filename if file is not None else redact_url(video_url)
+    logger.info(f"Received audit {'file' if file is not None else 'URL'}: {source} (Session: {session_id}, Mode: {mode})")
+
+    #reject early, before reading the upload, when there is no capacity left
+    if job_manager.depth >= job_manager.max_queue_depth:
+        raise HTTPException(status_code=429, detail="Audit queue is full, retry later.")
 
-    temp_file_path = f"temp_{video_id_short}_{file.filename}"
+    temp_file_path, video_hash = None, None
 
     try:
-        # Save uploaded file temporarily
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(await file.read())
+        if file is not None:
+            # Stream the upload to a temp file in chunks (never fully in memory)
+            temp_file_path, video_hash = await save_upload_to_temp(file, prefix=f"temp_{video_id_short}")
 
-        initial_inputs = {
-            "video_path": temp_file_path,
-            "video_id": video_id_short,
-            "compliance_results": [],
-            "errors": []
-        }
+        job = job_manager.submit(
+            run_audit, session_id, video_id_short, temp_file_path, video_hash, video_url,
+            job_id=session_id, temp_path=temp_file_path
+        )
 
-        final_state = compliance_graph.invoke(initial_inputs)
+    except QueueFullError as e:
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise HTTPException(status_code=429, detail=str(e))
 
-        return AuditResponse(
+    except Exception as e:
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        logger.error(f"Audit Failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Workflow Execution Failed: {str(e)}"
+        )
+
+    if mode == "job":
+        response.status_code = 202
+        return AuditJobAccepted(
+            job_id=job.job_id,
             session_id=session_id,
-            video_id=final_state.get("video_id"),
-            status=final_state.get("final_status", "UNKNOWN"),
-            final_report=final_state.get("final_report", "No Report Generated."),
-            compliance_results=final_state.get("compliance_results", [])
+            status=job.status,
+            status_url=f"/audit/{job.job_id}"
         )
 
+    try:
+        #await the worker thread without blocking the event loop
+        return await asyncio.wrap_future(job.future)
+    except asyncio.CancelledError:
+        #the job was killed through /audit/{job_id}/cancel, not this request
+        if job.status != AuditJob.CANCELLED:
+            raise
+        raise HTTPException(status_code=409, detail="Audit was cancelled.")
     except Exception as e:
         logger.error(f"Audit Failed: {str(e)}")
         raise HTTPException(
@@ -99,11 +340,256 @@ async def audit_video(file: UploadFile = File(...)):
             detail=f"Workflow Execution Failed: {str(e)}"
         )
 
+
+@app.get("/audit/{job_id}", response_model=AuditJobStatus)
+def get_audit_job(job_id: str):
+    '''
+    Returns the status, and the result once finished, of an audit job
+    '''
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown audit job: {job_id}")
+    return AuditJobStatus(
+        job_id=job.job_id,
+        status=job.status,
+        result=job.result,
+        error=job.error
+    )
+
+
+@app.get("/audit/{job_id}/events")
+async def stream_audit_events(job_id: str, last_event_id: Optional[int] = Header(None)):
+    '''
+    Server-Sent Events for one audit job: status changes, node_start /
+    node_end, vi_progress, issues (per auditor branch) and the final result.
+    The stream ends with the terminal status event. Reconnecting clients
+    send Last-Event-ID and only receive what they missed.
+    '''
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown audit job: {job_id}")
+
+    async def event_source():
+        async for entry in job.events.subscribe(after=last_event_id if last_event_id is not None else -1):
+            yield format_sse(entry)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/audit/{job_id}/cancel", response_model=AuditJobStatus)
+def cancel_audit_job(job_id: str):
+    '''
+    Kills a queued or running audit. Running audits stop at the next
+    checkpoint (Video Indexer wait or graph step) and their Azure video is
+    deleted as usual.
+    '''
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown audit job: {job_id}")
+    return AuditJobStatus(
+        job_id=job.job_id,
+        status=job.status,
+        result=job.result,
+        error=job.error
+    )
+
+
+@app.post("/audit/{session_id}/resume", response_model=Union[AuditResponse, AuditJobAccepted])
+async def resume_audit(
+    session_id: str,
+    response: Response,
+    mode: Literal["sync", "job"] = Query(DEFAULT_AUDIT_MODE)
+):
+    '''
+    Restarts a failed or interrupted audit from its last completed node,
+    using the checkpoint saved under its session id. The video is not
+    uploaded or indexed again when indexing had already finished.
+    '''
+    #reads the checkpoint store, so off the event loop
+    if checkpointer is None or await run_in_threadpool(resume_point, compliance_graph, session_id) is None:
+        raise HTTPException(status_code=404, detail=f"No resumable checkpoint for session {session_id}")
+
+    try:
+        job = job_manager.submit(run_resume, session_id, job_id=session_id)
+    except JobExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    if mode == "job":
+        response.status_code = 202
+        return AuditJobAccepted(
+            job_id=job.job_id,
+            session_id=session_id,
+            status=job.status,
+            status_url=f"/audit/{job.job_id}"
+        )
+
+    try:
+        return await asyncio.wrap_future(job.future)
+    except asyncio.CancelledError:
+        if job.status != AuditJob.CANCELLED:
+            raise
+        raise HTTPException(status_code=409, detail="Audit was cancelled.")
+    except Exception as e:
+        logger.error(f"Resume Failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Workflow Execution Failed: {str(e)}"
+        )
+
+
+async def _stream_batch(items: List[dict], parallelism: int):
+    '''
+    Runs batch items on the job queue with at most `parallelism` in flight
+    and yields one NDJSON line per finished item, then a summary line.
+    '''
+    summary = BatchSummary(total=len(items))
+    pending = {}
+    queue_position = 0
+    try:
+        while queue_position < len(items) or pending:
+            #top up the in-flight window
+            while queue_position < len(items) and len(pending) < parallelism:
+                item = items[queue_position]
+                session_id = str(uuid.uuid4())
+                try:
+                    job = job_manager.submit(
+                        run_graph, f"vid_{session_id[:8]}", item.get("video_path"),
+                        item.get("video_hash"), item["cleanup"], session_id, item.get("video_url"),
+                        job_id=session_id, temp_path=item["video_path"] if item["cleanup"] else None
+                    )
+                except QueueFullError:
+                    break
+                pending[asyncio.wrap_future(job.future)] = (queue_position, item, session_id, time.monotonic())
+                queue_position += 1
+
+            if not pending:
+                #the shared queue is full with other requests' jobs
+                await asyncio.sleep(1)
+                continue
+
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index, item, session_id, started = pending.pop(future)
+                try:
+                    record = result_record(index, item["name"], session_id, future.result(), time.monotonic() - started)
+                except asyncio.CancelledError:
+                    record = error_record(index, item["name"], "Cancelled by client")
+                except Exception as e:
+                    logger.error(f"Batch item {item['name']} failed: {e}")
+                    record = error_record(index, item["name"], str(e))
+                summary.add(record)
+                yield json.dumps(record) + "\n"
+
+        yield json.dumps(summary.as_record()) + "\n"
+
     finally:
-        # 🔥 Always delete local temp file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        #client went away: drop the uploads that never reached the queue
+        for item in items[queue_position:]:
+            if item["cleanup"] and os.path.exists(item["video_path"]):
+                os.remove(item["video_path"])
+
+
+@app.post("/audit/batch")
+async def audit_batch(
+    files: List[UploadFile] = File(default=[]),
+    manifest: Optional[UploadFile] = File(None),
+    parallelism: int = Query(BATCH_PARALLELISM, ge=1)
+):
+    '''
+    Audits many videos at once: uploaded files and/or a manifest (JSON list
+    or JSONL of {"video_path": ...} relative to AUDIT_BATCH_ROOT, or
+    {"video_url": ...} fetched by Video Indexer itself).
+    Streams one NDJSON record per video as soon as it finishes, then a summary.
+    '''
+    items = []
+    try:
+        for file in files:
+            temp_file_path, video_hash = await save_upload_to_temp(file, prefix="temp_batch")
+            items.append({
+                "name": file.filename,
+                "video_path": temp_file_path,
+                "video_hash": video_hash,
+                "cleanup": True
+            })
+
+        if manifest is not None:
+            root = os.path.realpath(BATCH_MANIFEST_ROOT) if BATCH_MANIFEST_ROOT else None
+            for entry in parse_manifest((await manifest.read()).decode("utf-8")):
+                if entry.get("video_url"):
+                    try:
+                        video_url = validate_video_url(entry["video_url"])
+                    except ValueError as e:
+                        raise HTTPException(status_code=400, detail=f"Invalid manifest entry: {e}")
+                    items.append({
+                        "name": entry.get("name") or os.path.basename(redact_url(video_url)),
+                        "video_url": video_url,
+                        "cleanup": False
+                    })
+                    continue
+                if root is None:
+                    raise HTTPException(status_code=400, detail="Manifest paths need AUDIT_BATCH_ROOT to be configured.")
+                video_path = os.path.realpath(os.path.join(root, entry.get("video_path", "")))
+                if not video_path.startswith(root + os.sep) or not os.path.isfile(video_path):
+                    raise HTTPException(status_code=400, detail=f"Invalid manifest entry: {entry}")
+                items.append({
+                    "name": entry.get("name") or os.path.basename(video_path),
+                    "video_path": video_path,
+                    "cleanup": False
+                })
+    except Exception:
+        for item in items:
+            if item["cleanup"] and os.path.exists(item["video_path"]):
+                os.remove(item["video_path"])
+        raise
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No videos provided.")
+
+    logger.info(f"Received batch of {len(items)} videos (parallelism {parallelism})")
+    parallelism = min(parallelism, job_manager.max_queue_depth)
+    return StreamingResponse(_stream_batch(items, parallelism), media_type="application/x-ndjson")
         
+
+@app.post("/vi/callback")
+def video_indexer_callback(id: str = Query(...), state: Optional[str] = Query(None)):
+    '''
+    Called by Azure Video Indexer (callbackUrl) when a video changes state.
+    Wakes the shared poller so the waiting audit continues without polling.
+    '''
+    tracked = shared_poller.notify(id, state)
+    return {"video_id": id, "state": state, "tracked": tracked}
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    '''
+    Hit/miss metrics for the extraction, audit and retrieval caches
+    '''
+    return {**cache_stats(), "retrieval": registry.retrieval_stats()}
+
+
+@app.get("/embeddings/stats")
+def get_embedding_stats():
+    '''
+    Throughput, batching and cache metrics of the embedding service
+    '''
+    return registry.embedding_stats()
+
+
+@app.get("/llm/stats")
+def get_llm_stats():
+    '''
+    Requests, backend calls, coalescing and timeouts of the LLM client
+    '''
+    return registry.llm_stats()
+
+
 @app.get("/health")
 def health_check():
     '''
@@ -1,32 +1,146 @@
 import os
 import logging
 from azure.monitor.opentelemetry import configure_azure_monitor
+from opentelemetry import trace, metrics
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger("brand-gaurdian.-telemetry")
 
+#comma separated: azure, otlp, console, prometheus (azure is implied by a connection string)
+TELEMETRY_EXPORTERS = os.getenv("TELEMETRY_EXPORTERS", "")
+TELEMETRY_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "brand-guardian-api")
+TELEMETRY_EXPORT_INTERVAL_MS = int(os.getenv("TELEMETRY_EXPORT_INTERVAL_MS", "60000"))
+
+_enabled = False
+#set when the Prometheus reader is registered; instrument_app serves /metrics
+_prometheus = False
+
+
+def _exporters():
+    names = {name.strip().lower() for name in TELEMETRY_EXPORTERS.split(",") if name.strip()}
+    if os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING"):
+        names.add("azure")
+    return names
+
+
+def _local_pipeline(names):
+    '''
+    Span processors and metric readers for the non-Azure exporters.
+    OTLP and Prometheus need their exporter packages; they are skipped with
+    a warning when those are not installed.
+    '''
+    global _prometheus
+    span_processors, metric_readers = [], []
+
+    if "console" in names:
+        span_processors.append(BatchSpanProcessor(ConsoleSpanExporter()))
+        metric_readers.append(PeriodicExportingMetricReader(
+            ConsoleMetricExporter(), export_interval_millis=TELEMETRY_EXPORT_INTERVAL_MS
+        ))
+
+    if "otlp" in names:
+        #endpoint / headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+            span_processors.append(BatchSpanProcessor(OTLPSpanExporter()))
+            metric_readers.append(PeriodicExportingMetricReader(
+                OTLPMetricExporter(), export_interval_millis=TELEMETRY_EXPORT_INTERVAL_MS
+            ))
+        except ImportError:
+            logger.warning("OTLP export needs opentelemetry-exporter-otlp-proto-http, skipping it")
+
+    if "prometheus" in names:
+        #scraped from the API's own /metrics route (see instrument_app), not a
+        #side port: a port bound at import fails in every uvicorn worker but one
+        try:
+            from opentelemetry.exporter.prometheus import PrometheusMetricReader
+            metric_readers.append(PrometheusMetricReader())
+            _prometheus = True
+        except ImportError:
+            logger.warning("Prometheus export needs opentelemetry-exporter-prometheus, skipping it")
+
+    return span_processors, metric_readers
+
+
 def setup_telemetry():
     '''
-    Initializes Azure Monitor OpenTelemetry
-    TRACKS: HTTP requests, database queries, errors, performance metrics.
-    Sends this data to azure monitor
-    
-    it auto captures every API requests
-    No need to manually log each entry
+    Initializes OpenTelemetry tracing and metrics
+    TRACKS: HTTP requests, graph nodes, Video Indexer calls, errors, and the
+    pipeline metrics defined in services/instrumentation.py.
+
+    Azure Monitor is used when APPLICATIONINSIGHTS_CONNECTION_STRING is set;
+    TELEMETRY_EXPORTERS adds local exporters (otlp, console, prometheus) that
+    work with or without it.
     '''
-    
-    connection_string = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+    global _enabled
+    names = _exporters()
     #check if configured
-    if not connection_string:
-        logger.warning("No instrument key found. Telemetry is DISABLED.")
+    if not names:
+        logger.warning("No instrument key or exporter configured. Telemetry is DISABLED.")
+        return
+
+    resource = Resource.create({"service.name": TELEMETRY_SERVICE_NAME})
+    span_processors, metric_readers = _local_pipeline(names)
+
+    if "azure" in names:
+        #Configure the azure monitor, with the local exporters attached to it
+        try:
+            configure_azure_monitor(
+                connection_string=os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING"),
+                logger_name="brand-gaurdian-tracer",
+                resource=resource,
+                span_processors=span_processors,
+                metric_readers=metric_readers
+            )
+            _enabled = True
+            logger.info("Azure Monitor Tracking Enabled and Connected")
+        except Exception as e:
+            logger.error(f"Failed to initialize Azure Monitor: {e}")
+        return
+
+    if not span_processors and not metric_readers:
+        logger.warning("No usable telemetry exporter. Telemetry is DISABLED.")
+        return
+
+    tracer_provider = TracerProvider(resource=resource)
+    for processor in span_processors:
+        tracer_provider.add_span_processor(processor)
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=metric_readers))
+    _enabled = True
+    logger.info(f"Telemetry enabled with exporters: {', '.join(sorted(names))}")
+
+
+def _metrics_endpoint(request):
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+    from starlette.responses import Response
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrument_app(app):
+    '''
+    Serves GET /metrics on the FastAPI app when Prometheus export is on, and
+    adds request spans when telemetry runs without Azure Monitor (which
+    instruments FastAPI itself).
+
+    Each uvicorn worker answers /metrics with its own counters; with several
+    workers, scrape each one (e.g. one worker per container) or send metrics
+    through otlp to a collector instead.
+    '''
+    if _prometheus:
+        app.add_route("/metrics", _metrics_endpoint, methods=["GET"], include_in_schema=False)
+        logger.info("Prometheus metrics on /metrics")
+    if not _enabled or "azure" in _exporters():
         return
-    #Configure the azure monitor
     try:
-        configure_azure_monitor( 
-            connection_string=connection_string,
-            logger_name= "brand-gaurdian-tracer"
-        )
-        logger.info("Azure Monitor Tracking Enabled and Connected")
-    except Exception as e:
-        logger.error(f"Failed to initialize Azure Monitor: {e}")
\ No newline at end of file
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        FastAPIInstrumentor.instrument_app(app)
+    except ImportError:
+        logger.warning("opentelemetry-instrumentation-fastapi not installed, no request spans")
@@ -0,0 +1,48 @@
+'''
+Helpers for persisting uploaded videos without holding them in memory.
+'''
+
+import os
+import hashlib
+import tempfile
+import logging
+from typing import Tuple
+
+from fastapi import UploadFile
+
+logger = logging.getLogger("api-uploads")
+
+#uploads are written here; defaults to the system temp dir, never the CWD
+UPLOAD_TEMP_DIR = os.getenv("AUDIT_TEMP_DIR") or tempfile.gettempdir()
+UPLOAD_CHUNK_SIZE = int(os.getenv("AUDIT_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+async def save_upload_to_temp(file: UploadFile, prefix: str) -> Tuple[str, str]:
+    '''
+    Streams an UploadFile to a new temp file chunk by chunk, so memory use
+    stays at one chunk regardless of the video size. The SHA-256 of the
+    content is computed on the same pass.
+
+    Returns (temp file path, hex sha256); the caller owns deleting the file.
+    '''
+    suffix = os.path.splitext(os.path.basename(file.filename or ""))[1]
+    os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
+    fd, temp_file_path = tempfile.mkstemp(prefix=f"{prefix}_", suffix=suffix, dir=UPLOAD_TEMP_DIR)
+
+    total_bytes = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer.write(chunk)
+                digest.update(chunk)
+                total_bytes += len(chunk)
+    except Exception:
+        os.remove(temp_file_path)
+        raise
+
+    logger.info(f"Saved upload {file.filename} ({total_bytes} bytes) to {temp_file_path}")
+    return temp_file_path, digest.hexdigest()
@@ -0,0 +1,119 @@
+'''
+Shared helpers for bulk (campaign) audits.
+
+Used by POST /audit/batch and the main.py CLI: finding the videos to audit,
+turning each finished audit into one NDJSON record, and the final summary.
+'''
+
+import os
+import glob
+import json
+import time
+from typing import Any, Dict, List
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+MANIFEST_EXTENSIONS = (".json", ".jsonl", ".ndjson")
+
+
+def parse_manifest(content: str) -> List[Dict[str, Any]]:
+    '''
+    Parses a manifest: either a JSON list or one JSON object per line.
+    Entries are {"video_path": ...} / {"video_url": ...} objects, or plain
+    path or http(s) URL strings.
+    '''
+    content = content.strip()
+    if not content:
+        return []
+    if content.startswith("["):
+        entries = json.loads(content)
+    else:
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    return [_manifest_item(entry) if isinstance(entry, str) else dict(entry) for entry in entries]
+
+
+def _manifest_item(entry: str) -> Dict[str, Any]:
+    if entry.startswith(("http://", "https://")):
+        return {"video_url": entry}
+    return {"video_path": entry}
+
+
+def discover_videos(pattern: str) -> List[Dict[str, Any]]:
+    '''
+    Expands a CLI input into audit items: a directory (all videos in it,
+    recursively), a glob, a single video, or a manifest file whose relative
+    paths are resolved against the manifest's directory.
+    '''
+    if os.path.isdir(pattern):
+        paths = [
+            path for path in glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+            if path.lower().endswith(VIDEO_EXTENSIONS)
+        ]
+        return [{"video_path": path} for path in sorted(paths)]
+
+    if os.path.isfile(pattern) and pattern.lower().endswith(MANIFEST_EXTENSIONS):
+        base_dir = os.path.dirname(os.path.abspath(pattern))
+        with open(pattern, "r", encoding="utf-8") as f:
+            entries = parse_manifest(f.read())
+        for entry in entries:
+            if entry.get("video_path") and not os.path.isabs(entry["video_path"]):
+                entry["video_path"] = os.path.join(base_dir, entry["video_path"])
+        return entries
+
+    return [{"video_path": path} for path in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(path)]
+
+
+def result_record(index: int, name: str, session_id: str, final_state: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    return {
+        "type": "result",
+        "index": index,
+        "name": name,
+        "session_id": session_id,
+        "video_id": final_state.get("video_id"),
+        "status": final_state.get("final_status", "UNKNOWN"),
+        "final_report": final_state.get("final_report", "No Report Generated."),
+        "compliance_results": final_state.get("compliance_results", []),
+        "errors": final_state.get("errors", []),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+
+
+def error_record(index: int, name: str, error: str) -> Dict[str, Any]:
+    return {"type": "error", "index": index, "name": name, "error": error}
+
+
+class BatchSummary:
+    '''
+    Counts outcomes as records stream out
+    '''
+
+    def __init__(self, total: int):
+        self.total = total
+        self.started = time.monotonic()
+        self.passed = 0
+        self.failed = 0
+        self.errors = 0
+        self.issues = 0
+
+    def add(self, record: Dict[str, Any]):
+        if record["type"] == "error":
+            self.errors += 1
+        elif record["status"] == "PASS":
+            self.passed += 1
+        else:
+            self.failed += 1
+        self.issues += len(record.get("compliance_results", []))
+
+    def as_record(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        completed = self.passed + self.failed + self.errors
+        return {
+            "type": "summary",
+            "total": self.total,
+            "completed": completed,
+            "passed": self.passed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "issues": self.issues,
+            "elapsed_seconds": round(elapsed, 2),
+            "videos_per_minute": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        }
@@ -0,0 +1,57 @@
+'''
+Compliance categories audited by the parallel auditor branches.
+
+Each category is one branch of the graph: it retrieves its own slice of the
+rulebook (restricted to the PDFs it cares about) and asks the LLM to look
+only for that kind of violation. AUDIT_CATEGORIES selects which branches run
+(comma separated keys, default: all).
+'''
+
+import os
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CATEGORIES: List[Dict[str, Any]] = [
+    {
+        "key": "claims",
+        "name": "Claim Validation",
+        #empty sources => search the whole rulebook
+        "sources": [],
+        "query": "advertising claims substantiation misleading guaranteed results",
+        "focus": "Unsubstantiated, absolute or misleading product claims: health or "
+                 "performance promises, guaranteed results, fake urgency, unfair comparisons.",
+    },
+    {
+        "key": "disclosure",
+        "name": "Influencer Disclosure",
+        "sources": ["1001a-influencer-guide-508_1.pdf"],
+        "query": "endorsement disclosure material connection sponsored paid partnership",
+        "focus": "FTC endorsement rules: missing, unclear or badly placed disclosure of "
+                 "sponsorships, free products, affiliate links or other material connections.",
+    },
+    {
+        "key": "platform",
+        "name": "YouTube Ad Specs",
+        "sources": ["youtube-ad-specs.pdf"],
+        "query": "YouTube ad format length aspect ratio resolution text requirements",
+        "focus": "YouTube ad specifications: video length, aspect ratio, resolution, "
+                 "on-screen text and other format requirements for the ad type.",
+    },
+]
+
+
+def enabled_categories() -> List[Dict[str, Any]]:
+    '''
+    The categories selected by AUDIT_CATEGORIES, in declaration order
+    '''
+    selected = os.getenv("AUDIT_CATEGORIES", "")
+    keys = {key.strip() for key in selected.split(",") if key.strip()}
+    if not keys:
+        return list(CATEGORIES)
+    unknown = keys - {category["key"] for category in CATEGORIES}
+    if unknown:
+        raise ValueError(f"Unknown AUDIT_CATEGORIES: {sorted(unknown)}")
+    return [category for category in CATEGORIES if category["key"] in keys]
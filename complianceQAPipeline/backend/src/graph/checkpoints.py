@@ -0,0 +1,488 @@
+'''
+Durable LangGraph checkpointers, keyed by audit session id (thread_id).
+
+After every step the graph state is saved, so an audit whose process died or
+whose auditor failed can be resumed from the last completed node instead of
+uploading and indexing the video again (the indexer deletes the video from
+Video Indexer once its insights are extracted, and those insights live in
+the checkpoint).
+
+CHECKPOINT_BACKEND selects the store:
+  sqlite   - local file (default), CHECKPOINT_PATH or .cache/ in the project folder
+  postgres - CHECKPOINT_POSTGRES_URL, via psycopg2
+  redis    - CHECKPOINT_REDIS_URL
+  memory   - in-process only (lost on restart)
+  none     - no checkpointing
+'''
+
+import os
+import json
+import base64
+import asyncio
+import sqlite3
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-checkpoints")
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+#the default does not depend on the directory the API or CLI is started from
+PROJECT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_PATH", os.path.join(PROJECT_FOLDER, ".cache", "checkpoints.sqlite3"))
+CHECKPOINT_POSTGRES_URL = os.getenv("CHECKPOINT_POSTGRES_URL")
+CHECKPOINT_REDIS_URL = os.getenv("CHECKPOINT_REDIS_URL", "redis://localhost:6379/0")
+#keep the checkpoints of audits that finished without errors (off: they are dropped)
+CHECKPOINT_KEEP_COMPLETED = os.getenv("CHECKPOINT_KEEP_COMPLETED", "false").lower() == "true"
+
+
+def thread_config(session_id: str, **configurable) -> RunnableConfig:
+    '''
+    Graph config that stores the run's checkpoints under its session id
+    '''
+    return {"configurable": {"thread_id": session_id, **configurable}}
+
+
+def resume_point(graph, session_id: str) -> Optional[RunnableConfig]:
+    '''
+    Checkpoint to continue a session from, or None if there is nothing to
+    resume (unknown session, or the video never finished indexing: the
+    uploaded file is gone, so the indexer cannot run again):
+      - a run that stopped mid-way (crash, exception) after indexing
+        continues where it was; nodes that finished in the failed step are
+        not run again
+      - a finished run that recorded errors restarts from the last
+        checkpoint without errors after indexing, so the audit steps run
+        again but the indexer does not
+    '''
+    config = thread_config(session_id)
+    state = graph.get_state(config)
+    if not state.values:
+        return None
+    if state.next:
+        if "indexer" in state.next:
+            return None
+        #no checkpoint_id: an explicit one is replayed, which discards the
+        #saved writes of the nodes that did finish
+        return config
+    for snapshot in graph.get_state_history(config):
+        if snapshot.next and "indexer" not in snapshot.next and not snapshot.values.get("errors"):
+            return snapshot.config
+    return None
+
+
+def discard_completed(saver: Optional[BaseCheckpointSaver], session_id: str, final_state: Dict[str, Any]) -> None:
+    '''
+    Drops the checkpoints of a run that finished without errors: there is
+    nothing left to resume (kept with CHECKPOINT_KEEP_COMPLETED)
+    '''
+    if saver is not None and not final_state.get("errors") and not CHECKPOINT_KEEP_COMPLETED:
+        saver.delete_thread(session_id)
+
+
+def _configurable(config: RunnableConfig) -> Tuple[str, str]:
+    return config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", "")
+
+
+def _checkpoint_config(thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[RunnableConfig]:
+    if not checkpoint_id:
+        return None
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class ThreadedCheckpointSaver(BaseCheckpointSaver):
+    '''
+    Async interface (graph.ainvoke / astream) for a saver with blocking
+    methods: each call runs in a worker thread, off the event loop
+    '''
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class SQLCheckpointSaver(ThreadedCheckpointSaver):
+    '''
+    Checkpoints in two tables of a DB-API database (SQLite or Postgres).
+    Each checkpoint is stored whole (channel values included), which keeps
+    reads to one row; audit states are small. The database is opened (and
+    the tables created) on first use, not when the graph module is imported.
+    '''
+
+    def __init__(self, connect, placeholder: str = "?", blob_type: str = "BLOB"):
+        super().__init__()
+        self._connect = connect
+        self._conn = None
+        self._p = placeholder
+        self._blob_type = blob_type
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        #called with the lock held
+        if self._conn is None:
+            conn = self._connect()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS checkpoints ("
+                    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+                    f"parent_id TEXT, type TEXT, checkpoint {self._blob_type}, metadata {self._blob_type}, "
+                    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+                )
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+                    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+                    f"task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, "
+                    f"value {self._blob_type}, task_path TEXT NOT NULL DEFAULT '', "
+                    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+                )
+                conn.commit()
+            finally:
+                cursor.close()
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: Sequence[Any] = (), fetch: bool = False):
+        sql = sql.replace("?", self._p)
+        with self._lock:
+            cursor = self._connection().cursor()
+            try:
+                cursor.execute(sql, tuple(params))
+                rows = cursor.fetchall() if fetch else None
+                self._conn.commit()
+                return rows
+            except Exception:
+                #Postgres refuses every later statement until an aborted
+                #transaction is rolled back
+                try:
+                    self._conn.rollback()
+                except Exception as e:
+                    logger.warning(f"Checkpoint rollback failed, reconnecting on next use: {e}")
+                    self._conn = None
+                raise
+            finally:
+                cursor.close()
+
+    def _writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        rows = self._execute(
+            "SELECT task_id, channel, type, value, task_path, idx FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id), fetch=True
+        )
+        rows.sort(key=lambda row: writes_sort_key(row[4], row[0], row[5]))
+        return [(task_id, channel, self.serde.loads_typed((kind, bytes(value)))) for task_id, channel, kind, value, _, _ in rows]
+
+    def _tuple(self, thread_id, checkpoint_ns, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, kind, checkpoint, metadata = row
+        return CheckpointTuple(
+            config=_checkpoint_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((kind, bytes(checkpoint))),
+            metadata=json.loads(bytes(metadata).decode("utf-8")),
+            parent_config=_checkpoint_config(thread_id, checkpoint_ns, parent_id),
+            pending_writes=self._writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = _configurable(config)
+        checkpoint_id = get_checkpoint_id(config)
+        select = "SELECT checkpoint_id, parent_id, type, checkpoint, metadata FROM checkpoints "
+        if checkpoint_id:
+            rows = self._execute(
+                select + "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id), fetch=True
+            )
+        else:
+            rows = self._execute(
+                select + "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns), fetch=True
+            )
+        return self._tuple(thread_id, checkpoint_ns, rows[0]) if rows else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        sql = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        for thread_id, checkpoint_ns, *row in self._execute(sql, params, fetch=True):
+            item = self._tuple(thread_id, checkpoint_ns, row)
+            if filter and not all(item.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, checkpoint_ns = _configurable(config)
+        kind, data = self.serde.dumps_typed(checkpoint)
+        meta = json.dumps(get_serializable_checkpoint_metadata(config, metadata), default=str).encode("utf-8")
+        self._execute(
+            "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) "
+            "DO UPDATE SET type = excluded.type, checkpoint = excluded.checkpoint, metadata = excluded.metadata",
+            (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"), kind, data, meta)
+        )
+        return _checkpoint_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, checkpoint_ns = _configurable(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            kind, data = self.serde.dumps_typed(value)
+            #regular writes are written once; special ones (errors, interrupts) replace
+            conflict = "DO UPDATE SET channel = excluded.channel, type = excluded.type, value = excluded.value" \
+                if idx < 0 else "DO NOTHING"
+            self._execute(
+                "INSERT INTO checkpoint_writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) {conflict}",
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, kind, data, task_path)
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        self._execute("DELETE FROM checkpoint_writes WHERE thread_id = ?", (thread_id,))
+
+
+class RedisCheckpointSaver(ThreadedCheckpointSaver):
+    '''
+    Checkpoints in Redis: one hash of checkpoints per thread/namespace
+    (field = checkpoint id) and one hash of pending writes per checkpoint
+    '''
+
+    def __init__(self, client, prefix: str = "checkpoint"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return ":".join([self.prefix, *parts])
+
+    def _encode(self, kind: str, data: bytes, **extra) -> str:
+        return json.dumps({"type": kind, "data": base64.b64encode(data).decode("ascii"), **extra})
+
+    def _decode(self, raw) -> Tuple[Any, Dict[str, Any]]:
+        entry = json.loads(raw)
+        return self.serde.loads_typed((entry["type"], base64.b64decode(entry["data"]))), entry
+
+    def _writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        writes = []
+        for raw in self.client.hvals(self._key("writes", thread_id, checkpoint_ns, checkpoint_id)):
+            value, entry = self._decode(raw)
+            writes.append((writes_sort_key(entry["task_path"], entry["task_id"], entry["idx"]),
+                           (entry["task_id"], entry["channel"], value)))
+        return [write for _, write in sorted(writes, key=lambda item: item[0])]
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, raw) -> CheckpointTuple:
+        checkpoint, entry = self._decode(raw)
+        return CheckpointTuple(
+            config=_checkpoint_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=checkpoint,
+            metadata=entry["metadata"],
+            parent_config=_checkpoint_config(thread_id, checkpoint_ns, entry["parent_id"]),
+            pending_writes=self._writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = _configurable(config)
+        key = self._key(thread_id, checkpoint_ns)
+        checkpoint_id = get_checkpoint_id(config)
+        if not checkpoint_id:
+            ids = self.client.hkeys(key)
+            if not ids:
+                return None
+            checkpoint_id = max(_text(i) for i in ids)
+        raw = self.client.hget(key, checkpoint_id)
+        return self._tuple(thread_id, checkpoint_ns, checkpoint_id, raw) if raw else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is None:
+            #every thread: scan the checkpoint hashes
+            keys = [_text(key) for key in self.client.scan_iter(self._key("*")) if not _text(key).startswith(self._key("writes"))]
+            scopes = [tuple(key.split(":", 2)[1:]) for key in keys]
+        else:
+            scopes = [(config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""))]
+        wanted = get_checkpoint_id(config) if config else None
+        upper = get_checkpoint_id(before) if before else None
+
+        for thread_id, checkpoint_ns in scopes:
+            entries = self.client.hgetall(self._key(thread_id, checkpoint_ns))
+            for checkpoint_id, raw in sorted(((_text(k), v) for k, v in entries.items()), reverse=True):
+                if (wanted and checkpoint_id != wanted) or (upper and checkpoint_id >= upper):
+                    continue
+                item = self._tuple(thread_id, checkpoint_ns, checkpoint_id, raw)
+                if filter and not all(item.metadata.get(key) == value for key, value in filter.items()):
+                    continue
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, checkpoint_ns = _configurable(config)
+        kind, data = self.serde.dumps_typed(checkpoint)
+        self.client.hset(self._key(thread_id, checkpoint_ns), checkpoint["id"], self._encode(
+            kind, data,
+            parent_id=config["configurable"].get("checkpoint_id"),
+            metadata=json.loads(json.dumps(get_serializable_checkpoint_metadata(config, metadata), default=str)),
+        ))
+        return _checkpoint_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, checkpoint_ns = _configurable(config)
+        key = self._key("writes", thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"])
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            kind, data = self.serde.dumps_typed(value)
+            entry = self._encode(kind, data, task_id=task_id, channel=channel, idx=idx, task_path=task_path)
+            if idx < 0:
+                self.client.hset(key, f"{task_id}:{idx}", entry)
+            else:
+                self.client.hsetnx(key, f"{task_id}:{idx}", entry)
+
+    def delete_thread(self, thread_id: str) -> None:
+        for pattern in (self._key(thread_id, "*"), self._key("writes", thread_id, "*")):
+            keys = list(self.client.scan_iter(pattern))
+            if keys:
+                self.client.delete(*keys)
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def create_checkpointer(backend: str = CHECKPOINT_BACKEND) -> Optional[BaseCheckpointSaver]:
+    '''
+    Builds the checkpointer selected by CHECKPOINT_BACKEND (None for "none")
+    '''
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "postgres":
+        import psycopg2
+        logger.info("Using Postgres audit checkpoints")
+        return SQLCheckpointSaver(lambda: psycopg2.connect(CHECKPOINT_POSTGRES_URL), placeholder="%s", blob_type="BYTEA")
+    if backend == "redis":
+        import redis
+        logger.info(f"Using Redis audit checkpoints at {CHECKPOINT_REDIS_URL}")
+        return RedisCheckpointSaver(redis.Redis.from_url(CHECKPOINT_REDIS_URL))
+    if backend != "sqlite":
+        logger.warning(f"Unknown CHECKPOINT_BACKEND '{backend}', using sqlite")
+
+    def connect():
+        if os.path.dirname(CHECKPOINT_DB_PATH):
+            os.makedirs(os.path.dirname(CHECKPOINT_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    logger.info(f"Using SQLite audit checkpoints at {CHECKPOINT_DB_PATH}")
+    return SQLCheckpointSaver(connect)
+
+
+checkpointer = create_checkpointer()
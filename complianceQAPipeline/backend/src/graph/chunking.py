@@ -0,0 +1,87 @@
+'''
+Helpers for auditing long videos in time-windowed chunks.
+
+The transcript and OCR segments (with timestamps from Video Indexer) are
+grouped into fixed-length windows, each window is audited on its own, and the
+per-window findings are merged back into one list without duplicates.
+'''
+
+import re
+from typing import Any, Dict, List
+
+from backend.src.graph.state import ComplianceIssue
+
+SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+
+
+def format_seconds(seconds: float) -> str:
+    '''
+    Formats seconds as H:MM:SS
+    '''
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def window_segments(
+    transcript_segments: List[Dict[str, Any]],
+    ocr_segments: List[Dict[str, Any]],
+    chunk_seconds: float
+) -> List[Dict[str, Any]]:
+    '''
+    Groups timed transcript/OCR segments into windows of chunk_seconds.
+    Empty windows are dropped.
+
+    Returns [{"start", "end", "transcript", "ocr_text"}] ordered by start.
+    '''
+    windows = {}
+
+    def bucket(start):
+        index = int(start // chunk_seconds)
+        return windows.setdefault(index, {
+            "start": index * chunk_seconds,
+            "end": (index + 1) * chunk_seconds,
+            "transcript": [],
+            "ocr_text": [],
+        })
+
+    for segment in transcript_segments:
+        if segment.get("text"):
+            bucket(segment.get("start", 0))["transcript"].append(segment["text"])
+    for segment in ocr_segments:
+        text = segment.get("text")
+        window = bucket(segment.get("start", 0))
+        #the same OCR line is usually visible for many instances in a row
+        if text and text not in window["ocr_text"]:
+            window["ocr_text"].append(text)
+
+    return [
+        {**window, "transcript": " ".join(window["transcript"])}
+        for _, window in sorted(windows.items())
+        if window["transcript"] or window["ocr_text"]
+    ]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", (text or "").lower())).strip()
+
+
+def merge_issues(issues: List[ComplianceIssue]) -> List[ComplianceIssue]:
+    '''
+    Dedupes issues reported by several chunks. Issues with the same category
+    and description are merged, keeping the highest severity and every
+    timestamp they were seen at.
+    '''
+    merged = {}
+    for issue in issues:
+        key = (_normalize(issue.get("category")), _normalize(issue.get("description")))
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = dict(issue)
+            continue
+        if SEVERITY_RANK.get(str(issue.get("severity")).upper(), -1) > \
+                SEVERITY_RANK.get(str(existing.get("severity")).upper(), -1):
+            existing["severity"] = issue.get("severity")
+        timestamps = [t for t in (existing.get("timestamp"), issue.get("timestamp")) if t]
+        if timestamps:
+            existing["timestamp"] = ", ".join(dict.fromkeys(", ".join(timestamps).split(", ")))
+    return list(merged.values())
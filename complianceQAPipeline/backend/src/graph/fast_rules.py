@@ -0,0 +1,235 @@
+'''
+Deterministic fast-path rules, screened before the LLM audit.
+
+Blatant, pattern-matchable violations (absolute "guaranteed" / "cures"
+claims, a discount code with no #ad) and clips that contain no relevant
+wording at all do not need a 14B model to decide. The rules in
+FAST_RULES_PATH (backend/data/fast_rules.json, derived from the rule PDFs)
+are compiled once into multi-pattern sets and run over every transcript and
+OCR segment; matches become ComplianceIssues with the segment timestamp.
+
+Rule kinds:
+  match     an issue when any of its patterns is found
+  missing   an issue when a trigger is found but none of the required
+            patterns is (e.g. a discount code without a disclosure)
+Per category, "screen" patterns are the wording an issue of that kind
+usually needs. They are a keyword allow-list, not a verdict: a claim worded
+in a way no pattern covers is missed, so the lists are kept broad and a clip
+matching none of them only skips its auditor in skip mode.
+
+FAST_RULES_MODE decides what the LLM still does:
+  off       no screening (default)
+  annotate  the LLM audits everything and decides the verdict; rule
+            findings are only noted in the report, not counted as issues
+  narrow    rule issues are reported as found, and the LLM is told about
+            them and only looks for others
+  skip      as narrow, and categories the rules decide skip the LLM: a
+            decisive violation fails the category, no screen wording at
+            all passes it (a false negative when the lists miss the wording)
+'''
+
+import os
+import re
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from backend.src.graph.state import ComplianceIssue
+from backend.src.graph.categories import CATEGORIES
+from backend.src.graph.chunking import format_seconds
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-fast-rules")
+
+FAST_RULES_MODE = os.getenv("FAST_RULES_MODE", "off").lower()
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data")
+FAST_RULES_PATH = os.getenv("FAST_RULES_PATH", os.path.join(DATA_FOLDER, "fast_rules.json"))
+
+MODES = ("off", "annotate", "narrow", "skip")
+FIELDS = ("transcript", "ocr")
+if FAST_RULES_MODE not in MODES:
+    logger.warning(f"Unknown FAST_RULES_MODE '{FAST_RULES_MODE}', using off")
+    FAST_RULES_MODE = "off"
+
+
+class PatternSet:
+    '''
+    A set of named regexes matched in one pass.
+    All patterns are compiled into a single alternation, so text that
+    matches none of them (the common case) is scanned once; only when the
+    combined pattern hits are the members checked one by one, since an
+    alternation reports one member per position.
+    '''
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self.patterns = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in patterns]
+        self._combined = re.compile(
+            "|".join(f"(?:{regex.pattern})" for _, regex in self.patterns), re.IGNORECASE
+        ) if self.patterns else None
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def search(self, text: str) -> bool:
+        return bool(self._combined and text and self._combined.search(text))
+
+    def matches(self, text: str) -> Dict[str, str]:
+        '''
+        {name: first matched text} for every member found in `text`
+        '''
+        if not self.search(text):
+            return {}
+        found = {}
+        for name, regex in self.patterns:
+            if name not in found:
+                match = regex.search(text)
+                if match:
+                    found[name] = match.group(0)
+        return found
+
+
+def _segments(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    '''
+    Timed transcript and OCR segments of the video; the plain transcript /
+    OCR lines (untimed) when Video Indexer gave no segments
+    '''
+    segments = [
+        {"field": "transcript", "start": segment.get("start"), "text": segment.get("text") or ""}
+        for segment in state.get("transcript_segments") or []
+    ] or [{"field": "transcript", "start": None, "text": state.get("transcript") or ""}]
+
+    seen = set()
+    ocr = [
+        {"field": "ocr", "start": segment.get("start"), "text": segment.get("text") or ""}
+        for segment in state.get("ocr_segments") or []
+    ] or [{"field": "ocr", "start": None, "text": text} for text in state.get("ocr_text") or []]
+    for segment in ocr:
+        #the same OCR line is usually visible for many instances in a row
+        if segment["text"] and segment["text"] not in seen:
+            seen.add(segment["text"])
+            segments.append(segment)
+    #in time order, so each rule reports its earliest occurrence
+    return sorted((segment for segment in segments if segment["text"]), key=lambda segment: segment["start"] or 0)
+
+
+class RuleSet:
+    '''
+    Compiled fast-path rules
+    '''
+
+    def __init__(self, config: Dict[str, Any], version: str):
+        self.version = version
+        self.names = {category["key"]: category["name"] for category in CATEGORIES}
+        self.rules = {}
+        for rule in config.get("rules", []):
+            if rule["category"] in self.names:
+                self.rules[rule["id"]] = rule
+            else:
+                logger.warning(f"Fast-path rule {rule['id']} has unknown category '{rule['category']}', ignored")
+
+        #one pattern set per field; a rule can be limited to some fields
+        def compiled(attr: str):
+            return {
+                field: PatternSet(
+                    (rule_id, pattern)
+                    for rule_id, rule in self.rules.items() if field in rule.get("fields", FIELDS)
+                    for pattern in rule.get(attr, [])
+                )
+                for field in FIELDS
+            }
+
+        self.patterns = compiled("patterns")
+        self.triggers = compiled("triggers")
+        #a disclosure anywhere (spoken or on screen) counts
+        self.required = {rule_id: PatternSet((rule_id, p) for p in rule.get("required", []))
+                         for rule_id, rule in self.rules.items() if rule.get("kind") == "missing"}
+        self.screens = {
+            key: PatternSet((key, pattern) for pattern in category.get("screen", []))
+            for key, category in config.get("categories", {}).items()
+        }
+
+    @classmethod
+    def load(cls, path: str = FAST_RULES_PATH) -> "RuleSet":
+        '''
+        Reads and compiles the rules file; a missing or invalid file gives an
+        empty rule set (the LLM then audits everything)
+        '''
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            config = json.loads(raw)
+            rule_set = cls(config, f"{config.get('version', '')}:{hashlib.sha256(raw).hexdigest()[:12]}")
+        except (OSError, ValueError, re.error) as e:
+            logger.warning(f"Fast-path rules not loaded from {path}: {e}")
+            return cls({}, "none")
+
+        missing = {rule.get("source") for rule in rule_set.rules.values()} - {None}
+        missing = {source for source in missing if not os.path.exists(os.path.join(DATA_FOLDER, source))}
+        if missing:
+            logger.warning(f"Fast-path rules cite documents not in backend/data: {sorted(missing)}")
+        logger.info(f"Loaded {len(rule_set.rules)} fast-path rules ({rule_set.version})")
+        return rule_set
+
+    def _issue(self, rule: Dict[str, Any], start: Optional[float], evidence: str) -> ComplianceIssue:
+        return {
+            "category": self.names[rule["category"]],
+            "severity": rule.get("severity", "MEDIUM"),
+            "description": f"{rule['description']} Found: \"{evidence}\" (rule {rule['id']}).",
+            "timestamp": format_seconds(start) if start is not None else None,
+        }
+
+    def screen(self, state: Dict[str, Any], categories: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        '''
+        Runs the rules over the transcript / OCR of `state`.
+
+        Returns {"version", "issues": {category_key: [ComplianceIssue]},
+        "decisions": {category_key: "fail" | "pass" | None}}: "fail" when a
+        decisive rule matched, "pass" when the category has screen patterns
+        and none of them matched (only acted on in skip mode), None when the
+        LLM still has to decide.
+        '''
+        keys = list(categories) if categories is not None else list(self.names)
+        segments = _segments(state)
+
+        #first occurrence of each rule / trigger, and which screens and
+        #disclosures were seen anywhere
+        hits: Dict[str, Tuple[Optional[float], str]] = {}
+        triggered: Dict[str, Tuple[Optional[float], str]] = {}
+        screened, disclosed = set(), set()
+        for segment in segments:
+            text, start = segment["text"], segment["start"]
+            for rule_id, evidence in self.patterns[segment["field"]].matches(text).items():
+                hits.setdefault(rule_id, (start, evidence))
+            for rule_id, evidence in self.triggers[segment["field"]].matches(text).items():
+                triggered.setdefault(rule_id, (start, evidence))
+            for key, patterns in self.screens.items():
+                if key not in screened and patterns.search(text):
+                    screened.add(key)
+            for rule_id, patterns in self.required.items():
+                if rule_id not in disclosed and patterns.search(text):
+                    disclosed.add(rule_id)
+
+        for rule_id in disclosed:
+            triggered.pop(rule_id, None)
+        found = {**hits, **triggered}
+
+        issues = {key: [] for key in keys}
+        decisions = {}
+        for rule_id, (start, evidence) in sorted(found.items(), key=lambda item: (item[1][0] or 0, item[0])):
+            rule = self.rules[rule_id]
+            if rule["category"] in issues:
+                issues[rule["category"]].append(self._issue(rule, start, evidence))
+        for key in keys:
+            if any(self.rules[rule_id].get("decisive") and self.rules[rule_id]["category"] == key for rule_id in found):
+                decisions[key] = "fail"
+            elif self.screens.get(key) and key not in screened:
+                decisions[key] = "pass"
+            else:
+                decisions[key] = None
+        return {"version": self.version, "issues": issues, "decisions": decisions}
+
+
+rule_set = RuleSet.load() if FAST_RULES_MODE != "off" else RuleSet({}, "none")
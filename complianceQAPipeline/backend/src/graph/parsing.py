@@ -0,0 +1,184 @@
+'''
+Structured-output parsing for the auditor LLM.
+
+JSONObjectExtractor finds the first balanced JSON object in the model output
+in one pass over the characters. It tracks strings and escapes, so braces
+inside strings, code fences and trailing prose do not confuse it. Text can be
+fed incrementally as tokens stream in; the object is available as soon as its
+closing brace arrives, so generation can stop there.
+
+validate_audit() then checks the object against the audit schema
+(ComplianceIssue items, PASS/FAIL status) and normalizes it. When either
+step fails, repair_json() tries a local fix (truncated output, trailing
+commas) before the caller falls back to a small LLM repair prompt.
+'''
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from backend.src.graph.chunking import SEVERITY_RANK
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class AuditOutputError(ValueError):
+    '''
+    The LLM output has no usable audit JSON
+    '''
+
+
+class JSONObjectExtractor:
+    '''
+    Incremental scanner for the first balanced top-level JSON object
+    '''
+
+    def __init__(self):
+        self.buffer = []
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.result: Optional[str] = None
+        #candidates that balanced but were not valid JSON (e.g. "{name}" in prose)
+        self.rejected: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, text: str) -> Optional[str]:
+        '''
+        Consumes more output; returns the object text once it is complete
+        '''
+        for char in text:
+            if self.done:
+                break
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self.stack = ["{"]
+                    self.buffer = [char]
+                continue
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.stack.append(char)
+            elif char in "}]":
+                if self.stack and _CLOSERS[self.stack[-1]] == char:
+                    self.stack.pop()
+                if not self.stack:
+                    self._candidate("".join(self.buffer))
+        return self.result
+
+    def _candidate(self, text: str):
+        try:
+            json.loads(text)
+            self.result = text
+        except json.JSONDecodeError:
+            self.rejected.append(text)
+            self._reset()
+
+    def _reset(self):
+        self.buffer, self.stack = [], []
+        self.in_string = self.escaped = self.started = False
+
+    def partial(self) -> Optional[str]:
+        '''
+        The unfinished object seen so far (for repairing truncated output)
+        '''
+        return "".join(self.buffer) if self.started and not self.done else None
+
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    '''
+    Parses the first balanced JSON object in text; raises AuditOutputError
+    '''
+    extractor = JSONObjectExtractor()
+    found = extractor.feed(text)
+    if found is None:
+        raise AuditOutputError("No JSON object found in LLM output")
+    return json.loads(found)
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    '''
+    Cheap local repair: closes a truncated object and drops trailing commas.
+    Returns the parsed object, or None if it still does not parse.
+    '''
+    extractor = JSONObjectExtractor()
+    extractor.feed(text)
+    candidates = [extractor.partial()] + extractor.rejected[:1]
+    for candidate in filter(None, candidates):
+        fixed = candidate
+        if candidate == extractor.partial():
+            if extractor.in_string:
+                fixed += '"'
+            fixed += "".join(_CLOSERS[opener] for opener in reversed(extractor.stack))
+        fixed = _TRAILING_COMMA.sub(r"\1", fixed)
+        try:
+            parsed = json.loads(fixed)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def validate_audit(data: Any) -> Dict[str, Any]:
+    '''
+    Checks the audit JSON against the ComplianceIssue schema and returns a
+    normalized copy (upper-case severity and status, string fields).
+    Raises AuditOutputError listing every problem found.
+    '''
+    if not isinstance(data, dict):
+        raise AuditOutputError(f"Expected a JSON object, got {type(data).__name__}")
+
+    problems = []
+    issues = data.get("compliance_results", [])
+    if not isinstance(issues, list):
+        problems.append("compliance_results must be a list")
+        issues = []
+
+    clean_issues = []
+    for index, issue in enumerate(issues):
+        if not isinstance(issue, dict):
+            problems.append(f"compliance_results[{index}] must be an object")
+            continue
+        missing = [field for field in ("category", "severity", "description") if not issue.get(field)]
+        if missing:
+            problems.append(f"compliance_results[{index}] is missing {missing}")
+            continue
+        severity = str(issue["severity"]).upper()
+        if severity not in SEVERITY_RANK:
+            problems.append(f"compliance_results[{index}].severity must be one of {list(SEVERITY_RANK)}")
+            continue
+        clean_issues.append({
+            "category": str(issue["category"]),
+            "severity": severity,
+            "description": str(issue["description"]),
+            "timestamp": str(issue["timestamp"]) if issue.get("timestamp") else None,
+        })
+
+    status = str(data.get("status", "")).upper()
+    if status not in ("PASS", "FAIL"):
+        problems.append('status must be "PASS" or "FAIL"')
+
+    if problems:
+        raise AuditOutputError("; ".join(problems))
+
+    return {
+        "compliance_results": clean_issues,
+        "status": status,
+        "final_report": str(data.get("final_report") or "No report generated"),
+    }
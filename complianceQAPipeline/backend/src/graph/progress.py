@@ -0,0 +1,43 @@
+'''
+Progress reporting and cancellation for a running graph.
+
+The API passes two optional hooks in the run config's "configurable" dict:
+  emit          - callable(event, **data) that publishes a progress event
+  cancel_event  - threading.Event set when the client kills the audit
+Nodes read them through the helpers below, so the graph still runs unchanged
+from main.py or any caller that passes neither.
+'''
+
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("brand-gaurdian-progress")
+
+
+def _configurable(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return (config or {}).get("configurable", {})
+
+
+def get_emitter(config: Optional[Dict[str, Any]]) -> Callable[..., None]:
+    '''
+    Returns the run's event publisher, or a no-op. Safe to call from any
+    thread; a failing publisher never breaks the audit.
+    '''
+    emit = _configurable(config).get("emit")
+    if emit is None:
+        return lambda event, **data: None
+
+    def safe_emit(event: str, **data):
+        try:
+            emit(event, **data)
+        except Exception as e:
+            logger.warning(f"Progress event {event} dropped: {e}")
+
+    return safe_emit
+
+
+def get_cancel_event(config: Optional[Dict[str, Any]]):
+    '''
+    The threading.Event that signals cancellation, if the caller passed one
+    '''
+    return _configurable(config).get("cancel_event")
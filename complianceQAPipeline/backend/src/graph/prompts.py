@@ -0,0 +1,194 @@
+'''
+Prompt templates for the auditor, compiled once per process.
+
+Every audit prompt is laid out so the longest possible head is identical
+across calls, which lets inference servers with prefix / KV caching (TGI 3+,
+vLLM with --enable-prefix-caching, llama.cpp) skip re-processing it:
+
+  system  : instructions + JSON schema             same for every call
+  user    : video metadata, transcript, OCR text   same for every branch and
+                                                   retry of one video
+            retrieved rules + category focus       varies per call
+            issues already found by the fast-path
+            rules (narrow mode)
+
+The system message is built once at compile time and reused as the same
+object, so its text is byte-identical on every request. Each template has a
+version hash that is part of the audit cache key.
+'''
+
+import os
+import hashlib
+import logging
+import threading
+from textwrap import dedent
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
+from dotenv import load_dotenv
+
+from backend.src.graph.categories import CATEGORIES
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-prompts")
+
+#send the shared prefix once at startup so the server has it cached
+LLM_PREFIX_WARMUP = os.getenv("LLM_PREFIX_WARMUP", "false").lower() == "true"
+
+AUDIT_INSTRUCTIONS = dedent("""
+    You are a senior brand compliance auditor.
+    You will receive the video metadata, its transcript and on-screen text
+    (OCR), followed by the OFFICIAL REGULATORY RULES that apply.
+    INSTRUCTIONS:
+    1. Analyze the transcript and OCR text.
+    2. Identify any violation of the rules.
+    3. Return strictly JSON in the following format:
+    {
+    "compliance_results": [
+        {
+            "category": "Claim Validation",
+            "severity": "CRITICAL",
+            "description": "Explanation of the violation..."
+        }
+    ],
+    "status": "FAIL",
+    "final_report": "Summary of findings..."
+    }
+
+    If no violations are found, set "status" to "PASS" and "compliance_results" to [].
+""").strip()
+
+VIDEO_BLOCK = dedent("""
+    VIDEO_METADATA: {video_metadata}
+    TRANSCRIPT: {transcript}
+    ON SCREEN TEXT (OCR): {ocr_text}
+""").strip()
+
+RULES_BLOCK = dedent("""
+    OFFICIAL REGULATORY RULES:
+    {rules}
+""").strip()
+
+FOCUS_BLOCK = dedent("""
+    FOCUS: Only report {name} issues - {focus}
+    Ignore every other kind of violation; other auditors cover them.
+    Use "{name}" as the category of every issue.
+""").strip()
+
+KNOWN_BLOCK = dedent("""
+    ALREADY FOUND by the automatic rule screen (do not report these again;
+    only report other violations, and PASS if there are none):
+    {issues}
+""").strip()
+
+REPAIR_INSTRUCTIONS = dedent("""
+    You repair malformed JSON produced by a compliance auditor.
+    Return only the corrected JSON object, with no other text, in this format:
+    {
+    "compliance_results": [
+        {"category": "...", "severity": "LOW | MEDIUM | HIGH | CRITICAL", "description": "..."}
+    ],
+    "status": "PASS | FAIL",
+    "final_report": "..."
+    }
+    Keep the findings of the original output; do not add new ones.
+""").strip()
+
+REPAIR_BLOCK = dedent("""
+    PROBLEM: {error}
+    ORIGINAL OUTPUT:
+    {output}
+""").strip()
+
+_REPAIR_SYSTEM_MESSAGE = SystemMessage(content=REPAIR_INSTRUCTIONS)
+
+
+def repair_messages(output: str, error: str) -> List[BaseMessage]:
+    '''
+    Small prompt that only fixes the JSON of a failed audit response; the
+    transcript and rules are not sent again
+    '''
+    return [_REPAIR_SYSTEM_MESSAGE, HumanMessage(content=REPAIR_BLOCK.format(error=error, output=output))]
+
+
+class PromptTemplate:
+    '''
+    A compiled prompt: fixed system prefix + variable user suffix
+    '''
+
+    def __init__(self, name: str, prefix: str, focus: Optional[str] = None):
+        self.name = name
+        self.prefix = prefix
+        self.focus = focus
+        self.system_message = SystemMessage(content=prefix)
+        self.version = hashlib.sha256(
+            "\x00".join([prefix, VIDEO_BLOCK, RULES_BLOCK, focus or "", KNOWN_BLOCK]).encode("utf-8")
+        ).hexdigest()[:12]
+
+    def render(self, rules: str, video_metadata: Any, transcript: str, ocr_text: Any,
+               known_issues: Optional[List[Dict[str, Any]]] = None) -> List[BaseMessage]:
+        '''
+        Messages for one audit call; only the user message is built per call.
+        known_issues (already found by the fast-path rules) go last, after
+        the shared prefix.
+        '''
+        parts = [
+            VIDEO_BLOCK.format(video_metadata=video_metadata, transcript=transcript, ocr_text=ocr_text),
+            RULES_BLOCK.format(rules=rules),
+        ]
+        if self.focus:
+            parts.append(self.focus)
+        if known_issues:
+            parts.append(KNOWN_BLOCK.format(issues="\n".join(
+                f"- [{issue['severity']}] {issue['description']}" for issue in known_issues
+            )))
+        return [self.system_message, HumanMessage(content="\n\n".join(parts))]
+
+
+class PromptRegistry:
+    '''
+    Named prompt templates, compiled once and shared by every audit
+    '''
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def compile(self):
+        '''
+        Builds the generic auditor template and one per compliance category
+        '''
+        templates = {"audit": PromptTemplate("audit", AUDIT_INSTRUCTIONS)}
+        for category in CATEGORIES:
+            name = f"audit:{category['key']}"
+            templates[name] = PromptTemplate(
+                name, AUDIT_INSTRUCTIONS,
+                focus=FOCUS_BLOCK.format(name=category["name"], focus=category["focus"])
+            )
+        with self._lock:
+            self._templates = templates
+        logger.info(f"Compiled {len(templates)} prompt templates")
+
+    def get(self, name: str) -> PromptTemplate:
+        if not self._templates:
+            self.compile()
+        return self._templates[name]
+
+    def for_category(self, category: Optional[Dict[str, Any]] = None) -> PromptTemplate:
+        return self.get(f"audit:{category['key']}" if category else "audit")
+
+    def prime(self, llm):
+        '''
+        Sends the shared system prefix with a one-token completion so a
+        prefix-caching server holds it before the first audit arrives
+        '''
+        template = self.get("audit")
+        try:
+            llm.invoke([template.system_message, HumanMessage(content="Reply with OK.")], max_tokens=1)
+            logger.info("Primed the LLM prefix cache")
+        except Exception as e:
+            logger.warning(f"Prefix cache warmup failed: {e}")
+
+
+prompt_registry = PromptRegistry()
+prompt_registry.compile()
@@ -22,15 +22,25 @@ class VideoAuditState(TypedDict):
     
     video_url: str
     video_id: str
+    #sha256 of the video bytes, keys the result caches
+    video_hash: Optional[str]
     
     #ingestion and extraction data
     video_path: Optional[str]
     video_metadata: Dict[str, Any]
     transcript: Optional[str]
     ocr_text: List[str]
+    #timed versions of the above: [{"start": sec, "end": sec, "text": str}]
+    transcript_segments: List[Dict[str, Any]]
+    ocr_segments: List[Dict[str, Any]]
     
     #analysis output
+    #fast-path rule screen: {"version", "issues": {category_key: [...]},
+    #"decisions": {category_key: "fail" | "pass" | None}}
+    rule_screen: Dict[str, Any]
     compliance_results: Annotated[List[ComplianceIssue], operator.add]
+    #one {"category", "status", "report"} entry per parallel auditor branch
+    category_reports: Annotated[List[Dict[str, Any]], operator.add]
     
     #final deliverables
     final_status: str #PASS | FAIL
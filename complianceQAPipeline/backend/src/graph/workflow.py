@@ -4,16 +4,33 @@ audit process.
 it connects the nodes using the stategraph from langgraph
 '''
 
+import os
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph,END
 from backend.src.graph.state import VideoAuditState
+from backend.src.graph.categories import CATEGORIES, enabled_categories
+from backend.src.graph.fast_rules import FAST_RULES_MODE
+from backend.src.graph.checkpoints import checkpointer
 from backend.src.graph.nodes import (
     index_video_node,
-    audio_content_node
+    aindex_video_node,
+    audio_content_node,
+    make_category_auditor,
+    make_screener,
+    aggregate_node
 )
+from backend.src.services.instrumentation import traced_node
+
+#fanout: one parallel auditor per compliance category + aggregator
+#single: the original one-prompt auditor
+AUDIT_GRAPH_MODE = os.getenv("AUDIT_GRAPH_MODE", "fanout").lower()
 
-def create_graph():
+def create_graph(mode=AUDIT_GRAPH_MODE, checkpointer=None):
     '''
-    Constructs and compiles the langgraph workflow
+    Constructs and compiles the langgraph workflow.
+    With a checkpointer, the state is saved after every step under the
+    run's thread_id (the session id), so the run can be resumed.
     
     Returns:
     Compiled Graph: runnable graph object for execution 
@@ -21,17 +38,45 @@ def create_graph():
     
     #initialize the graph with stateschema
     workflow = StateGraph(VideoAuditState)
-    #add nodes
-    workflow.add_node("indexer", index_video_node)
-    workflow.add_node("auditor", audio_content_node)
+    #add nodes (each runs in its own tracing span)
+    #sync and async implementations: graph.ainvoke / astream await the
+    #Video Indexer calls instead of blocking a thread on them
+    workflow.add_node("indexer", RunnableLambda(
+        traced_node("indexer", index_video_node),
+        afunc=traced_node("indexer", aindex_video_node),
+        name="indexer"
+    ))
     #define the entry point: indexer
     workflow.set_entry_point("indexer")
-    #define the edges
-    workflow.add_edge("indexer","auditor")
-    workflow.add_edge("auditor", END)
+
+    #deterministic rules run between the indexer and the auditors
+    audit_source = "indexer"
+    if FAST_RULES_MODE != "off":
+        categories = CATEGORIES if mode == "single" else enabled_categories()
+        workflow.add_node("screener", traced_node("screener", make_screener(categories)))
+        workflow.add_edge("indexer", "screener")
+        audit_source = "screener"
+
+    if mode == "single":
+        workflow.add_node("auditor", traced_node("auditor", audio_content_node))
+        #define the edges
+        workflow.add_edge(audit_source, "auditor")
+        workflow.add_edge("auditor", END)
+    else:
+        #the branches run in the same step, so wall-clock time is the slowest
+        #branch; the aggregator waits for all of them
+        branches = []
+        for category in enabled_categories():
+            name = f"auditor_{category['key']}"
+            workflow.add_node(name, traced_node(name, make_category_auditor(category)))
+            workflow.add_edge(audit_source, name)
+            branches.append(name)
+        workflow.add_node("aggregator", traced_node("aggregator", aggregate_node))
+        workflow.add_edge(branches, "aggregator")
+        workflow.add_edge("aggregator", END)
     
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     
     return app
 
-app = create_graph()
\ No newline at end of file
+app = create_graph(checkpointer=checkpointer)
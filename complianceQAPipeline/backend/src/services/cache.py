@@ -0,0 +1,280 @@
+'''
+Content-addressed result caches.
+
+Videos are identified by the SHA-256 of their bytes, so a re-uploaded cut hits
+the cache no matter what it is called. Two caches are kept:
+
+  extraction - Video Indexer output (transcript, OCR, metadata) by video hash
+               + uploaded proxy profile (or "original")
+  audit      - auditor output by video hash + rulebook version + prompt/model config
+
+Backends are selected with RESULT_CACHE_BACKEND (memory | sqlite | none).
+'''
+
+import os
+import glob
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from backend.src.services.retriever import load_index_manifest
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-cache")
+
+CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory").lower()
+CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+#the default does not depend on the directory the API or CLI is started from
+PROJECT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+CACHE_DB_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(PROJECT_FOLDER, ".cache", "results.sqlite3"))
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    '''
+    Streaming SHA-256 of a file (reads 1 MB at a time)
+    '''
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rulebook_version(explicit: bool = True) -> str:
+    '''
+    Identifies the rulebook the knowledge base was built from.
+    RULEBOOK_VERSION wins when set (and explicit is True), then the version
+    recorded by the last index_documents run; otherwise it is derived from
+    the name, size and mtime of the PDFs in backend/data.
+    '''
+    override = os.getenv("RULEBOOK_VERSION") if explicit else None
+    if override:
+        return override
+    indexed = load_index_manifest().get("version")
+    if indexed:
+        return indexed
+    digest = hashlib.sha256()
+    for pdf_path in sorted(glob.glob(os.path.join(DATA_FOLDER, "*.pdf"))):
+        stat = os.stat(pdf_path)
+        digest.update(f"{os.path.basename(pdf_path)}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:16]
+
+
+def make_key(*parts) -> str:
+    '''
+    Builds a cache key from arbitrary JSON-serializable parts
+    '''
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def evicted(self, count: int = 1):
+        with self._lock:
+            self.evictions += count
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryLRUCache:
+    '''
+    In-process LRU cache with a per-entry TTL
+    '''
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] < time.time():
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+        self.stats.record(entry is not None)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.evicted(evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    '''
+    On-disk cache (one SQLite table per cache name) shared across processes
+    and restarts. Values are stored as JSON; the least recently used rows are
+    evicted past max_entries.
+    '''
+
+    def __init__(self, name: str, path: str = CACHE_DB_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.name = name
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._table = f"cache_{name}"
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self._table}_accessed ON {self._table} (accessed_at)"
+        )
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] < now:
+                self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                self._conn.execute(
+                    f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+        self.stats.record(row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now + self.ttl_seconds, now)
+            )
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self._table} WHERE key IN "
+                    f"(SELECT key FROM {self._table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,)
+                )
+        if overflow > 0:
+            self.stats.evicted(overflow)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+
+class NullCache:
+    '''
+    Cache that never stores anything (RESULT_CACHE_BACKEND=none)
+    '''
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = CacheStats()
+
+    def get(self, key: str):
+        self.stats.record(False)
+        return None
+
+    def set(self, key: str, value):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+def create_cache(name: str, backend: str = CACHE_BACKEND):
+    '''
+    Builds the cache backend selected by RESULT_CACHE_BACKEND
+    '''
+    if backend == "sqlite":
+        return SQLiteCache(name)
+    if backend == "none":
+        return NullCache(name)
+    if backend != "memory":
+        logger.warning(f"Unknown RESULT_CACHE_BACKEND '{backend}', using memory")
+    return MemoryLRUCache(name)
+
+
+extraction_cache = create_cache("extraction")
+audit_cache = create_cache("audit")
+
+
+def cache_stats():
+    '''
+    Hit/miss metrics for every result cache
+    '''
+    return {
+        cache.name: {"entries": len(cache), **cache.stats.as_dict()}
+        for cache in (extraction_cache, audit_cache)
+    }
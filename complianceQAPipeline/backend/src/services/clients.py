@@ -0,0 +1,147 @@
+'''
+Process-wide client registry for the compliance pipeline.
+
+The embedding model, the LLM client and the vector store are expensive to build
+(model weights are loaded from disk, HTTP clients are created), so they are
+constructed once on first use and shared by every graph invocation.
+'''
+
+import os
+import logging
+import threading
+
+from langchain_huggingface import HuggingFaceEmbeddings
+from dotenv import load_dotenv
+
+from backend.src.services.retriever import create_vector_store, VECTOR_STORE_BACKEND
+from backend.src.services.embeddings import EmbeddingService
+from backend.src.services.llm import create_llm_client, LLM_CONFIG, LLM_MODEL
+from backend.src.services.retrieval_cache import CachedRetriever, RETRIEVAL_CACHE_ENABLED
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-clients")
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class ClientRegistry:
+    '''
+    Lazily builds and caches the shared clients.
+
+    Every getter is thread-safe: the first caller builds the client while
+    holding the lock, later callers get the cached instance without locking.
+    '''
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embeddings = None
+        self._llm = None
+        self._vector_store = None
+
+    def get_embeddings(self):
+        '''
+        Returns the shared embedding service (HuggingFace model behind a
+        micro-batching, caching EmbeddingService)
+        '''
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    logger.info(f"Loading embedding model {EMBEDDING_MODEL_NAME}")
+                    model = HuggingFaceEmbeddings(
+                        model_name=EMBEDDING_MODEL_NAME
+                    )
+                    self._embeddings = EmbeddingService(model, model_name=EMBEDDING_MODEL_NAME)
+        return self._embeddings
+
+    def get_llm(self):
+        '''
+        Returns the shared LLM client used by the auditor (backend selected
+        by LLM_BACKEND, see services/llm.py)
+        '''
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    logger.info(f"Initializing LLM client {LLM_MODEL}")
+                    self._llm = create_llm_client()
+        return self._llm
+
+    def get_vector_store(self):
+        '''
+        Returns the shared vector store (Azure AI Search or the local index,
+        see VECTOR_STORE_BACKEND), behind the retrieval cache unless
+        RETRIEVAL_CACHE=false
+        '''
+        if self._vector_store is None:
+            with self._lock:
+                if self._vector_store is None:
+                    embeddings = self.get_embeddings()
+                    logger.info(f"Initializing {VECTOR_STORE_BACKEND} vector store")
+                    vector_store = create_vector_store(embeddings)
+                    if RETRIEVAL_CACHE_ENABLED:
+                        vector_store = CachedRetriever(vector_store, embeddings)
+                    self._vector_store = vector_store
+        return self._vector_store
+
+    def warmup(self):
+        '''
+        Builds every client up front so the first audit does not pay for it.
+        Failures are logged, not raised: the getters retry on next use.
+        '''
+        for name, getter in (
+            ("embeddings", self.get_embeddings),
+            ("llm", self.get_llm),
+            ("vector_store", self.get_vector_store),
+        ):
+            try:
+                getter()
+            except Exception as e:
+                logger.error(f"Warmup failed for {name}: {e}")
+        #run one embedding so the model weights are actually paged in
+        if self._embeddings is not None:
+            try:
+                self._embeddings.model.embed_query("warmup")
+            except Exception as e:
+                logger.warning(f"Embedding warmup query failed: {e}")
+
+    def embedding_stats(self):
+        '''
+        Throughput and cache metrics of the embedding service
+        '''
+        if self._embeddings is None:
+            return {}
+        return self._embeddings.stats.as_dict()
+
+    def llm_stats(self):
+        '''
+        Request, coalescing and timeout metrics of the LLM client
+        '''
+        if self._llm is None or not hasattr(self._llm, "stats"):
+            return {}
+        return self._llm.stats.as_dict()
+
+    def retrieval_stats(self):
+        '''
+        Hit/miss metrics of the retrieval cache
+        '''
+        if not isinstance(self._vector_store, CachedRetriever):
+            return {}
+        return self._vector_store.stats()
+
+    def invalidate_retrieval_cache(self):
+        '''
+        Drops cached retrievals after the knowledge base was re-indexed
+        '''
+        if isinstance(self._vector_store, CachedRetriever):
+            self._vector_store.invalidate()
+
+    def reset(self):
+        '''
+        Drops every cached client (used by benchmarks and after config changes)
+        '''
+        with self._lock:
+            self._embeddings = None
+            self._llm = None
+            self._vector_store = None
+
+
+registry = ClientRegistry()
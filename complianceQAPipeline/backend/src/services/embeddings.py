@@ -0,0 +1,278 @@
+'''
+Batched, cached embedding service.
+
+Wraps a LangChain embedding model (HuggingFaceEmbeddings) and adds:
+  - micro-batching: concurrent embed_query calls are queued and embedded
+    together, up to EMBEDDING_BATCH_SIZE texts or EMBEDDING_MAX_WAIT_MS
+  - a persistent vector cache keyed by sha256(model + text) in SQLite, with
+    an in-memory LRU in front of it; the least recently used rows are
+    evicted past EMBEDDING_CACHE_MAX_ROWS
+  - throughput metrics (requests, cache hit rate, batches, texts/sec)
+
+It implements the LangChain Embeddings interface, so it can be passed
+anywhere the raw model was used (vector stores, the indexer).
+'''
+
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+
+from backend.src.services.cache import MemoryLRUCache
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-embeddings")
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "10"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "true").lower() == "true"
+#the default does not depend on the directory the API or CLI is started from
+PROJECT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(PROJECT_FOLDER, ".cache", "embeddings.sqlite3"))
+EMBEDDING_MEMORY_CACHE_SIZE = int(os.getenv("EMBEDDING_MEMORY_CACHE_SIZE", "4096"))
+#~1.5KB per row for a 384-dimension model
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+
+
+class EmbeddingStore:
+    '''
+    On-disk vector cache: one float32 blob per text hash, the least recently
+    used rows evicted past max_rows
+    '''
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL DEFAULT 0)"
+        )
+        #caches written before eviction existed have no access time
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")]
+        if "accessed_at" not in columns:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed_at)")
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: List[str]):
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            #stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time(), *(key for key, _ in rows)]
+                    )
+        return found
+
+    def put_many(self, items):
+        items = list(items)
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+            )
+            #a running count (replaced keys may overstate it) saves a COUNT(*)
+            #scan per write; it is re-read only when it crosses the limit, and
+            #eviction goes down to 90% so that happens once per many writes
+            self._rows += len(items)
+            if self._rows <= self.max_rows:
+                return
+            self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = self._rows - int(self.max_rows * 0.9)
+            if self._rows > self.max_rows:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self._rows -= overflow
+                logger.info(f"Evicted {overflow} embeddings from the on-disk cache")
+
+
+class EmbeddingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.texts_embedded = 0
+        self.model_seconds = 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "batches": self.batches,
+            "texts_embedded": self.texts_embedded,
+            "avg_batch_size": round(self.texts_embedded / self.batches, 2) if self.batches else 0.0,
+            "texts_per_second": round(self.texts_embedded / self.model_seconds, 2) if self.model_seconds else 0.0,
+        }
+
+
+class EmbeddingService(Embeddings):
+    '''
+    Micro-batching, caching front for an embedding model
+    '''
+
+    def __init__(
+        self,
+        model: Embeddings,
+        model_name: str,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        cache_enabled: bool = EMBEDDING_CACHE_ENABLED,
+        cache_path: str = EMBEDDING_CACHE_PATH
+    ):
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = EmbeddingStats()
+        self._memory = MemoryLRUCache("embeddings", max_entries=EMBEDDING_MEMORY_CACHE_SIZE)
+        self._store: Optional[EmbeddingStore] = EmbeddingStore(cache_path) if cache_enabled else None
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    #caching
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]):
+        found = {}
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                found[key] = vector
+        missing = [key for key in keys if key not in found]
+        if self._store is not None and missing:
+            from_disk = self._store.get_many(missing)
+            for key, vector in from_disk.items():
+                self._memory.set(key, vector)
+            found.update(from_disk)
+        unique = len(set(keys))
+        self.stats.add(cache_hits=len(found), cache_misses=unique - len(found))
+        return found
+
+    def _remember(self, items):
+        for key, vector in items:
+            self._memory.set(key, vector)
+        if self._store is not None:
+            self._store.put_many(items)
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.model.embed_documents(texts)
+        self.stats.add(
+            batches=1,
+            texts_embedded=len(texts),
+            model_seconds=time.perf_counter() - start
+        )
+        return vectors
+
+    #micro-batching
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+                    self._worker.start()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            #identical queries in the same window are embedded once
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                vectors = dict(zip(texts, self._embed_uncached(texts)))
+                self._remember([(self._key(text), vector) for text, vector in vectors.items()])
+                for text, _, future in batch:
+                    future.set_result(vectors[text])
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    #Embeddings interface
+
+    def embed_query(self, text: str) -> List[float]:
+        '''
+        Embeds one text; concurrent callers are batched together
+        '''
+        self.stats.add(requests=1)
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            return cached[key]
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((text, key, future))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        '''
+        Embeds many texts; cached ones are served from the store and the rest
+        are embedded directly in batches of batch_size
+        '''
+        self.stats.add(requests=1)
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(keys)
+        missing = list(dict.fromkeys(
+            (key, text) for key, text in zip(keys, texts) if key not in vectors
+        ))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            embedded = self._embed_uncached([text for _, text in batch])
+            items = [(key, vector) for (key, _), vector in zip(batch, embedded)]
+            self._remember(items)
+            vectors.update(items)
+        return [vectors[key] for key in keys]
@@ -0,0 +1,167 @@
+'''
+OpenTelemetry spans and metrics for the audit pipeline.
+
+Only the OpenTelemetry API is used here, so instrumented code costs next to
+nothing until backend/src/api/telemetry.py installs providers and exporters
+(Azure Monitor, OTLP, console or Prometheus).
+
+Spans:
+  graph.node <name>      every LangGraph node (indexer, auditor_*, aggregator)
+  vi.<call>              every Video Indexer / ARM call, and proxy transcodes
+
+Metrics:
+  graph.node.duration    histogram per node (seconds)
+  vi.polls               status checks made by the shared poller, by state
+  vi.proxy.bytes_saved   upload bytes saved by proxy transcoding
+  llm.tokens             prompt / completion tokens sent to the LLM backend
+  audit.queue_depth      queued audits             (observable, see observe())
+  audit.in_flight        running audits            (observable)
+  cache.requests         result / retrieval / embedding cache hits and misses
+'''
+
+import time
+import inspect
+import contextlib
+import functools
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from opentelemetry import trace, metrics
+from opentelemetry.metrics import Observation
+from opentelemetry.trace import Status, StatusCode
+
+tracer = trace.get_tracer("brand-guardian")
+meter = metrics.get_meter("brand-guardian")
+
+node_duration = meter.create_histogram(
+    "graph.node.duration", unit="s", description="Wall-clock time of one LangGraph node"
+)
+vi_polls = meter.create_counter(
+    "vi.polls", description="Video Indexer status checks made by the shared poller"
+)
+llm_tokens = meter.create_counter(
+    "llm.tokens", description="Tokens sent to and generated by the LLM backend"
+)
+proxy_bytes_saved = meter.create_counter(
+    "vi.proxy.bytes_saved", unit="By", description="Upload bytes saved by proxy transcoding"
+)
+llm_audits_skipped = meter.create_counter(
+    "audit.llm.skipped", description="Audit LLM calls avoided by the fast-path rule screen"
+)
+
+
+def _fail(span, error: Exception):
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+def traced(name: str):
+    '''
+    Decorator: runs the function inside a span called `name`
+    '''
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(name, record_exception=False, set_status_on_exception=False) as span:
+                    try:
+                        return await fn(*args, **kwargs)
+                    except Exception as e:
+                        _fail(span, e)
+                        raise
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, record_exception=False, set_status_on_exception=False) as span:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    _fail(span, e)
+                    raise
+        return wrapper
+    return decorator
+
+
+def traced_node(name: str, node: Callable) -> Callable:
+    '''
+    Wraps a LangGraph node (plain or async function) in a span and records
+    its duration. Nodes that take a `config` argument keep receiving it.
+    '''
+    @contextlib.contextmanager
+    def span():
+        start = time.perf_counter()
+        with tracer.start_as_current_span(
+            f"graph.node {name}", attributes={"graph.node": name},
+            record_exception=False, set_status_on_exception=False
+        ) as node_span:
+            try:
+                yield node_span
+            except Exception as e:
+                _fail(node_span, e)
+                raise
+            finally:
+                node_duration.record(time.perf_counter() - start, {"graph.node": name})
+
+    def finish(node_span, result):
+        errors = (result or {}).get("errors")
+        if errors:
+            node_span.set_status(Status(StatusCode.ERROR, "; ".join(map(str, errors))))
+        return result
+
+    def run(state, config=None):
+        with span() as node_span:
+            return finish(node_span, node(state, config) if takes_config else node(state))
+
+    async def arun(state, config=None):
+        with span() as node_span:
+            return finish(node_span, await (node(state, config) if takes_config else node(state)))
+
+    takes_config = "config" in inspect.signature(node).parameters
+    if inspect.iscoroutinefunction(node):
+        if takes_config:
+            async def wrapper(state, config):
+                return await arun(state, config)
+        else:
+            async def wrapper(state):
+                return await arun(state)
+    elif takes_config:
+        def wrapper(state, config):
+            return run(state, config)
+    else:
+        def wrapper(state):
+            return run(state)
+    wrapper.__name__ = getattr(node, "__name__", name)
+    return wrapper
+
+
+def record_llm_usage(backend: str, message, prompt_text: str = ""):
+    '''
+    Counts the tokens of one LLM response: the backend's usage metadata when
+    it reports it, otherwise a ~4 characters per token estimate.
+    Returns (prompt_tokens, completion_tokens).
+    '''
+    usage = getattr(message, "usage_metadata", None) or {}
+    estimated = not usage
+    prompt_tokens = usage.get("input_tokens") or len(prompt_text) // 4
+    completion_tokens = usage.get("output_tokens") or len(str(getattr(message, "content", ""))) // 4
+    attributes = {"llm.backend": backend, "llm.estimated": estimated}
+    llm_tokens.add(prompt_tokens, {**attributes, "llm.token_type": "prompt"})
+    llm_tokens.add(completion_tokens, {**attributes, "llm.token_type": "completion"})
+    return prompt_tokens, completion_tokens
+
+
+def observe(name: str, description: str, callback: Callable[[], Iterable[Tuple[float, Dict[str, Any]]]],
+            kind: str = "gauge"):
+    '''
+    Registers an observable instrument read at export time. `callback`
+    returns (value, attributes) pairs; kind is "gauge" or "counter"
+    (monotonic running totals).
+    '''
+    def observations(options):
+        try:
+            return [Observation(value, attributes) for value, attributes in callback()]
+        except Exception:
+            return []
+
+    create = meter.create_observable_counter if kind == "counter" else meter.create_observable_gauge
+    return create(name, callbacks=[observations], description=description)
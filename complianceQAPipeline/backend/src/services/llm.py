@@ -0,0 +1,426 @@
+'''
+LLM backends for the auditor.
+
+LLM_BACKEND selects the chat model:
+  hf     - Hugging Face Inference endpoint (default, what the deployment uses)
+  openai - any OpenAI-compatible server (vLLM, TGI, llama.cpp, Ollama) at
+           LLM_BASE_URL
+  fake   - deterministic offline stand-in for tests, benchmarks and load tests
+
+Every backend is wrapped in an LLMClient that:
+  - caps the number of calls in flight (LLM_MAX_CONCURRENCY, per backend)
+  - applies a timeout to every call (LLM_TIMEOUT_SECONDS)
+  - coalesces concurrent invoke() calls: requests arriving within
+    LLM_BATCH_WINDOW_MS are collected, identical prompts are sent once, and
+    backends with a native batch call get the whole group in one request.
+    Only the fake backend has one. The hf and openai chat APIs take one
+    conversation per request, so for them only identical prompts coalesce;
+    distinct prompts go out as separate concurrent calls (up to
+    LLM_MAX_CONCURRENCY), which servers like vLLM or TGI batch on their side
+  - streams stream() calls straight from the backend, whatever the window;
+    a caller asking for a prompt that is already streaming waits for that
+    stream and gets its text as a single chunk instead of a second call
+
+The trade-off: a streamed prompt never waits for the batch window and never
+joins a batch, so it gets its first token (and the auditor its complete JSON
+object) sooner, but only concurrent identical prompts share its backend
+call. Backends that batch natively (fake) answer stream() through invoke()
+and keep batching.
+'''
+
+import os
+import json
+import time
+import queue
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+from langchain_openai import ChatOpenAI
+from dotenv import load_dotenv
+
+from backend.src.services.instrumentation import record_llm_usage
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-llm")
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "hf").lower()
+DEFAULT_MODELS = {
+    "hf": "Qwen/Qwen2.5-14B-Instruct",
+    "openai": "Qwen/Qwen2.5-14B-Instruct",
+    "fake": "fake-auditor",
+}
+#hosted endpoints are rate limited, local servers batch on their side
+DEFAULT_CONCURRENCY = {"hf": 4, "openai": 16, "fake": 64}
+
+LLM_MODEL = os.getenv("LLM_MODEL", DEFAULT_MODELS.get(LLM_BACKEND, DEFAULT_MODELS["hf"]))
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:8000/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", str(DEFAULT_CONCURRENCY.get(LLM_BACKEND, 4))))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "5"))
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "16"))
+#simulated latency of the fake backend, per call (a batch counts as one call)
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+
+#generation settings; also part of the audit cache key
+LLM_CONFIG = {
+    "backend": LLM_BACKEND,
+    "model": LLM_MODEL,
+    "temperature": 0,
+    "max_new_tokens": 2000,
+}
+
+#keyword -> (category, severity, description) used by the fake backend
+FAKE_RULES = [
+    ("guarantee", "Claim Validation", "HIGH", "Absolute guarantee of results without substantiation."),
+    ("cure", "Claim Validation", "CRITICAL", "Health cure claim without substantiation."),
+    ("100%", "Claim Validation", "MEDIUM", "Absolute performance claim."),
+    ("link in bio", "Influencer Disclosure", "MEDIUM", "Affiliate link promoted without a clear disclosure."),
+    ("free", "Influencer Disclosure", "LOW", "Free product mentioned without disclosing the material connection."),
+    ("skip", "YouTube Ad Specs", "LOW", "Ad copy references skipping, check the ad format requirements."),
+]
+
+
+class FakeAuditChatModel(BaseChatModel):
+    '''
+    Deterministic offline auditor: flags FAKE_RULES keywords found in the
+    user message, honouring the category focus of fan-out prompts.
+    Supports native batching (one simulated latency per batch).
+    '''
+
+    latency_s: float = LLM_FAKE_LATENCY_MS / 1000
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-audit"
+
+    @staticmethod
+    def respond(messages: List[BaseMessage]) -> str:
+        system = str(messages[0].content) if messages else ""
+        text = str(messages[-1].content) if messages else ""
+        if "repair malformed JSON" in system:
+            return json.dumps({"compliance_results": [], "status": "PASS", "final_report": "Repaired."})
+
+        #only the video part of the prompt is audited, not the rules
+        video_text = text.split("OFFICIAL REGULATORY RULES:")[0].lower()
+        focus = None
+        if "FOCUS: Only report " in text:
+            focus = text.split("FOCUS: Only report ", 1)[1].split(" issues", 1)[0]
+        issues = [
+            {"category": category, "severity": severity, "description": description}
+            for keyword, category, severity, description in FAKE_RULES
+            if keyword in video_text and focus in (None, category)
+        ]
+        return json.dumps({
+            "compliance_results": issues,
+            "status": "FAIL" if issues else "PASS",
+            "final_report": f"Fake audit found {len(issues)} issue(s)."
+        })
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.respond(messages)))])
+
+    def batch_generate(self, batch: List[List[BaseMessage]]) -> List[AIMessage]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return [AIMessage(content=self.respond(messages)) for messages in batch]
+
+
+def create_chat_model(backend: str = LLM_BACKEND) -> BaseChatModel:
+    '''
+    Builds the chat model selected by LLM_BACKEND
+    '''
+    if backend == "fake":
+        return FakeAuditChatModel()
+    if backend == "openai":
+        return ChatOpenAI(
+            base_url=LLM_BASE_URL,
+            api_key=os.getenv("LLM_API_KEY", "not-needed"),
+            model=LLM_MODEL,
+            temperature=LLM_CONFIG["temperature"],
+            max_tokens=LLM_CONFIG["max_new_tokens"],
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=1
+        )
+    if backend != "hf":
+        logger.warning(f"Unknown LLM_BACKEND '{backend}', using hf")
+    endpoint = HuggingFaceEndpoint(
+        repo_id=LLM_MODEL,
+        temperature=LLM_CONFIG["temperature"],
+        max_new_tokens=LLM_CONFIG["max_new_tokens"],
+        timeout=int(LLM_TIMEOUT_SECONDS)
+    )
+    return ChatHuggingFace(llm=endpoint)
+
+
+class LLMStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.backend_calls = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "backend_calls": self.backend_calls,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class LLMClient:
+    '''
+    Concurrency-limited, coalescing front for a chat model
+    '''
+
+    def __init__(
+        self,
+        model: BaseChatModel,
+        backend: str = LLM_BACKEND,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        batch_window_ms: float = LLM_BATCH_WINDOW_MS,
+        max_batch_size: int = LLM_MAX_BATCH_SIZE
+    ):
+        self.model = model
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.stats = LLMStats()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"llm-{backend}")
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        #prompt key -> Future of the text, for prompts currently streaming
+        self._streams = {}
+        self._streams_lock = threading.Lock()
+
+    @property
+    def supports_batching(self) -> bool:
+        #only FakeAuditChatModel: hf and openai have no multi-prompt chat call
+        return hasattr(self.model, "batch_generate")
+
+    #backend calls
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            self.stats.add(timeouts=1)
+            raise TimeoutError(f"No free {self.backend} LLM slot after {self.timeout}s")
+
+    def _call(self, fn, *args, **kwargs):
+        self._acquire_slot()
+        self.stats.add(backend_calls=1, in_flight=1)
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            self.stats.add(errors=1)
+            raise
+        finally:
+            self.stats.add(in_flight=-1)
+            self._slots.release()
+
+    def _record_usage(self, messages, message):
+        prompt_tokens, completion_tokens = record_llm_usage(
+            self.backend, message, "".join(str(m.content) for m in messages)
+        )
+        self.stats.add(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def _dispatch(self, group):
+        #identical prompts in the window share one backend call
+        unique = {}
+        for key, messages, future in group:
+            unique.setdefault(key, (messages, []))[1].append(future)
+        self.stats.add(batches=1, coalesced=len(group) - len(unique))
+
+        def settle(futures, result=None, error=None):
+            for future in futures:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        if self.supports_batching:
+            entries = list(unique.values())
+
+            def run_batch():
+                try:
+                    results = self._call(self.model.batch_generate, [messages for messages, _ in entries])
+                    for (messages, futures), result in zip(entries, results):
+                        self._record_usage(messages, result)
+                        settle(futures, result)
+                except Exception as e:
+                    for _, futures in entries:
+                        settle(futures, error=e)
+
+            self._executor.submit(run_batch)
+            return
+
+        for messages, futures in unique.values():
+            def run_one(messages=messages, futures=futures):
+                try:
+                    result = self._call(self.model.invoke, messages)
+                    self._record_usage(messages, result)
+                    settle(futures, result)
+                except Exception as e:
+                    settle(futures, error=e)
+
+            self._executor.submit(run_one)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._coalesce_loop, name="llm-coalescer", daemon=True)
+                    self._worker.start()
+
+    def _coalesce_loop(self):
+        while True:
+            group = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(group) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    group.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(group)
+
+    #chat model interface used by the auditor
+
+    @staticmethod
+    def _prompt_key(messages: List[BaseMessage], **kwargs: Any) -> str:
+        return hashlib.sha256(
+            json.dumps([[[message.type, message.content] for message in messages], kwargs],
+                       sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def invoke(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        '''
+        Runs one prompt through the coalescer. Extra generation kwargs
+        (e.g. max_tokens) bypass it and go straight to the backend.
+        '''
+        self.stats.add(requests=1)
+        if kwargs or self.batch_window <= 0:
+            result = self._call(self.model.invoke, messages, **kwargs)
+            self._record_usage(messages, result)
+            return result
+
+        key = self._prompt_key(messages)
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((key, messages, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            self.stats.add(timeouts=1)
+            raise TimeoutError(f"{self.backend} LLM call timed out after {self.timeout}s")
+
+    def stream(self, messages: List[BaseMessage], **kwargs: Any):
+        '''
+        Streams one completion, holding a concurrency slot until the stream
+        is closed. If the same prompt is already streaming, waits for it and
+        yields the text that stream produced (up to where its caller closed
+        it) as a single chunk. Backends that batch natively, or cannot
+        stream, answer through invoke() as a single chunk.
+        '''
+        if self.supports_batching or not hasattr(self.model, "stream"):
+            yield AIMessageChunk(content=self.invoke(messages, **kwargs).content)
+            return
+
+        key = self._prompt_key(messages, **kwargs)
+        with self._streams_lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                self._streams[key] = Future()
+        if shared is not None:
+            self.stats.add(requests=1, coalesced=1)
+            try:
+                content = shared.result(timeout=self.timeout)
+            except TimeoutError:
+                self.stats.add(timeouts=1)
+                raise TimeoutError(f"{self.backend} LLM call timed out after {self.timeout}s")
+            yield AIMessageChunk(content=content)
+            return
+
+        self.stats.add(requests=1)
+        #merged chunks, for the token count and the waiting callers (the caller may stop early)
+        received = None
+        error = None
+        try:
+            self._acquire_slot()
+        except TimeoutError as e:
+            self._finish_stream(key, error=e)
+            raise
+        self.stats.add(backend_calls=1, batches=1, in_flight=1)
+        deadline = time.monotonic() + self.timeout
+        try:
+            for chunk in self.model.stream(messages, **kwargs):
+                received = chunk if received is None else received + chunk
+                yield chunk
+                if time.monotonic() > deadline:
+                    self.stats.add(timeouts=1)
+                    raise TimeoutError(f"{self.backend} LLM stream exceeded {self.timeout}s")
+        except TimeoutError as e:
+            error = e
+            raise
+        except Exception as e:
+            error = e
+            self.stats.add(errors=1)
+            raise
+        finally:
+            self.stats.add(in_flight=-1)
+            self._slots.release()
+            if received is not None:
+                self._record_usage(messages, received)
+            self._finish_stream(key, "" if received is None else str(received.content), error)
+
+    def _finish_stream(self, key: str, content: str = "", error: Exception = None):
+        '''
+        Hands a finished stream's text (or error) to the callers waiting on it
+        '''
+        with self._streams_lock:
+            future = self._streams.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(content)
+
+
+def create_llm_client(backend: str = LLM_BACKEND) -> LLMClient:
+    '''
+    The configured chat model behind an LLMClient
+    '''
+    logger.info(f"Initializing {backend} LLM backend ({LLM_MODEL}, "
+                f"{LLM_MAX_CONCURRENCY} concurrent, {LLM_TIMEOUT_SECONDS}s timeout)")
+    return LLMClient(create_chat_model(backend), backend=backend)
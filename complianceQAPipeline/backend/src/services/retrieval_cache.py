@@ -0,0 +1,211 @@
+'''
+Retrieval result cache in front of the vector store.
+
+Audits of near-identical transcripts (same script, different edits) run the
+same rule lookup again and again. CachedRetriever wraps the vector store and
+caches the top-k documents of each query, keyed on
+
+    (sha256 of the normalized query, knowledge base version, k, search kwargs)
+
+Entries live in a bounded in-memory LRU. The knowledge base version comes
+from the index manifest (never the RULEBOOK_VERSION override, which names the
+rulebook rather than the index), so a re-index (index_documents.py) changes
+every key and drops the old entries, in this process or any other. Any write
+to the manifest, including the per-file saves in the middle of a re-index,
+also reloads the store and empties the cache.
+
+With RETRIEVAL_CACHE_SEMANTIC_THRESHOLD set (cosine, e.g. 0.97), a miss on
+the exact key also checks the embeddings of recently cached queries and
+reuses the result of the closest one above the threshold.
+'''
+
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from dotenv import load_dotenv
+
+from backend.src.services.cache import MemoryLRUCache, CacheStats, make_key, rulebook_version
+from backend.src.services.retriever import INDEX_MANIFEST_PATH
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-retrieval-cache")
+
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE", "true").lower() == "true"
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2048"))
+RETRIEVAL_CACHE_TTL_SECONDS = int(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", str(24 * 3600)))
+#0 disables the near-duplicate lookup
+RETRIEVAL_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_SEMANTIC_THRESHOLD", "0"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    '''
+    Canonical form of a query: unicode-normalized, case-folded, punctuation
+    dropped, whitespace collapsed
+    '''
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _manifest_mtime() -> Optional[float]:
+    try:
+        return os.stat(INDEX_MANIFEST_PATH).st_mtime
+    except OSError:
+        return None
+
+
+class SemanticIndex:
+    '''
+    Embeddings and results of the most recently cached queries, for
+    near-duplicate lookup. Only queries with the same shape (k + search
+    kwargs) can match each other.
+    '''
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, shape: str, vector: List[float], docs: List[dict]):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        with self._lock:
+            self._entries[key] = (shape, vector / norm if norm else vector, docs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def nearest(self, shape: str, vector: List[float], threshold: float):
+        '''
+        Results of the most similar cached query at or above threshold, or None
+        '''
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+        with self._lock:
+            candidates = [entry for entry in self._entries.values() if entry[0] == shape]
+        if not candidates:
+            return None
+        scores = np.stack([entry[1] for entry in candidates]) @ (query / norm)
+        best = int(np.argmax(scores))
+        return candidates[best][2] if scores[best] >= threshold else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedRetriever:
+    '''
+    Vector store wrapper with a retrieval result cache on similarity_search.
+    Every other attribute is passed through to the wrapped store; writes
+    through it (add_texts, add_embeddings, delete) invalidate the cache.
+    '''
+
+    def __init__(
+        self,
+        vector_store,
+        embeddings=None,
+        max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = RETRIEVAL_CACHE_TTL_SECONDS,
+        semantic_threshold: float = RETRIEVAL_CACHE_SEMANTIC_THRESHOLD
+    ):
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.semantic_threshold = semantic_threshold if embeddings is not None else 0
+        self.cache = MemoryLRUCache("retrieval", max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.semantic = SemanticIndex(max_entries) if self.semantic_threshold else None
+        self.semantic_stats = CacheStats()
+        self._version = None
+        self._manifest_mtime = None
+        self._version_lock = threading.Lock()
+
+    def index_version(self) -> str:
+        '''
+        Current knowledge base version; re-read only when the manifest changes.
+        Any manifest change empties the cache and reloads a store that keeps
+        its index in memory, so the cache is not refilled from the old index:
+        the version only moves at the end of a re-index, the chunks change
+        file by file before that.
+        '''
+        mtime = _manifest_mtime()
+        if self._version is None or mtime != self._manifest_mtime:
+            with self._version_lock:
+                if self._version is None or mtime != self._manifest_mtime:
+                    #the manifest version, or the PDFs when there is no manifest yet
+                    version = rulebook_version(explicit=False)
+                    if self._version is not None:
+                        logger.info(f"Knowledge base changed ({self._version} -> {version}), clearing retrieval cache")
+                        refresh = getattr(self.vector_store, "refresh", None)
+                        if refresh is not None:
+                            refresh()
+                        self.invalidate()
+                    self._version = version
+                    self._manifest_mtime = mtime
+        return self._version
+
+    def invalidate(self):
+        self.cache.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        normalized = normalize_query(query)
+        shape = make_key(self.index_version(), k, kwargs)
+        key = make_key(hashlib.sha256(normalized.encode("utf-8")).hexdigest(), shape)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return [Document(**doc) for doc in cached]
+
+        query_vector = None
+        if self.semantic is not None:
+            #the raw query, so the store's own embedding of it is a cache hit
+            query_vector = self.embeddings.embed_query(query)
+            near = self.semantic.nearest(shape, query_vector, self.semantic_threshold)
+            self.semantic_stats.record(near is not None)
+            if near is not None:
+                logger.info("Retrieval cache: near-duplicate query hit")
+                return [Document(**doc) for doc in near]
+
+        docs = self.vector_store.similarity_search(query, k=k, **kwargs)
+        entries = [
+            {"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata}
+            for doc in docs
+        ]
+        self.cache.set(key, entries)
+        if self.semantic is not None:
+            self.semantic.add(key, shape, query_vector, entries)
+        return docs
+
+    def add_texts(self, *args, **kwargs):
+        self.invalidate()
+        return self.vector_store.add_texts(*args, **kwargs)
+
+    def add_embeddings(self, *args, **kwargs):
+        self.invalidate()
+        return self.vector_store.add_embeddings(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self.invalidate()
+        return self.vector_store.delete(*args, **kwargs)
+
+    def stats(self):
+        stats = {"entries": len(self.cache), "version": self._version, **self.cache.stats.as_dict()}
+        if self.semantic is not None:
+            stats["semantic"] = {"threshold": self.semantic_threshold, **self.semantic_stats.as_dict()}
+        return stats
+
+    def __getattr__(self, name):
+        return getattr(self.vector_store, name)
@@ -0,0 +1,368 @@
+'''
+Pluggable vector store backends for the rulebook knowledge base.
+
+VECTOR_STORE_BACKEND selects the backend:
+  azure - Azure AI Search (default, what the deployment uses)
+  local - in-process NumPy index stored on disk, no network round-trip
+
+The local index keeps one row of L2-normalized float32 embeddings per chunk
+in `embeddings.npy`, memory-mapped at load time, next to a JSON file holding
+the chunk ids, text and metadata. Search is either exact (one matrix-vector
+product) or approximate (IVF: k-means centroids, only the closest lists are
+scanned), selected with LOCAL_INDEX_SEARCH.
+
+A store notices when another process (index_documents.py) rewrites the
+index files and reloads them before its next search.
+'''
+
+import os
+import json
+import uuid
+import logging
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_community.vectorstores import AzureSearch
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-retriever")
+
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "azure").lower()
+#the indexer script and the API find the same files whatever directory they
+#are started from
+PROJECT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join(PROJECT_FOLDER, ".cache", "vector_index"))
+#exact | ivf
+LOCAL_INDEX_SEARCH = os.getenv("LOCAL_INDEX_SEARCH", "exact").lower()
+#number of IVF lists scanned per query
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "4"))
+KMEANS_ITERATIONS = 10
+
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.json"
+CENTROIDS_FILE = "ivf_centroids.npy"
+ASSIGNMENTS_FILE = "ivf_assignments.npy"
+
+#written by backend/scripts/index_documents.py: file hashes, chunk ids, version
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(PROJECT_FOLDER, ".cache", "index_manifest.json"))
+
+
+def load_index_manifest(path: str = INDEX_MANIFEST_PATH) -> dict:
+    '''
+    Returns the indexer manifest, or an empty one if the index was never built
+    '''
+    if not os.path.exists(path):
+        return {"version": None, "files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_index_manifest(manifest: dict, path: str = INDEX_MANIFEST_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+#(matrix, documents, centroids, assignments) of a store with no index on disk
+_EMPTY_INDEX = (None, {"ids": [], "texts": [], "metadatas": []}, None, None)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    '''
+    Indices of the k highest scores, best first
+    '''
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorStore(VectorStore):
+    '''
+    In-process vector store backed by a memory-mapped NumPy matrix
+    '''
+
+    def __init__(self, embedding: Embeddings, path: str = LOCAL_INDEX_PATH, search_type: str = LOCAL_INDEX_SEARCH):
+        self.embedding = embedding
+        self.path = path
+        self.search_type = search_type
+        self._lock = threading.RLock()
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self):
+        return len(self._ids)
+
+    #persistence
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _stamp(self):
+        #documents.json is replaced last when the index is rewritten
+        try:
+            stat = os.stat(self._file(DOCUMENTS_FILE))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self):
+        '''
+        (matrix, docs, centroids, assignments) from disk; None when the files
+        are unreadable or do not match (caught in the middle of a rewrite)
+        '''
+        if not os.path.exists(self._file(EMBEDDINGS_FILE)):
+            return _EMPTY_INDEX
+        try:
+            matrix = np.load(self._file(EMBEDDINGS_FILE), mmap_mode="r")
+            with open(self._file(DOCUMENTS_FILE), "r", encoding="utf-8") as f:
+                docs = json.load(f)
+            centroids = assignments = None
+            if os.path.exists(self._file(CENTROIDS_FILE)):
+                centroids = np.load(self._file(CENTROIDS_FILE))
+                assignments = np.load(self._file(ASSIGNMENTS_FILE))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read local vector index at {self.path}: {e}")
+            return None
+        if len(matrix) != len(docs["ids"]):
+            return None
+        return matrix, docs, centroids, assignments
+
+    def _load(self):
+        with self._lock:
+            stamp = self._stamp()
+            loaded = self._read()
+            if loaded is None:
+                #keep serving what is loaded; the next search tries again
+                self._loaded_stamp = None
+                if hasattr(self, "_ids"):
+                    return
+                loaded, stamp = _EMPTY_INDEX, None
+            self._matrix, docs, self._centroids, self._assignments = loaded
+            self._ids = list(docs["ids"])
+            self._texts = list(docs["texts"])
+            self._metadatas = list(docs["metadatas"])
+            self._loaded_stamp = stamp
+            if self._matrix is not None:
+                logger.info(f"Loaded local vector index: {len(self._ids)} chunks from {self.path}")
+
+    def refresh(self) -> bool:
+        '''
+        Reloads the index if its files changed on disk since they were
+        loaded (a re-index by another process). Returns True if it did.
+        '''
+        if self._stamp() == self._loaded_stamp:
+            return False
+        with self._lock:
+            if self._stamp() == self._loaded_stamp:
+                return False
+            logger.info(f"Local vector index at {self.path} changed on disk, reloading")
+            self._load()
+        return True
+
+    def _save(self, matrix, ids, texts, metadatas):
+        #write to temp files then rename, so readers never see a half-written index
+        os.makedirs(self.path, exist_ok=True)
+        tmp_embeddings = self._file(EMBEDDINGS_FILE + ".tmp.npy")
+        tmp_documents = self._file(DOCUMENTS_FILE + ".tmp")
+        np.save(tmp_embeddings, matrix)
+        with open(tmp_documents, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f)
+        os.replace(tmp_embeddings, self._file(EMBEDDINGS_FILE))
+        os.replace(tmp_documents, self._file(DOCUMENTS_FILE))
+        #the IVF lists no longer match the matrix
+        for name in (CENTROIDS_FILE, ASSIGNMENTS_FILE):
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+        self._load()
+
+    def _current_matrix(self):
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(self._matrix)
+
+    #writes
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_embeddings(zip(texts, vectors), metadatas=list(metadatas), keys=list(ids))
+
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        keys: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        '''
+        Adds chunks whose embeddings were already computed (same signature
+        as AzureSearch.add_embeddings). Like Azure, an existing key is
+        replaced rather than duplicated.
+        '''
+        text_embeddings = list(text_embeddings)
+        if not text_embeddings:
+            return []
+        texts = [text for text, _ in text_embeddings]
+        vectors = _normalize(np.asarray([vector for _, vector in text_embeddings], dtype=np.float32))
+        metadatas = list(metadatas or [{} for _ in texts])
+        keys = list(keys or [str(uuid.uuid4()) for _ in texts])
+        with self._lock:
+            replaced = set(keys)
+            keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in replaced]
+            matrix = self._current_matrix()[keep]
+            matrix = vectors if matrix.size == 0 else np.vstack([matrix, vectors])
+            self._save(
+                matrix,
+                [self._ids[i] for i in keep] + keys,
+                [self._texts[i] for i in keep] + texts,
+                [self._metadatas[i] for i in keep] + metadatas
+            )
+        return keys
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        drop = set(ids)
+        with self._lock:
+            keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in drop]
+            if len(keep) == len(self._ids):
+                return False
+            if not keep:
+                for name in (EMBEDDINGS_FILE, DOCUMENTS_FILE, CENTROIDS_FILE, ASSIGNMENTS_FILE):
+                    if os.path.exists(self._file(name)):
+                        os.remove(self._file(name))
+                self._load()
+                return True
+            self._save(
+                self._current_matrix()[keep],
+                [self._ids[i] for i in keep],
+                [self._texts[i] for i in keep],
+                [self._metadatas[i] for i in keep]
+            )
+        return True
+
+    #approximate search
+
+    def build_ivf(self, n_lists: Optional[int] = None, seed: int = 0):
+        '''
+        Clusters the embeddings with spherical k-means and stores the
+        centroids and list assignments next to the index
+        '''
+        with self._lock:
+            matrix = self._current_matrix()
+            if matrix.size == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(len(matrix))))
+            n_lists = min(n_lists, len(matrix))
+            rng = np.random.default_rng(seed)
+            centroids = matrix[rng.choice(len(matrix), n_lists, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                assignments = np.argmax(matrix @ centroids.T, axis=1)
+                for c in range(n_lists):
+                    members = matrix[assignments == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+            assignments = np.argmax(matrix @ centroids.T, axis=1)
+            np.save(self._file(CENTROIDS_FILE), centroids)
+            np.save(self._file(ASSIGNMENTS_FILE), assignments)
+            self._centroids, self._assignments = centroids, assignments
+            logger.info(f"Built IVF index with {n_lists} lists over {len(matrix)} chunks")
+
+    #reads
+
+    def _search_vector(self, query_vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        self.refresh()
+        with self._lock:
+            matrix = self._matrix
+            centroids, assignments = self._centroids, self._assignments
+        if matrix is None or len(matrix) == 0:
+            return []
+
+        if self.search_type == "ivf":
+            if centroids is None:
+                self.build_ivf()
+                centroids, assignments = self._centroids, self._assignments
+            probes = _top_k(centroids @ query_vector, LOCAL_INDEX_NPROBE)
+            candidates = np.flatnonzero(np.isin(assignments, probes))
+            scores = np.asarray(matrix[candidates]) @ query_vector
+            return [(int(candidates[i]), float(scores[i])) for i in _top_k(scores, k)]
+
+        scores = np.asarray(matrix @ query_vector)
+        return [(int(i), float(scores[i])) for i in _top_k(scores, k)]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        query_vector = _normalize(np.asarray(embedding, dtype=np.float32))
+        return [
+            (Document(id=self._ids[i], page_content=self._texts[i], metadata=self._metadatas[i]), score)
+            for i, score in self._search_vector(query_vector, k)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
+
+
+def create_vector_store(embeddings: Embeddings, backend: str = VECTOR_STORE_BACKEND):
+    '''
+    Builds the vector store selected by VECTOR_STORE_BACKEND
+    '''
+    if backend == "local":
+        logger.info(f"Using local vector index at {LOCAL_INDEX_PATH} ({LOCAL_INDEX_SEARCH} search)")
+        return LocalVectorStore(embedding=embeddings)
+    if backend != "azure":
+        logger.warning(f"Unknown VECTOR_STORE_BACKEND '{backend}', using azure")
+    logger.info("Using Azure AI Search vector store")
+    return AzureSearch(
+        azure_search_endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
+        azure_search_key=os.getenv("AZURE_SEARCH_API_KEY"),
+        index_name=os.getenv("AZURE_SEARCH_INDEX_NAME"),
+        embedding_function=embeddings.embed_query
+    )
@@ -0,0 +1,164 @@
+'''
+Proxy transcoding before upload to Video Indexer.
+
+Compliance only needs the speech and readable on-screen text, so instead of
+sending ProRes / 4K masters as-is, ffmpeg can first produce a small proxy
+(lower resolution and frame rate, mono speech-rate audio) that is uploaded
+in its place. Transcodes run as ffmpeg subprocesses, at most
+VI_PROXY_WORKERS at a time.
+
+VI_PROXY_PROFILE selects the profile ("off" disables the stage):
+  720p   1280x720 max, 15 fps - default when enabled, keeps small text readable
+  540p   960x540 max, 12 fps
+  480p   854x480 max, 10 fps  - smallest, for talking-head content
+VI_PROXY_PROFILES (JSON, {"name": {...}}) adds or overrides profiles.
+
+The original is uploaded instead when ffmpeg is missing or fails, when the
+file is below VI_PROXY_MIN_BYTES, or when the proxy would not be smaller.
+'''
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from backend.src.services.instrumentation import traced, proxy_bytes_saved
+
+load_dotenv()
+logger = logging.getLogger("brand-gaurdian-transcode")
+
+VI_PROXY_PROFILE = os.getenv("VI_PROXY_PROFILE", "off").lower()
+VI_PROXY_WORKERS = int(os.getenv("VI_PROXY_WORKERS", str(max((os.cpu_count() or 2) // 2, 1))))
+#smaller files are uploaded as they are
+VI_PROXY_MIN_BYTES = int(os.getenv("VI_PROXY_MIN_BYTES", str(50 * 1024 * 1024)))
+#proxies bigger than this fraction of the original are discarded
+VI_PROXY_MAX_RATIO = float(os.getenv("VI_PROXY_MAX_RATIO", "0.9"))
+VI_PROXY_TIMEOUT = float(os.getenv("VI_PROXY_TIMEOUT", "1800"))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+PROXY_TEMP_DIR = os.getenv("AUDIT_TEMP_DIR") or tempfile.gettempdir()
+
+#16 kHz mono is what speech recognition works at anyway
+PROFILES = {
+    "720p": {"height": 720, "fps": 15, "crf": 28, "preset": "veryfast", "audio_bitrate": "48k", "audio_rate": 16000},
+    "540p": {"height": 540, "fps": 12, "crf": 30, "preset": "veryfast", "audio_bitrate": "40k", "audio_rate": 16000},
+    "480p": {"height": 480, "fps": 10, "crf": 32, "preset": "veryfast", "audio_bitrate": "32k", "audio_rate": 16000},
+}
+for _name, _profile in json.loads(os.getenv("VI_PROXY_PROFILES") or "{}").items():
+    PROFILES[_name] = {**PROFILES["720p"], **_profile}
+
+
+def build_ffmpeg_command(source: str, target: str, profile: Dict[str, Any], ffmpeg: str = FFMPEG_BIN) -> List[str]:
+    '''
+    ffmpeg arguments for one proxy: H.264 video scaled down to the profile
+    height (never up), reduced frame rate, AAC mono audio
+    '''
+    return [
+        ffmpeg, "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+        "-i", source,
+        "-map", "0:v:0?", "-map", "0:a:0?",
+        "-vf", f"scale=-2:'min({profile['height']},ih)',fps={profile['fps']}",
+        "-c:v", "libx264", "-preset", profile["preset"], "-crf", str(profile["crf"]), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-ac", "1", "-ar", str(profile["audio_rate"]), "-b:a", profile["audio_bitrate"],
+        "-movflags", "+faststart",
+        target,
+    ]
+
+
+class ProxyTranscoder:
+    '''
+    Runs proxy transcodes as ffmpeg subprocesses on a bounded worker pool
+    '''
+
+    def __init__(self, profile: str = VI_PROXY_PROFILE, max_workers: int = VI_PROXY_WORKERS,
+                 min_bytes: int = VI_PROXY_MIN_BYTES, ffmpeg: str = FFMPEG_BIN):
+        self.profile = profile
+        self.max_workers = max_workers
+        self.min_bytes = min_bytes
+        self.ffmpeg = ffmpeg
+        self._executor = None
+        self._lock = threading.Lock()
+        self._available = None
+
+    @property
+    def enabled(self) -> bool:
+        if self.profile == "off":
+            return False
+        if self.profile not in PROFILES:
+            logger.warning(f"Unknown VI_PROXY_PROFILE '{self.profile}', uploading originals")
+            self.profile = "off"
+            return False
+        if self._available is None:
+            self._available = shutil.which(self.ffmpeg) is not None
+            if not self._available:
+                logger.warning(f"{self.ffmpeg} not found, proxy transcoding disabled")
+        return self._available
+
+    def submit(self, source: str, profile: Optional[str] = None) -> Future:
+        '''
+        Queues a transcode. The future resolves with the proxy info
+        ({path, profile, source_bytes, proxy_bytes, seconds}), or None when
+        the original should be uploaded; the caller deletes the proxy file.
+        '''
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ffmpeg")
+        #the caller's context goes along, so the transcode span nests under its node
+        return self._executor.submit(contextvars.copy_context().run, self.transcode, source, profile or self.profile)
+
+    @traced("vi.transcode")
+    def transcode(self, source: str, profile: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        '''
+        Transcodes `source` in the calling thread (see submit)
+        '''
+        profile = profile or self.profile
+        source_bytes = os.path.getsize(source)
+        if source_bytes < self.min_bytes:
+            return None
+
+        os.makedirs(PROXY_TEMP_DIR, exist_ok=True)
+        fd, target = tempfile.mkstemp(prefix="proxy_", suffix=".mp4", dir=PROXY_TEMP_DIR)
+        os.close(fd)
+        started = time.perf_counter()
+        try:
+            subprocess.run(
+                build_ffmpeg_command(source, target, PROFILES[profile], self.ffmpeg),
+                check=True, capture_output=True, timeout=VI_PROXY_TIMEOUT
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            stderr = getattr(e, "stderr", None)
+            detail = stderr.decode(errors="replace").strip()[-500:] if stderr else e
+            logger.warning(f"Proxy transcode of {source} failed, uploading the original: {detail}")
+            os.remove(target)
+            return None
+
+        seconds = time.perf_counter() - started
+        proxy_bytes = os.path.getsize(target)
+        if proxy_bytes > source_bytes * VI_PROXY_MAX_RATIO:
+            logger.info(f"Proxy of {source} saves too little ({proxy_bytes}/{source_bytes} bytes), uploading the original")
+            os.remove(target)
+            return None
+
+        proxy_bytes_saved.add(source_bytes - proxy_bytes, {"vi.proxy_profile": profile})
+        logger.info(
+            f"Proxy {profile} of {source}: {source_bytes / 1e6:.1f} MB -> {proxy_bytes / 1e6:.1f} MB in {seconds:.1f}s"
+        )
+        return {
+            "path": target,
+            "profile": profile,
+            "source_bytes": source_bytes,
+            "proxy_bytes": proxy_bytes,
+            "seconds": round(seconds, 2),
+        }
+
+
+proxy_transcoder = ProxyTranscoder()
@@ -0,0 +1,265 @@
+'''
+Adaptive, shared status poller for Azure Video Indexer.
+
+One background thread tracks every in-flight video and decides when to check
+each of them next. The checks themselves are coroutines
+(AsyncVideoIndexerService.get_index) run on the event loop of the caller
+waiting for the video, so they proceed concurrently and one slow or
+throttled call does not hold up the others:
+  - starts with a short interval so short clips are picked up quickly
+  - backs off using the reported processingProgress (estimated time left)
+    or, without progress, geometrically up to a maximum
+  - adds jitter so many videos uploaded together do not poll in lockstep
+  - fails the wait once the overall deadline is exceeded
+
+When VI_CALLBACK_URL is set, Video Indexer calls our /vi/callback endpoint on
+state changes; notify() then wakes the poller immediately and polling only
+acts as a slow safety net.
+'''
+
+import os
+import time
+import heapq
+import asyncio
+import random
+import logging
+import threading
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+from backend.src.services.instrumentation import vi_polls
+
+load_dotenv()
+logger = logging.getLogger("Video-indexer-poller")
+
+POLL_INITIAL_INTERVAL = float(os.getenv("VI_POLL_INITIAL_INTERVAL", "5"))
+POLL_MAX_INTERVAL = float(os.getenv("VI_POLL_MAX_INTERVAL", "60"))
+POLL_BACKOFF_FACTOR = float(os.getenv("VI_POLL_BACKOFF_FACTOR", "1.5"))
+POLL_JITTER = float(os.getenv("VI_POLL_JITTER", "0.2"))
+PROCESSING_TIMEOUT = float(os.getenv("VI_PROCESSING_TIMEOUT", "1800"))
+#interval used as a safety net when VI reports state changes via callback
+CALLBACK_FALLBACK_INTERVAL = float(os.getenv("VI_CALLBACK_FALLBACK_INTERVAL", "120"))
+CALLBACK_URL = os.getenv("VI_CALLBACK_URL")
+#consecutive failed status checks tolerated before giving up on a video
+MAX_POLL_ERRORS = int(os.getenv("VI_POLL_MAX_ERRORS", "5"))
+
+
+def parse_progress(vi_json):
+    '''
+    Returns processingProgress as a float in [0, 100], or None if not reported
+    '''
+    for video in vi_json.get("videos", []):
+        progress = video.get("processingProgress")
+        if progress:
+            try:
+                return float(str(progress).rstrip("%"))
+            except ValueError:
+                return None
+    return None
+
+
+def next_interval(interval, progress, elapsed, max_interval=POLL_MAX_INTERVAL):
+    '''
+    Computes the delay before the next status check.
+
+    With progress p% after `elapsed` seconds, the remaining time is estimated
+    as elapsed * (100 - p) / p and we check again after half of it. Without
+    progress the previous interval grows by POLL_BACKOFF_FACTOR.
+    '''
+    if progress and 0 < progress < 100 and elapsed > 0:
+        remaining = elapsed * (100 - progress) / progress
+        delay = remaining / 2
+    else:
+        delay = interval * POLL_BACKOFF_FACTOR
+    delay = min(max(delay, POLL_INITIAL_INTERVAL), max_interval)
+    return delay * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+
+class _Watch:
+    def __init__(self, service, video_id, deadline, on_progress, loop):
+        self.service = service
+        self.video_id = video_id
+        self.loop = loop
+        #a status check is in flight; notify() asks for another one after it
+        self.checking = False
+        self.recheck = False
+        self.future = Future()
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline
+        self.interval = POLL_INITIAL_INTERVAL
+        self.next_due = self.started
+        self.on_progress = on_progress
+        self.polls = 0
+        self.errors = 0
+
+
+class SharedPoller:
+    '''
+    Schedules status checks for many in-flight videos from one thread
+    '''
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._watches = {}
+        self._heap = []
+        self._thread = None
+
+    def watch(self, service, video_id, timeout=PROCESSING_TIMEOUT, on_progress=None, loop=None) -> Future:
+        '''
+        Starts tracking video_id. `service.get_index` is a coroutine run on
+        `loop` (default: the running loop). The returned future resolves with
+        the index JSON once processed, or raises on failure / timeout.
+        '''
+        watch = _Watch(service, video_id, timeout, on_progress, loop or asyncio.get_running_loop())
+        with self._cond:
+            self._watches[video_id] = watch
+            heapq.heappush(self._heap, (watch.next_due, video_id))
+            self._ensure_thread()
+            self._cond.notify()
+        return watch.future
+
+    def notify(self, video_id, state=None):
+        '''
+        Called from the VI callback endpoint: check this video right away
+        '''
+        with self._cond:
+            watch = self._watches.get(video_id)
+            if watch is None:
+                return False
+            logger.info(f"Callback for {video_id} (state {state}), checking now")
+            if watch.checking:
+                watch.recheck = True
+                return True
+            watch.next_due = time.monotonic()
+            heapq.heappush(self._heap, (watch.next_due, video_id))
+            self._cond.notify()
+            return True
+
+    def cancel(self, video_id):
+        '''
+        Stops tracking video_id; its future is cancelled
+        '''
+        with self._cond:
+            watch = self._watches.pop(video_id, None)
+        if watch is None:
+            return False
+        logger.info(f"Stopped watching {video_id} after {watch.polls} status checks")
+        return watch.future.cancel()
+
+    @property
+    def in_flight(self) -> int:
+        with self._cond:
+            return len(self._watches)
+
+    def _ensure_thread(self):
+        #caller holds the lock
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="vi-poller", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                due = self._pop_due()
+                while not due:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout=timeout)
+                    due = self._pop_due()
+            for watch in due:
+                self._dispatch(watch)
+
+    def _pop_due(self):
+        #caller holds the lock; drops stale heap entries left by notify()
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, video_id = heapq.heappop(self._heap)
+            watch = self._watches.get(video_id)
+            if watch is not None and when == watch.next_due and not watch.checking and watch not in due:
+                watch.checking = True
+                due.append(watch)
+        return due
+
+    def _dispatch(self, watch):
+        try:
+            asyncio.run_coroutine_threadsafe(self._check(watch), watch.loop)
+        except RuntimeError as e:
+            #the waiting caller's loop is gone
+            self._finish(watch, error=e)
+
+    def _finish(self, watch, result=None, error=None):
+        with self._cond:
+            self._watches.pop(watch.video_id, None)
+        #cancel() may have won the race
+        if not watch.future.set_running_or_notify_cancel():
+            return
+        if error is not None:
+            watch.future.set_exception(error)
+        else:
+            watch.future.set_result(result)
+
+    async def _check(self, watch):
+        try:
+            await self._check_once(watch)
+        except Exception as e:
+            logger.error(f"Status check for {watch.video_id} crashed: {e}")
+            self._finish(watch, error=e)
+
+    async def _check_once(self, watch):
+        now = time.monotonic()
+        if now > watch.deadline:
+            self._finish(watch, error=TimeoutError(
+                f"Video {watch.video_id} not processed after {int(now - watch.started)}s"
+            ))
+            return
+
+        try:
+            data = await watch.service.get_index(watch.video_id)
+            watch.errors = 0
+        except Exception as e:
+            watch.errors += 1
+            logger.warning(f"Status check for {watch.video_id} failed ({watch.errors}/{MAX_POLL_ERRORS}): {e}")
+            if watch.errors >= MAX_POLL_ERRORS:
+                self._finish(watch, error=e)
+                return
+            data = {}
+        watch.polls += 1
+
+        state = data.get("state")
+        vi_polls.add(1, {"vi.state": state or "error"})
+        if state == "Processed":
+            logger.info(f"Video {watch.video_id} processed after {watch.polls} status checks")
+            self._finish(watch, result=data)
+            return
+        elif state == "Failed":
+            self._finish(watch, error=Exception("Video Indexing Failed in Azure"))
+            return
+        elif state == "Quarantined":
+            self._finish(watch, error=Exception("Video Quarantined (Copyright/ Content Policy Violation)"))
+            return
+
+        progress = parse_progress(data)
+        if watch.on_progress and progress is not None:
+            try:
+                watch.on_progress(progress)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+
+        elapsed = now - watch.started
+        max_interval = CALLBACK_FALLBACK_INTERVAL if CALLBACK_URL else POLL_MAX_INTERVAL
+        watch.interval = next_interval(watch.interval, progress, elapsed, max_interval)
+        #never sleep past the deadline
+        watch.interval = min(watch.interval, max(watch.deadline - now, 0))
+        logger.info(f"Status {state} ({progress}%) for {watch.video_id} ...........next check in {watch.interval:.1f}s")
+
+        with self._cond:
+            watch.checking = False
+            if watch.video_id in self._watches:
+                watch.next_due = time.monotonic() + (0 if watch.recheck else watch.interval)
+                watch.recheck = False
+                heapq.heappush(self._heap, (watch.next_due, watch.video_id))
+                self._cond.notify()
+
+
+shared_poller = SharedPoller()
@@ -1,57 +1,417 @@
 '''
 Connector: Python and Azure video indexer
+
+AsyncVideoIndexerService does the work as coroutines on one shared
+connection pool per event loop (httpx, HTTP/2 when the h2 package is
+installed) with the async Azure credential, so many audits waiting on Video
+Indexer cost coroutines rather than threads. VideoIndexerService is the
+blocking API on top of it: its calls run on one background event loop
+shared by every thread.
 '''
 
 import os
 import time
+import json
+import base64
+import asyncio
 import logging
-import requests
+import threading
+import contextvars
+import weakref
+from urllib.parse import urlsplit, urlunsplit
+from concurrent.futures import CancelledError, Future
+import httpx
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+except ImportError:  # pragma: no cover - HTTP/1.1 keep-alive only
+    h2 = None
 # import yt_dlp
-from azure.identity import DefaultAzureCredential
+from azure.core.credentials import AccessToken
+from azure.identity.aio import DefaultAzureCredential
 from dotenv import load_dotenv
 
+from backend.src.services.vi_poller import shared_poller, PROCESSING_TIMEOUT, CALLBACK_URL
+from backend.src.services.instrumentation import traced
+
 load_dotenv(override=True)
 logger = logging.getLogger("Video-indexer")
+#httpx logs every request URL at INFO, access tokens and SAS signatures included
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ARM_SCOPE = "https://management.azure.com/.default"
+#refresh tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN = int(os.getenv("VI_TOKEN_REFRESH_MARGIN", "300"))
+#VI account tokens are valid for one hour; used when the expiry cannot be read
+VI_TOKEN_DEFAULT_TTL = 3600
+HTTP_POOL_SIZE = int(os.getenv("VI_HTTP_POOL_SIZE", "32"))
+HTTP_MAX_RETRIES = int(os.getenv("VI_HTTP_MAX_RETRIES", "3"))
+#seconds to wait for a response (uploads of large files included)
+HTTP_TIMEOUT = float(os.getenv("VI_HTTP_TIMEOUT", "300"))
+HTTP2_ENABLED = os.getenv("VI_HTTP2", "true").lower() == "true"
+#bytes read from disk per upload chunk
+UPLOAD_CHUNK_SIZE = int(os.getenv("VI_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+#statuses retried with backoff: 429 on any call (the request was not
+#accepted), server errors only on idempotent ones
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "DELETE", "HEAD", "OPTIONS"}
+
+#point the service at the offline emulator (backend/scripts/vi_emulator.py),
+#e.g. http://localhost:8090; ARM and Video Indexer calls then go there and no
+#Azure credential is needed
+VI_EMULATOR_URL = os.getenv("VI_EMULATOR_URL", "").rstrip("/")
+VI_API_BASE = VI_EMULATOR_URL or "https://api.videoindexer.ai"
+ARM_API_BASE = f"{VI_EMULATOR_URL}/arm" if VI_EMULATOR_URL else "https://management.azure.com"
+
+if HTTP2_ENABLED and h2 is None:
+    logger.warning("VI_HTTP2 needs the h2 package (httpx[http2]), using HTTP/1.1")
+
+
+def multipart_file_body(field: str, path: str, size: int, content_type: str = "application/octet-stream"):
+    '''
+    Request kwargs for a multipart/form-data body holding one file, streamed
+    from disk. The file is opened and read in a worker thread, chunk by
+    chunk, so the event loop shared by every audit never waits on the disk.
+    '''
+    boundary = os.urandom(16).hex()
+    filename = os.path.basename(path).replace('"', "%22")
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    async def content():
+        yield head
+        video_file = await asyncio.to_thread(open, path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(video_file.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await asyncio.to_thread(video_file.close)
+        yield tail
+
+    return {
+        "content": content(),
+        "headers": {
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(len(head) + size + len(tail)),
+        },
+    }
+
+
+class _LoopResources:
+    '''
+    Objects bound to one event loop: the HTTP client (its connection pool),
+    the Azure credential (its own transport) and the token refresh locks
+    '''
 
-class VideoIndexerService:
     def __init__(self):
-        self.account_id = os.getenv("AZURE_VI_ACCOUNT_ID")
-        self.location = os.getenv("AZURE_VI_LOCATION")
-        self.subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
-        self.resource_group = os.getenv("AZURE_RESOURCE_GROUP")
-        self.vi_name = os.getenv("AZURE_VI_NAME")
-        self.credential = DefaultAzureCredential()
-        
-    def get_access_token(self):
+        transport = httpx.AsyncHTTPTransport(
+            http2=HTTP2_ENABLED and h2 is not None,
+            retries=HTTP_MAX_RETRIES,
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+        )
+        self.client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(HTTP_TIMEOUT, connect=10))
+        self.credential = EmulatorCredential() if VI_EMULATOR_URL else DefaultAzureCredential()
+        self.arm_lock = asyncio.Lock()
+        self.vi_lock = asyncio.Lock()
+
+
+_loop_resources = weakref.WeakKeyDictionary()
+_loop_resources_lock = threading.Lock()
+
+
+def _resources() -> _LoopResources:
+    loop = asyncio.get_running_loop()
+    with _loop_resources_lock:
+        resources = _loop_resources.get(loop)
+        if resources is None:
+            resources = _loop_resources[loop] = _LoopResources()
+    return resources
+
+
+def get_http_client() -> httpx.AsyncClient:
+    '''
+    Returns the process-wide async client of the running event loop, used for
+    every Azure call. Keeps connections alive (and multiplexed over HTTP/2)
+    between calls and retries failed connects; status retries are done in
+    AsyncVideoIndexerService._vi_request.
+    '''
+    return _resources().client
+
+
+_io_loop = None
+_io_loop_lock = threading.Lock()
+
+
+def _get_io_loop():
+    global _io_loop
+    if _io_loop is None:
+        with _io_loop_lock:
+            if _io_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="vi-io", daemon=True).start()
+                _io_loop = loop
+    return _io_loop
+
+
+def run_sync(coro):
+    '''
+    Runs a coroutine on the shared background event loop and blocks until it
+    is done. The caller's context (current span) goes with it.
+    '''
+    loop = _get_io_loop()
+    if threading.current_thread().name == "vi-io":
+        coro.close()
+        raise RuntimeError("run_sync called from the Video Indexer event loop, await the coroutine instead")
+    future = Future()
+
+    def done(task):
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def start():
+        loop.create_task(coro).add_done_callback(done)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return future.result()
+
+
+def _jwt_expiry(token):
+    '''
+    Reads the "exp" claim of a JWT without verifying it. Returns None if the
+    token cannot be decoded.
+    '''
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload)).get("exp"))
+    except Exception:
+        return None
+
+
+def parse_vi_time(value):
+    '''
+    Converts a VI timestamp ("0:01:02.5") to seconds
+    '''
+    try:
+        seconds = 0.0
+        for part in str(value).split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _timed_segments(insight):
+    '''
+    Expands a transcript/OCR insight into one {start, end, text} per instance
+    '''
+    text = insight.get("text")
+    instances = insight.get("instances") or [{}]
+    return [
+        {
+            "start": parse_vi_time(instance.get("adjustedStart", instance.get("start", 0))),
+            "end": parse_vi_time(instance.get("adjustedEnd", instance.get("end", 0))),
+            "text": text,
+        }
+        for instance in instances
+    ]
+
+
+def validate_video_url(video_url):
+    '''
+    Checks that a URL can be handed to Video Indexer (which downloads it
+    itself): an absolute http(s) URL, e.g. a blob URL with a SAS token.
+    Returns it stripped; raises ValueError otherwise.
+    '''
+    video_url = (video_url or "").strip()
+    parts = urlsplit(video_url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"Not an http(s) video URL: {redact_url(video_url)}")
+    return video_url
+
+
+def redact_url(video_url):
+    '''
+    The URL without its query string, for logs: SAS tokens are credentials
+    '''
+    parts = urlsplit(video_url or "")
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+class TokenCache:
+    '''
+    Cache for the ARM token and the Video Indexer account token, shared by
+    every thread and event loop.
+
+    Both tokens are reused until TOKEN_REFRESH_MARGIN seconds before they
+    expire, then refreshed by the first caller while the others wait on the
+    lock, so concurrent audits share one token instead of each minting their own.
+    '''
+
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._arm_token = None
+        self._arm_expires_on = 0.0
+        self._vi_tokens = {}
+
+    def _fresh(self, expires_on):
+        return time.time() < expires_on - self.refresh_margin
+
+    async def get_arm_token(self):
+        if self._arm_token and self._fresh(self._arm_expires_on):
+            return self._arm_token
+        resources = _resources()
+        async with resources.arm_lock:
+            if not (self._arm_token and self._fresh(self._arm_expires_on)):
+                token_object = await resources.credential.get_token(ARM_SCOPE)
+                self._arm_token = token_object.token
+                self._arm_expires_on = float(token_object.expires_on)
+                logger.info("Refreshed ARM access token")
+            return self._arm_token
+
+    async def get_vi_token(self, key, fetch):
+        '''
+        Returns the cached VI account token for `key`, awaiting `fetch()` to
+        mint a new one when it is missing or about to expire.
+        '''
+        cached = self._vi_tokens.get(key)
+        if cached and self._fresh(cached[1]):
+            return cached[0]
+        #separate lock so a slow exchange does not block ARM token readers
+        async with _resources().vi_lock:
+            cached = self._vi_tokens.get(key)
+            if cached and self._fresh(cached[1]):
+                return cached[0]
+            token = await fetch()
+            expires_on = _jwt_expiry(token) or time.time() + VI_TOKEN_DEFAULT_TTL
+            self._vi_tokens[key] = (token, expires_on)
+            logger.info("Refreshed Video Indexer account token")
+            return token
+
+    def invalidate(self):
+        self._arm_token = None
+        self._arm_expires_on = 0.0
+        self._vi_tokens.clear()
+
+
+class EmulatorCredential:
+    '''
+    Stand-in for DefaultAzureCredential when VI_EMULATOR_URL is set
+    '''
+
+    async def get_token(self, *scopes):
+        return AccessToken("emulator-arm-token", int(time.time()) + 3600)
+
+
+_token_cache = TokenCache()
+
+
+def _retry_delay(response, attempt):
+    #Retry-After when VI sends it, otherwise exponential backoff
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 0.5 * 2 ** attempt
+
+
+class AsyncVideoIndexerService:
+    def __init__(self):
+        #the emulator accepts any ids, so they are optional in that mode
+        emulated = "emulator" if VI_EMULATOR_URL else None
+        self.account_id = os.getenv("AZURE_VI_ACCOUNT_ID", emulated)
+        self.location = os.getenv("AZURE_VI_LOCATION", emulated)
+        self.subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID", emulated)
+        self.resource_group = os.getenv("AZURE_RESOURCE_GROUP", emulated)
+        self.vi_name = os.getenv("AZURE_VI_NAME", emulated)
+        self.token_cache = _token_cache
+
+    @property
+    def credential(self):
+        return _resources().credential
+
+    async def get_access_token(self):
         '''
-        Generates an ARM Access token
+        Returns a cached ARM Access token, refreshed shortly before expiry
         '''
         try:
-            token_object = self.credential.get_token("https://management.azure.com/.default")
-            return token_object.token
+            return await self.token_cache.get_arm_token()
         except Exception as e:
             logger.error(f"Failed to get Azure token: {e}")
             raise
-    
-    def get_account_token(self, arm_access_token):
+
+    @traced("vi.account_token")
+    async def get_account_token(self, arm_access_token):
         '''
         Exchanges the ARM token for Video Indexer account team.
         '''
-        
+
         url = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}"
+            f"{ARM_API_BASE}/subscriptions/{self.subscription_id}"
             f"/resourceGroups/{self.resource_group}"
             f"/providers/Microsoft.VideoIndexer/accounts/{self.vi_name}"
             f"/generateAccessToken?api-version=2024-01-01"
         )
-        
+
         headers = {"Authorization": f"Bearer {arm_access_token}"}
         payload = {"permissionType": "Contributor", "scope": "Account"}
-        response = requests.post(url, headers=headers, json=payload)
+        response = await get_http_client().post(url, headers=headers, json=payload)
         if response.status_code != 200:
             raise Exception(f"Failed to get VI Account token: {response.text}")
         return response.json().get("accessToken")
-    
+
+    async def get_vi_token(self):
+        '''
+        Returns a cached Video Indexer account token (ARM token exchanged only
+        when the cached one is about to expire)
+        '''
+        key = (self.subscription_id, self.resource_group, self.vi_name)
+
+        async def fetch():
+            return await self.get_account_token(await self.get_access_token())
+
+        return await self.token_cache.get_vi_token(key, fetch)
+
+    async def _vi_request(self, method, url, params=None, body=None):
+        '''
+        Calls the Video Indexer API with a cached account token. A 401 means the
+        token was revoked or expired early: drop the cache and retry once.
+        Throttled (429) and, for idempotent calls, 5xx responses are retried
+        up to HTTP_MAX_RETRIES times with backoff.
+
+        `body` is an optional zero-argument callable returning extra request
+        kwargs (files/headers); it is called per attempt so streamed bodies
+        are rebuilt for the retry.
+        '''
+        params = dict(params or {})
+        refreshed, attempt = False, 0
+        while True:
+            params["accessToken"] = await self.get_vi_token()
+            extra = body() if body else {}
+            response = await get_http_client().request(method, url, params=params, **extra)
+
+            if response.status_code == 401 and not refreshed:
+                logger.warning("Video Indexer rejected the cached token, refreshing")
+                self.token_cache.invalidate()
+                refreshed = True
+                continue
+            retryable = response.status_code == 429 or (
+                response.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+            )
+            if retryable and attempt < HTTP_MAX_RETRIES:
+                delay = _retry_delay(response, attempt)
+                attempt += 1
+                logger.warning(f"Video Indexer answered {response.status_code}, retry {attempt}/{HTTP_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            return response
+
     #function to download the youtube video
     # def download_youtube_video(self, url, output_path="temp_video.mp4"):
     #     '''
@@ -132,99 +492,179 @@ class VideoIndexerService:
     #     print("UPLOAD RESPONSE BODY:", response.text)
 
     #     return response.json().get("id")
-    def upload_video(self, video_path: str, video_name: str):
+    @traced("vi.upload")
+    async def upload_video(self, video_path: str, video_name: str):
         """
         Uploads a local video file to Azure Video Indexer
         """
 
-        arm_token = self.get_access_token()
-        vi_token = self.get_account_token(arm_token)
-
-        api_url = f"https://api.videoindexer.ai/{self.location}/Accounts/{self.account_id}/Videos"
+        api_url = f"{VI_API_BASE}/{self.location}/Accounts/{self.account_id}/Videos"
 
         params = {
-            "accessToken": vi_token,
             "name": video_name,
             "privacy": "Private",
             "indexingPreset": "Default"
         }
+        if CALLBACK_URL:
+            #VI notifies /vi/callback on state changes, so polling is only a fallback
+            params["callbackUrl"] = CALLBACK_URL
 
         logger.info(f"Uploading local file {video_path} to Azure Video Indexer")
 
-        with open(video_path, "rb") as video_file:
-            files = {"file": video_file}
-            response = requests.post(api_url, params=params, files=files)
+        size = await asyncio.to_thread(os.path.getsize, video_path)
+        response = await self._vi_request(
+            "POST", api_url, params=params,
+            body=lambda: multipart_file_body("file", video_path, size)
+        )
 
         if response.status_code != 200:
             raise Exception(f"Azure Upload Failed: {response.text}")
 
         return response.json().get("id")
-    
-        
-    def wait_for_processing(self,video_id):
+
+    @traced("vi.upload_url")
+    async def upload_video_url(self, video_url: str, video_name: str):
+        """
+        Submits a video by URL: Video Indexer downloads it directly (public
+        or SAS-signed blob URL), so the bytes never pass through this service
+        """
+
+        api_url = f"{VI_API_BASE}/{self.location}/Accounts/{self.account_id}/Videos"
+
+        params = {
+            "name": video_name,
+            "videoUrl": video_url,
+            "privacy": "Private",
+            "indexingPreset": "Default"
+        }
+        if CALLBACK_URL:
+            params["callbackUrl"] = CALLBACK_URL
+
+        logger.info(f"Submitting URL {redact_url(video_url)} to Azure Video Indexer")
+
+        response = await self._vi_request("POST", api_url, params=params)
+
+        if response.status_code != 200:
+            raise Exception(f"Azure URL ingestion failed: {response.text}")
+
+        return response.json().get("id")
+
+    @traced("vi.get_index")
+    async def get_index(self, video_id):
+        '''
+        Fetches the current index JSON (state, processingProgress, insights)
+        '''
+        url = f"{VI_API_BASE}/{self.location}/Accounts/{self.account_id}/Videos/{video_id}/Index"
+        response = await self._vi_request("GET", url)
+        if response.status_code != 200:
+            raise Exception(f"Failed to get index for {video_id}: {response.text}")
+        return response.json()
+
+    @traced("vi.wait_for_processing")
+    async def wait_for_processing(self, video_id, timeout=PROCESSING_TIMEOUT, on_progress=None, cancel_event=None):
+        '''
+        Waits until the video is processed and returns its index JSON.
+        Status checks are scheduled by the shared adaptive poller; raises
+        TimeoutError once `timeout` seconds have passed, and CancelledError
+        as soon as `cancel_event` (a threading.Event) is set or the awaiting
+        task is cancelled.
+        '''
         logger.info(f"Waiting for the video {video_id} to process......")
-        while True:
-            arm_token = self.get_access_token()
-            vi_token = self.get_account_token(arm_token)
-            
-            url = f"https://api.videoindexer.ai/{self.location}/Accounts/{self.account_id}/Videos/{video_id}/Index"
-            
-            params= {"accessToken": vi_token}
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            state = data.get("state")
-            if state == "Processed":
-                return data
-            elif state == "Failed":
-                raise Exception("Video Indexing Failed in Azure")
-            elif state == "Quarantined":
-                raise Exception("Video Quarantined (Copyright/ Content Policy Violation)")
-            logger.info(f"Status {state} ...........waiting 30s")
-            time.sleep(30)
-    
-    
+        #the poller schedules the status checks as tasks on this loop
+        future = asyncio.wrap_future(
+            shared_poller.watch(self, video_id, timeout=timeout, on_progress=on_progress)
+        )
+        try:
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=1)
+                if done:
+                    return future.result()
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CancelledError(f"Audit cancelled while {video_id} was processing")
+        except BaseException:
+            shared_poller.cancel(video_id)
+            raise
+
     def extract_data(self, vi_json):
         '''
         Parses the JSON into our state format
         '''
-        
+
         transcript_lines = []
+        transcript_segments = []
         for v in vi_json.get("videos", []):
             for insights in v.get("insights",{}).get("transcript",[]):
                 transcript_lines.append(insights.get("text"))
-                
+                transcript_segments.extend(_timed_segments(insights))
+
         ocr_lines = []
+        ocr_segments = []
         for v in vi_json.get("videos", []):
             for insights in v.get("insights",{}).get("ocr",[]):
                 ocr_lines.append(insights.get("text"))
-                
+                ocr_segments.extend(_timed_segments(insights))
+
         return {
             "transcript": " ".join(transcript_lines),
             "ocr_text": ocr_lines,
+            "transcript_segments": sorted(transcript_segments, key=lambda seg: seg["start"]),
+            "ocr_segments": sorted(ocr_segments, key=lambda seg: seg["start"]),
             "video_metadata": {
                 "duration": vi_json.get("summarizedInsights", {}).get("duration"),
                 "platform":"youtube"
             }
         }
-    
-    def delete_video(self, video_id: str):
+
+    @traced("vi.delete")
+    async def delete_video(self, video_id: str):
         """
         Deletes video from Azure Video Indexer
         """
 
-        arm_token = self.get_access_token()
-        vi_token = self.get_account_token(arm_token)
-
-        url = f"https://api.videoindexer.ai/{self.location}/Accounts/{self.account_id}/Videos/{video_id}"
-
-        params = {"accessToken": vi_token}
+        url = f"{VI_API_BASE}/{self.location}/Accounts/{self.account_id}/Videos/{video_id}"
 
         logger.info(f"Deleting video {video_id} from Azure")
 
-        response = requests.delete(url, params=params)
+        response = await self._vi_request("DELETE", url)
 
         if response.status_code not in [200, 204]:
             raise Exception(f"Failed to delete video: {response.text}")
 
-        logger.info("Video deleted successfully")
\ No newline at end of file
+        logger.info("Video deleted successfully")
+
+
+class VideoIndexerService:
+    '''
+    Blocking API: each call runs the AsyncVideoIndexerService coroutine on
+    the shared background event loop (see run_sync)
+    '''
+
+    def __init__(self, service: AsyncVideoIndexerService = None):
+        self.service = service or AsyncVideoIndexerService()
+        self.token_cache = self.service.token_cache
+
+    def get_access_token(self):
+        return run_sync(self.service.get_access_token())
+
+    def get_vi_token(self):
+        return run_sync(self.service.get_vi_token())
+
+    def upload_video(self, video_path: str, video_name: str):
+        return run_sync(self.service.upload_video(video_path, video_name))
+
+    def upload_video_url(self, video_url: str, video_name: str):
+        return run_sync(self.service.upload_video_url(video_url, video_name))
+
+    def get_index(self, video_id):
+        return run_sync(self.service.get_index(video_id))
+
+    def wait_for_processing(self, video_id, timeout=PROCESSING_TIMEOUT, on_progress=None, cancel_event=None):
+        return run_sync(self.service.wait_for_processing(
+            video_id, timeout=timeout, on_progress=on_progress, cancel_event=cancel_event
+        ))
+
+    def extract_data(self, vi_json):
+        return self.service.extract_data(vi_json)
+
+    def delete_video(self, video_id: str):
+        return run_sync(self.service.delete_video(video_id))
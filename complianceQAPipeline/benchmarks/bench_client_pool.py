@@ -0,0 +1,108 @@
+'''
+Benchmark: per-audit latency of the auditor node with and without the shared
+client registry.
+
+"before" resets the registry before every audit, which reproduces the old
+behaviour of building the LLM, the embedding model and the vector store inside
+the node. "after" warms the registry once and reuses it.
+
+By default the remote calls (LLM completion, Azure Search) are replaced by
+fixed-latency stand-ins so only client construction differs between runs; the
+embedding model is loaded for real. Pass --live to use the real services.
+
+Usage (from complianceQAPipeline/):
+    python -m benchmarks.bench_client_pool --runs 5
+'''
+
+import argparse
+import json
+import statistics
+import time
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+from backend.src.services import llm, retriever
+from backend.src.services.clients import registry
+from backend.src.graph.nodes import audio_content_node
+
+SAMPLE_STATE = {
+    "video_id": "vid_bench",
+    "transcript": "This cream is guaranteed to cure acne in 3 days. Link in bio!",
+    "ocr_text": ["100% results", "Shop now"],
+    "video_metadata": {"duration": 30, "platform": "youtube"},
+}
+
+REMOTE_LATENCY_S = 0.05
+
+
+class _FakeChatModel:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def invoke(self, messages):
+        time.sleep(REMOTE_LATENCY_S)
+        return AIMessage(content=json.dumps({
+            "compliance_results": [],
+            "status": "PASS",
+            "final_report": "benchmark"
+        }))
+
+
+class _FakeAzureSearch:
+    def __init__(self, *args, embedding_function=None, **kwargs):
+        self.embedding_function = embedding_function
+
+    def similarity_search(self, query, k=3):
+        self.embedding_function(query)
+        time.sleep(REMOTE_LATENCY_S)
+        return [Document(page_content="rule") for _ in range(k)]
+
+
+def _install_offline_stubs():
+    llm.HuggingFaceEndpoint = lambda **kwargs: None
+    llm.ChatHuggingFace = _FakeChatModel
+    retriever.AzureSearch = _FakeAzureSearch
+
+
+def _time_audits(runs, cold):
+    timings = []
+    for _ in range(runs):
+        if cold:
+            registry.reset()
+        start = time.perf_counter()
+        audio_content_node(dict(SAMPLE_STATE))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summary(timings):
+    return {
+        "runs": len(timings),
+        "mean_s": round(statistics.mean(timings), 4),
+        "median_s": round(statistics.median(timings), 4),
+        "max_s": round(max(timings), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--live", action="store_true", help="use the real LLM and Azure Search")
+    args = parser.parse_args()
+
+    if not args.live:
+        _install_offline_stubs()
+
+    before = _time_audits(args.runs, cold=True)
+
+    registry.reset()
+    registry.warmup()
+    after = _time_audits(args.runs, cold=False)
+
+    result = {"before_per_request_clients": _summary(before), "after_shared_registry": _summary(after)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+'''
+Benchmark: cost of each stage of the compliance pipeline, and of a whole
+compliance_graph.invoke, with JSON output for tracking regressions across
+commits.
+
+Stages:
+  upload_write    UploadFile -> temp file + sha256 (save_upload_to_temp)
+  vi_round_trips  token exchange, upload, Index fetch, delete
+  extract_data    parsing a large processed Index JSON
+  embedding       EmbeddingService.embed_query, cold and cached
+  retrieval       rule lookup over a local index, uncached and cached
+  fast_rules      the deterministic rule screen over timed segments, on a
+                  clip without and with rule hits
+  prompt_build    rendering the audit messages for one category
+  llm_parse       extracting + validating the audit JSON from raw output
+  graph_invoke    the full graph (indexer + category branches + aggregator)
+
+Everything runs offline by default: Video Indexer is the emulator
+(backend/scripts/vi_emulator.py) started in-process, the vector store is a
+LocalVectorStore in a temp dir filled with synthetic rule chunks, the
+embedding model is a deterministic hash embedding and the LLM is the fake
+auditor. --live uses the configured embedding model, vector store and LLM
+instead (Video Indexer stays emulated).
+
+Usage (from complianceQAPipeline/):
+    python -m benchmarks.bench_pipeline --runs 20 --output bench.json
+'''
+
+import os
+import io
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+
+import uvicorn
+from fastapi import UploadFile
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from backend.scripts import vi_emulator
+from backend.src.api.uploads import save_upload_to_temp
+from backend.src.graph.categories import CATEGORIES
+from backend.src.graph.fast_rules import RuleSet
+from backend.src.graph.nodes import _build_audit_messages, _parse_audit_response, _retrieve_rules
+from backend.src.graph.workflow import create_graph
+from backend.src.services import video_indexer
+from backend.src.services.clients import registry
+from backend.src.services.embeddings import EmbeddingService
+from backend.src.services.llm import FakeAuditChatModel, LLMClient
+from backend.src.services.retriever import LocalVectorStore
+from backend.src.services.retrieval_cache import CachedRetriever
+
+WORDS = (
+    "advertising claims must be substantiated endorsements disclose material "
+    "connection sponsored clearly conspicuous video length aspect ratio "
+    "resolution health benefit evidence consumers misleading guaranteed"
+).split()
+
+RAW_AUDIT_OUTPUT = "Here is the audit:\n```json\n" + json.dumps({
+    "compliance_results": [
+        {"category": "Claim Validation", "severity": "high", "description": "Guaranteed acne cure.", "timestamp": "0:00:12"},
+        {"category": "Influencer Disclosure", "severity": "MEDIUM", "description": "Discount code without #ad."},
+    ] * 5,
+    "status": "FAIL",
+    "final_report": "Multiple unsubstantiated claims and a missing disclosure.",
+}, indent=2) + "\n```\nLet me know if you need anything else."
+
+
+def _summary(timings, **extra):
+    #interpolated between the two nearest runs; a single run is its own p95
+    p95 = statistics.quantiles(timings, n=20, method="inclusive")[-1] if len(timings) > 1 else timings[0]
+    return {
+        "runs": len(timings),
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        **extra,
+    }
+
+
+def _time(fn, runs, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_emulator(processing_seconds):
+    '''
+    Runs the Video Indexer emulator on a free local port in a background
+    thread and points VideoIndexerService at it
+    '''
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    vi_emulator.EMULATOR_CONFIG.update(processing_seconds=processing_seconds, jitter=0, failure_rate=0, throttle_rate=0)
+    server = uvicorn.Server(uvicorn.Config(vi_emulator.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    url = f"http://127.0.0.1:{port}"
+    video_indexer.VI_EMULATOR_URL = url
+    video_indexer.VI_API_BASE = url
+    video_indexer.ARM_API_BASE = f"{url}/arm"
+    return server
+
+
+def bench_upload_write(runs, size_mb):
+    data = os.urandom(size_mb * 1024 * 1024)
+
+    def write():
+        upload = UploadFile(file=io.BytesIO(data), filename="bench.mp4")
+        path, _ = asyncio.run(save_upload_to_temp(upload, prefix="bench"))
+        os.remove(path)
+
+    timings = _time(write, runs)
+    return _summary(timings, size_mb=size_mb, mb_per_s=round(size_mb / statistics.mean(timings), 1))
+
+
+def bench_vi_round_trips(runs, video_path):
+    service = video_indexer.VideoIndexerService()
+    result = {}
+
+    def token():
+        service.token_cache.invalidate()
+        service.get_vi_token()
+
+    result["token_exchange"] = _summary(_time(token, runs))
+    video_ids = []
+    result["upload"] = _summary(_time(lambda: video_ids.append(service.upload_video(video_path, "bench")), runs))
+    result["get_index"] = _summary(_time(lambda: service.get_index(video_ids[-1]), runs))
+    result["delete"] = _summary(_time(lambda: service.delete_video(video_ids.pop()), min(runs, len(video_ids) - 1)))
+    return result
+
+
+def bench_extract_data(runs, video_path, lines):
+    service = video_indexer.VideoIndexerService()
+    vi_emulator.EMULATOR_CONFIG.update(transcript_lines=lines, ocr_lines=lines // 4)
+    video_id = service.upload_video(video_path, "bench_large")
+    index = service.get_index(video_id)
+    service.delete_video(video_id)
+    vi_emulator.EMULATOR_CONFIG.update(transcript_lines=40, ocr_lines=10)
+
+    timings = _time(lambda: service.extract_data(index), runs)
+    return _summary(timings, transcript_lines=lines, json_kb=round(len(json.dumps(index)) / 1024, 1))
+
+
+def bench_embedding(runs, embeddings):
+    rng = random.Random(3)
+    queries = [_text(rng, 60) for _ in range(runs + 1)]
+    cold = iter(queries)
+    return {
+        "cold": _summary(_time(lambda: embeddings.embed_query(next(cold)), runs)),
+        "cached": _summary(_time(lambda: embeddings.embed_query(queries[0]), runs)),
+    }
+
+
+def build_rulebook(embeddings, chunks, path):
+    '''
+    Local vector index of synthetic rule chunks, spread over the rule PDFs
+    '''
+    rng = random.Random(5)
+    sources = ["1001a-influencer-guide-508_1.pdf", "youtube-ad-specs.pdf"]
+    store = LocalVectorStore(embeddings, path=path)
+    store.add_texts(
+        [_text(rng, 120) for _ in range(chunks)],
+        metadatas=[{"source": sources[i % len(sources)]} for i in range(chunks)],
+    )
+    return store
+
+
+def bench_retrieval(runs, store, embeddings, transcript):
+    category = CATEGORIES[1]
+    cached = CachedRetriever(store, embeddings)
+    #a new query every run: query embedding + vector search
+    fresh = (f"{transcript} {n}" for n in range(runs + 1))
+    return {
+        "uncached": _summary(_time(lambda: _retrieve_rules(store, next(fresh), category), runs)),
+        "cached": _summary(_time(lambda: _retrieve_rules(cached, transcript, category), runs)),
+        "chunks": len(store) if hasattr(store, "__len__") else None,
+    }
+
+
+def bench_fast_rules(runs, transcript):
+    #loaded here: the shared rule set is empty when FAST_RULES_MODE is off
+    rule_set = RuleSet.load()
+    words = transcript.split()
+    segments = [
+        {"start": n / 6, "end": (n + 12) / 6, "text": " ".join(words[n:n + 12])}
+        for n in range(0, len(words), 12)
+    ]
+    ocr_segments = [{"start": n * 5.0, "end": n * 5.0 + 5, "text": text}
+                    for n, text in enumerate(["SAVE20", "LINK IN BIO", "SHOP NOW"] * 5)]
+    clean = {"transcript": transcript, "transcript_segments": segments, "ocr_segments": ocr_segments}
+    flagged = {**clean, "transcript_segments": segments + [
+        {"start": 95.0, "end": 99.0, "text": "It is guaranteed to clear your acne, use my code SAVE20"}
+    ]}
+    return {
+        "clean": _summary(_time(lambda: rule_set.screen(clean), runs)),
+        "flagged": _summary(_time(lambda: rule_set.screen(flagged), runs)),
+        "rules": len(rule_set.rules),
+        "segments": len(segments) + len(ocr_segments),
+    }
+
+
+def bench_prompt_build(runs, rules, transcript):
+    ocr_text = ["SAVE20", "LINK IN BIO", "#ad"] * 5
+    metadata = {"duration": 240, "platform": "youtube"}
+    timings = _time(lambda: _build_audit_messages(rules, metadata, transcript, ocr_text, CATEGORIES[0]), runs)
+    return _summary(timings, prompt_chars=len(rules) + len(transcript))
+
+
+def bench_llm_parse(runs):
+    return _summary(_time(lambda: _parse_audit_response(RAW_AUDIT_OUTPUT), runs), output_chars=len(RAW_AUDIT_OUTPUT))
+
+
+def bench_graph_invoke(runs, graph, video_kb):
+    def invoke():
+        #fresh content per run, so the extraction and audit caches miss
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(video_kb * 1024))
+        try:
+            result = graph.invoke({"video_path": path, "video_id": "vid_bench", "compliance_results": [], "errors": []})
+        finally:
+            os.remove(path)
+        if result.get("errors"):
+            raise RuntimeError(f"Benchmark audit failed: {result['errors']}")
+
+    return _summary(_time(invoke, runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--graph-runs", type=int, default=5, help="runs of the full graph")
+    parser.add_argument("--upload-mb", type=int, default=64)
+    parser.add_argument("--insight-lines", type=int, default=5000, help="transcript lines in the large Index JSON")
+    parser.add_argument("--rule-chunks", type=int, default=2000, help="chunks in the synthetic local rulebook")
+    parser.add_argument("--vi-processing-seconds", type=float, default=0, help="emulated indexing time")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="fake auditor latency per call")
+    parser.add_argument("--live", action="store_true", help="use the configured embeddings, vector store and LLM")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    server = start_emulator(args.vi_processing_seconds)
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    rng = random.Random(11)
+    transcript = _text(rng, 600)
+
+    if args.live:
+        registry.warmup()
+        embeddings = registry.get_embeddings()
+        store = registry.get_vector_store()
+    else:
+        embeddings = EmbeddingService(
+            DeterministicFakeEmbedding(size=384), model_name="bench-hash", cache_enabled=False
+        )
+        store = build_rulebook(embeddings, args.rule_chunks, os.path.join(workdir, "index"))
+        registry._embeddings = embeddings
+        registry._vector_store = store
+        registry._llm = LLMClient(FakeAuditChatModel(latency_s=args.llm_latency_ms / 1000), backend="fake")
+
+    video_path = os.path.join(workdir, "bench.mp4")
+    with open(video_path, "wb") as f:
+        f.write(os.urandom(256 * 1024))
+
+    stages = {}
+    try:
+        stages["upload_write"] = bench_upload_write(args.runs, args.upload_mb)
+        stages["vi_round_trips"] = bench_vi_round_trips(args.runs, video_path)
+        stages["extract_data"] = bench_extract_data(args.runs, video_path, args.insight_lines)
+        stages["embedding"] = bench_embedding(args.runs, embeddings)
+        stages["retrieval"] = bench_retrieval(args.runs, store, embeddings, transcript)
+        stages["fast_rules"] = bench_fast_rules(args.runs, transcript)
+        rules = _retrieve_rules(store, transcript, CATEGORIES[0])
+        stages["prompt_build"] = bench_prompt_build(args.runs, rules, transcript)
+        stages["llm_parse"] = bench_llm_parse(args.runs)
+        stages["graph_invoke"] = bench_graph_invoke(args.graph_runs, create_graph(), 256)
+    finally:
+        server.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "live": args.live,
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "stages": stages,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+'''
+Benchmark: time-to-first-token of audit prompts with the old layout (rules
+first, in the system prompt) versus the compiled templates (stable prefix,
+video block, then rules + focus).
+
+The workload mirrors the fan-out graph: every video is audited by each
+category branch, and each branch retrieves different rules.
+
+By default the LLM is a stand-in for a prefix-caching inference server
+(TGI / vLLM style radix cache): prefill costs --prefill-ms per token for
+every token after the longest prefix it has already seen. Pass --live to
+stream from the configured LLM and measure the real first-token latency.
+
+Usage (from complianceQAPipeline/):
+    python -m benchmarks.bench_prompt_prefix --videos 5
+'''
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from backend.src.graph.categories import CATEGORIES
+from backend.src.graph.prompts import prompt_registry
+
+WORDS = (
+    "guaranteed results cure acne sponsored link bio discount free trial best "
+    "product ever doctor approved limited offer today only follow subscribe"
+).split()
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def legacy_messages(rules, video_metadata, transcript, ocr_text, category):
+    #the pre-template layout: retrieved rules at the top of the system prompt
+    system_prompt = f"""
+                    You are a senior brand compliance auditor.
+                    OFFICIAL REGULATORY RULES:
+                    {rules}
+                    FOCUS: Only report {category['name']} issues - {category['focus']}
+                    INSTRUCTIONS:
+                    1. Analyze the transcript and OCR text below.
+                    2. Identify any violation of the rules.
+                    3. Return strictly JSON with compliance_results, status, final_report.
+                """
+    user_message = f"""
+                    VIDEO_METADATA: {video_metadata}
+                    TRANSCRIPT: {transcript}
+                    ON SCREEN TEXT (OCR): {ocr_text}
+                """
+    return [SystemMessage(content=system_prompt), HumanMessage(content=user_message)]
+
+
+def template_messages(rules, video_metadata, transcript, ocr_text, category):
+    return prompt_registry.for_category(category).render(rules, video_metadata, transcript, ocr_text)
+
+
+class PrefixCachingStandIn:
+    '''
+    Simulated server: TTFT = base latency + prefill of the uncached suffix
+    '''
+
+    def __init__(self, prefill_ms, base_ms):
+        self.prefill = prefill_ms / 1000
+        self.base = base_ms / 1000
+        self.seen = []
+
+    def _tokens(self, messages):
+        return [token for message in messages for token in f"<{message.type}> {message.content}".split()]
+
+    def time_to_first_token(self, messages):
+        tokens = self._tokens(messages)
+        cached = 0
+        for previous in self.seen:
+            common = 0
+            for a, b in zip(previous, tokens):
+                if a != b:
+                    break
+                common += 1
+            cached = max(cached, common)
+        self.seen.append(tokens)
+        latency = self.base + (len(tokens) - cached) * self.prefill
+        time.sleep(latency)
+        return latency, len(tokens), cached
+
+
+def _live_ttft(llm, messages):
+    start = time.perf_counter()
+    for _ in llm.stream(messages):
+        return time.perf_counter() - start, None, None
+    return time.perf_counter() - start, None, None
+
+
+def run(layout, videos, seed, server=None, llm=None):
+    rng = random.Random(seed)
+    timings, prompt_tokens, cached_tokens = [], 0, 0
+    for video in range(videos):
+        transcript = _text(rng, 1500)
+        ocr_text = [_text(rng, 5) for _ in range(10)]
+        metadata = {"duration": 60 + video, "platform": "youtube"}
+        for category in CATEGORIES:
+            rules = "\n\n".join(_text(rng, 150) for _ in range(3))
+            messages = layout(rules, metadata, transcript, ocr_text, category)
+            if llm is not None:
+                ttft, _, _ = _live_ttft(llm, messages)
+            else:
+                ttft, tokens, cached = server.time_to_first_token(messages)
+                prompt_tokens += tokens
+                cached_tokens += cached
+            timings.append(ttft)
+    summary = {
+        "calls": len(timings),
+        "mean_ttft_s": round(statistics.mean(timings), 4),
+        "p95_ttft_s": round(sorted(timings)[int(0.95 * (len(timings) - 1))], 4),
+    }
+    if llm is None:
+        summary["prefix_cache_hit_rate"] = round(cached_tokens / prompt_tokens, 4)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=5)
+    parser.add_argument("--prefill-ms", type=float, default=0.2, help="stand-in prefill cost per token")
+    parser.add_argument("--base-ms", type=float, default=20, help="stand-in fixed latency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--live", action="store_true", help="stream from the configured LLM")
+    args = parser.parse_args()
+
+    llm = None
+    if args.live:
+        from backend.src.services.clients import registry
+        llm = registry.get_llm()
+
+    result = {}
+    for name, layout in (("before_legacy_layout", legacy_messages), ("after_prefix_templates", template_messages)):
+        server = None if llm else PrefixCachingStandIn(args.prefill_ms, args.base_ms)
+        result[name] = run(layout, args.videos, args.seed, server=server, llm=llm)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
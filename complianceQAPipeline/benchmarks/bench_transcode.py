@@ -0,0 +1,175 @@
+'''
+Benchmark: bytes and time saved by uploading proxies instead of masters.
+
+Generates a local test clip (ffmpeg testsrc2 pattern + tone, ProRes when the
+encoder is available, otherwise near-lossless H.264), then for every proxy
+profile reports:
+  transcode        ffmpeg time and proxy size
+  bytes_saved      master bytes - proxy bytes
+  upload           measured upload to Video Indexer, master vs proxy, and the
+                   projected upload time at --uplink-mbps
+  indexing         upload + processing wait, master vs proxy (--live only:
+                   the emulator's indexing time does not depend on size)
+  pool             wall time of --pool-clips transcodes on the worker pool
+
+Video Indexer is the in-process emulator unless --live is given, which uses
+the configured Azure account. Needs ffmpeg on PATH (or FFMPEG_BIN).
+
+Usage (from complianceQAPipeline/):
+    python -m benchmarks.bench_transcode --duration 30 --resolution 3840x2160 --output transcode.json
+'''
+
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+
+from benchmarks.bench_pipeline import start_emulator, _git_commit
+from backend.src.services import video_indexer
+from backend.src.services.transcode import PROFILES, FFMPEG_BIN, ProxyTranscoder
+
+
+def _encoders(ffmpeg):
+    result = subprocess.run([ffmpeg, "-hide_banner", "-encoders"], capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def generate_clip(ffmpeg, path_base, resolution, fps, duration):
+    '''
+    Renders a synthetic master: moving test pattern with a burnt-in timer
+    and a sine tone. Returns (path, codec).
+    '''
+    if " prores_ks " in _encoders(ffmpeg):
+        path, codec = f"{path_base}.mov", ["-c:v", "prores_ks", "-profile:v", "3", "-c:a", "pcm_s16le"]
+    else:
+        path, codec = f"{path_base}.mp4", ["-c:v", "libx264", "-preset", "veryfast", "-crf", "10", "-c:a", "aac", "-b:a", "320k"]
+    subprocess.run([
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={resolution}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-ac", "2", *codec, "-shortest", path,
+    ], check=True)
+    return path, codec[1]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_upload(service, path, uplink_mbps):
+    video_id, seconds = _timed(lambda: service.upload_video(path, "bench_transcode"))
+    service.delete_video(video_id)
+    size = os.path.getsize(path)
+    return {
+        "bytes": size,
+        "measured_s": round(seconds, 3),
+        "projected_s": round(size * 8 / (uplink_mbps * 1e6), 2),
+    }
+
+
+def bench_indexing(service, path):
+    def run():
+        video_id = service.upload_video(path, "bench_transcode")
+        try:
+            service.wait_for_processing(video_id)
+        finally:
+            service.delete_video(video_id)
+
+    return round(_timed(run)[1], 2)
+
+
+def bench_pool(transcoder, source, clips):
+    def run():
+        futures = [transcoder.submit(source) for _ in range(clips)]
+        results = [future.result() for future in futures]
+        for result in results:
+            if result:
+                os.remove(result["path"])
+
+    return {"clips": clips, "workers": transcoder.max_workers, "wall_s": round(_timed(run)[1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=int, default=20, help="seconds of test clip")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma separated proxy profiles")
+    parser.add_argument("--uplink-mbps", type=float, default=100, help="uplink used for the projected upload time")
+    parser.add_argument("--pool-clips", type=int, default=4, help="concurrent transcodes for the pool stage (0 skips it)")
+    parser.add_argument("--live", action="store_true", help="upload to the configured Video Indexer account")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG_BIN) is None:
+        parser.error(f"{FFMPEG_BIN} not found; install ffmpeg or set FFMPEG_BIN")
+
+    server = None if args.live else start_emulator(0)
+    service = video_indexer.VideoIndexerService()
+    workdir = tempfile.mkdtemp(prefix="bench_transcode_")
+    profiles = {}
+    try:
+        source, codec = generate_clip(FFMPEG_BIN, os.path.join(workdir, "master"), args.resolution, args.fps, args.duration)
+        master_upload = bench_upload(service, source, args.uplink_mbps)
+        master_indexing = bench_indexing(service, source) if args.live else None
+
+        for name in args.profiles.split(","):
+            transcoder = ProxyTranscoder(profile=name, min_bytes=0)
+            proxy = transcoder.transcode(source)
+            if proxy is None:
+                profiles[name] = {"skipped": "transcode failed or saved too little"}
+                continue
+            try:
+                upload = bench_upload(service, proxy["path"], args.uplink_mbps)
+                indexing = bench_indexing(service, proxy["path"]) if args.live else None
+            finally:
+                os.remove(proxy["path"])
+
+            profiles[name] = {
+                "profile": PROFILES[name],
+                "transcode_s": proxy["seconds"],
+                "proxy_bytes": proxy["proxy_bytes"],
+                "bytes_saved": proxy["source_bytes"] - proxy["proxy_bytes"],
+                "size_ratio": round(proxy["proxy_bytes"] / proxy["source_bytes"], 4),
+                "upload": upload,
+                "upload_saved_s": {
+                    "measured": round(master_upload["measured_s"] - upload["measured_s"], 3),
+                    "projected": round(master_upload["projected_s"] - upload["projected_s"], 2),
+                    #what the proxy costs end to end at the projected uplink
+                    "projected_net_of_transcode": round(
+                        master_upload["projected_s"] - upload["projected_s"] - proxy["seconds"], 2
+                    ),
+                },
+                "indexing_s": indexing,
+                "indexing_saved_s": round(master_indexing - indexing, 2) if args.live else None,
+            }
+            if args.pool_clips:
+                profiles[name]["pool"] = bench_pool(transcoder, source, args.pool_clips)
+    finally:
+        if server is not None:
+            server.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "live": args.live,
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "master": {"codec": codec, "upload": master_upload, "indexing_s": master_indexing},
+        "profiles": profiles,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
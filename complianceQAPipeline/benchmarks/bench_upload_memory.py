@@ -0,0 +1,152 @@
+'''
+Benchmark: peak RSS of the upload path as a function of video size.
+
+Each measurement runs in a fresh subprocess (so ru_maxrss is not polluted by
+earlier runs) and covers both hops of an upload:
+
+  save   - UploadFile -> temp file on disk
+  send   - temp file -> HTTP multipart POST (to a local sink server)
+
+"buffered" reproduces the old code (file.read() + requests files=),
+"streaming" uses save_upload_to_temp and VideoIndexerService.upload_video
+(multipart body streamed from the file in VI_UPLOAD_CHUNK_SIZE reads, each
+in a worker thread).
+
+Usage (from complianceQAPipeline/):
+    python -m benchmarks.bench_upload_memory --sizes-mb 64 256 1024
+'''
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from fastapi import UploadFile
+
+from backend.src.api.uploads import save_upload_to_temp
+from backend.src.services import video_indexer
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    '''
+    Reads and discards the request body in 1 MB chunks
+    '''
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"id": "bench"}')
+
+    def log_message(self, *args):
+        pass
+
+
+def _peak_rss_mb():
+    #ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _make_source(size_mb):
+    fd, path = tempfile.mkstemp(suffix=".mp4")
+    with os.fdopen(fd, "wb") as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+
+async def _save(mode, source_path):
+    with open(source_path, "rb") as source:
+        upload = UploadFile(file=source, filename="bench.mp4")
+        if mode == "streaming":
+            path, _ = await save_upload_to_temp(upload, prefix="bench")
+            return path
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        with os.fdopen(fd, "wb") as buffer:
+            buffer.write(await upload.read())
+        return path
+
+
+def _send(mode, path, url):
+    if mode == "streaming":
+        #the real upload call, against the sink instead of Video Indexer
+        video_indexer.VI_API_BASE = url
+        service = video_indexer.AsyncVideoIndexerService()
+
+        async def vi_token():
+            return "bench"
+
+        service.get_vi_token = vi_token
+        video_indexer.VideoIndexerService(service).upload_video(path, "bench.mp4")
+        return
+    with open(path, "rb") as video_file:
+        response = requests.post(url, files={"file": video_file})
+    response.raise_for_status()
+
+
+def _child(mode, size_mb):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/upload"
+
+    source = _make_source(size_mb)
+    baseline = _peak_rss_mb()
+    saved = None
+    try:
+        saved = asyncio.run(_save(mode, source))
+        after_save = _peak_rss_mb()
+        _send(mode, saved, url)
+        after_send = _peak_rss_mb()
+    finally:
+        server.shutdown()
+        for path in (source, saved):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    print(json.dumps({
+        "mode": mode,
+        "size_mb": size_mb,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_after_save_mb": round(after_save, 1),
+        "peak_rss_after_send_mb": round(after_send, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--modes", nargs="+", default=["buffered", "streaming"])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SIZE_MB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], int(args.child[1]))
+        return
+
+    results = []
+    for mode in args.modes:
+        for size_mb in args.sizes_mb:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_upload_memory", "--child", mode, str(size_mb)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
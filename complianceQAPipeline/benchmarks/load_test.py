@@ -0,0 +1,146 @@
+'''
+Load test: drives POST /audit of a running API at a fixed concurrency and
+reports latency percentiles and throughput as JSON.
+
+Each request uploads a different small random "video" (so the extraction
+cache never short-circuits it). In --mode sync the latency is the /audit
+call itself; in --mode job it runs from submission until GET /audit/{id}
+reports a terminal status.
+
+Fully offline with the Video Indexer emulator and the fake LLM:
+    python -m backend.scripts.vi_emulator --port 8090 --processing-seconds 5 &
+    VI_EMULATOR_URL=http://localhost:8090 VI_POLL_INITIAL_INTERVAL=1 LLM_BACKEND=fake \\
+        uvicorn backend.src.api.server:app --port 8000 &
+    python -m benchmarks.load_test --concurrency 16 --requests 64
+'''
+
+import os
+import json
+import time
+import argparse
+import statistics
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELLED"}
+
+
+def percentile(values, fraction):
+    '''
+    Nearest-rank percentile of a list of numbers
+    '''
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class LoadTest:
+    '''
+    Sends `total` audits from `concurrency` worker threads sharing one
+    connection pool and records the outcome of each
+    '''
+
+    def __init__(self, base_url, concurrency, total, mode, video_kb, poll_interval, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.total = total
+        self.mode = mode
+        self.video_kb = video_kb
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.latencies = []
+        self.outcomes = Counter()
+        self._lock = threading.Lock()
+
+    def _record(self, outcome, latency=None):
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def _wait_for_job(self, job_id, deadline):
+        while time.monotonic() < deadline:
+            response = self.session.get(f"{self.base_url}/audit/{job_id}", timeout=30)
+            status = response.json().get("status")
+            if status in TERMINAL_STATUSES:
+                return status
+            time.sleep(self.poll_interval)
+        return "TIMEOUT"
+
+    def one(self, index):
+        files = {"file": (f"load_{index}.mp4", os.urandom(self.video_kb * 1024), "video/mp4")}
+        start = time.monotonic()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/audit", params={"mode": self.mode}, files=files, timeout=self.timeout
+            )
+            if self.mode == "job" and response.status_code == 202:
+                status = self._wait_for_job(response.json()["job_id"], start + self.timeout)
+                outcome = "ok" if status == "COMPLETED" else status.lower()
+            else:
+                outcome = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+        except requests.RequestException as e:
+            self._record(type(e).__name__)
+            return
+        #only successful audits count towards the latency distribution
+        self._record(outcome, time.monotonic() - start if outcome == "ok" else None)
+
+    def run(self):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(self.one, range(self.total)))
+        elapsed = time.monotonic() - start
+
+        latencies = self.latencies
+        return {
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "requests": self.total,
+            "succeeded": self.outcomes["ok"],
+            "outcomes": dict(self.outcomes),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(self.outcomes["ok"] / elapsed, 3) if elapsed else None,
+            "latency_s": {
+                "mean": round(statistics.mean(latencies), 3) if latencies else None,
+                "p50": round(percentile(latencies, 0.50), 3) if latencies else None,
+                "p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+                "p99": round(percentile(latencies, 0.99), 3) if latencies else None,
+                "max": round(max(latencies), 3) if latencies else None,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--mode", choices=["sync", "job"], default="sync")
+    parser.add_argument("--video-kb", type=int, default=256, help="size of each uploaded dummy video")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="job status poll interval (mode job)")
+    parser.add_argument("--timeout", type=float, default=600, help="per-audit timeout in seconds")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    test = LoadTest(
+        args.url, args.concurrency, args.requests, args.mode,
+        args.video_kb, args.poll_interval, args.timeout
+    )
+    report = test.run()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 '''
 Main execution entry point for the Compliance QA Pipeline.
 '''
+import os
+import sys
 import uuid
 import json
+import time
 import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pprint import pprint
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
 from backend.src.graph.workflow import app
+from backend.src.graph.checkpoints import checkpointer, thread_config, discard_completed
+from backend.src.graph.batch import discover_videos, result_record, error_record, BatchSummary
+from backend.src.services.video_indexer import redact_url
 
 logging.basicConfig(
     level=logging.INFO,
@@ -39,7 +47,8 @@ def run_cli_simulation():
     print(f"Input Payload: {json.dumps(initial_inputs, indent=2)}")
     
     try:
-        final_state = app.invoke(initial_inputs)
+        final_state = app.invoke(initial_inputs, thread_config(session_id))
+        discard_completed(checkpointer, session_id, final_state)
         print("\n-------Workflow execution is complete------")
         
         print("\n Compliance Audit Report ==")
@@ -59,5 +68,67 @@ def run_cli_simulation():
         logger.error(f"Workflow execution failed : {str(e)}")
         raise e
     
+def run_batch(input_pattern, parallelism=4, output_path=None):
+    '''
+    Audits every video matched by input_pattern (directory, glob or manifest)
+    with bounded parallelism. Writes one NDJSON record per video as soon as it
+    finishes, then a summary record, to stdout or output_path.
+    '''
+    items = discover_videos(input_pattern)
+    if not items:
+        logger.error(f"No videos found for: {input_pattern}")
+        return None
+    logger.info(f"Starting batch audit of {len(items)} videos (parallelism {parallelism})")
+
+    def audit_item(item):
+        session_id = str(uuid.uuid4())
+        started = time.monotonic()
+        final_state = app.invoke({
+            "video_path": item.get("video_path"),
+            "video_url": item.get("video_url"),
+            "video_id": f"vid_{session_id[:8]}",
+            "compliance_results": [],
+            "errors": []
+        }, thread_config(session_id))
+        #failed videos keep their checkpoints, for resuming
+        discard_completed(checkpointer, session_id, final_state)
+        return session_id, final_state, time.monotonic() - started
+
+    summary = BatchSummary(total=len(items))
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    try:
+        #every in-flight video uploads and waits on Video Indexer concurrently
+        with ThreadPoolExecutor(max_workers=parallelism) as pool:
+            futures = {pool.submit(audit_item, item): index for index, item in enumerate(items)}
+            for future in as_completed(futures):
+                index = futures[future]
+                name = items[index].get("name") or os.path.basename(
+                    items[index].get("video_path") or redact_url(items[index].get("video_url"))
+                )
+                try:
+                    session_id, final_state, elapsed = future.result()
+                    record = result_record(index, name, session_id, final_state, elapsed)
+                except Exception as e:
+                    logger.error(f"Audit of {name} failed: {e}")
+                    record = error_record(index, name, str(e))
+                summary.add(record)
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+        out.write(json.dumps(summary.as_record()) + "\n")
+    finally:
+        if output_path:
+            out.close()
+    return summary.as_record()
+
+
 if __name__== "__main__":
-    run_cli_simulation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Brand Guardian compliance audit runner")
+    parser.add_argument("--input", help="video directory, glob (quote it) or manifest (.json/.jsonl, paths or URLs); omit for the demo run")
+    parser.add_argument("--parallel", type=int, default=4, help="videos audited at the same time")
+    parser.add_argument("--output", help="write NDJSON results here instead of stdout")
+    args = parser.parse_args()
+
+    if args.input:
+        run_batch(args.input, parallelism=args.parallel, output_path=args.output)
+    else:
+        run_cli_simulation()
\ No newline at end of file
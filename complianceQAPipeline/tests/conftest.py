@@ -0,0 +1,10 @@
+import os
+import sys
+
+#offline defaults, set before the backend modules read their configuration
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("WARMUP_CLIENTS", "false")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("RESULT_CACHE_BACKEND", "none")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import os
+import json
+
+from backend.src.graph.batch import BatchSummary, discover_videos, error_record, parse_manifest, result_record
+
+
+def test_parse_manifest_accepts_lists_and_ndjson():
+    listed = parse_manifest('["a.mp4", "https://example.com/b.mp4", {"video_path": "c.mov", "video_id": "c"}]')
+    assert listed == [
+        {"video_path": "a.mp4"},
+        {"video_url": "https://example.com/b.mp4"},
+        {"video_path": "c.mov", "video_id": "c"},
+    ]
+    lines = '"a.mp4"\n\n{"video_url": "https://example.com/b.mp4"}\n'
+    assert parse_manifest(lines) == [{"video_path": "a.mp4"}, {"video_url": "https://example.com/b.mp4"}]
+    assert parse_manifest("  \n") == []
+
+
+def test_discover_videos_from_directory_glob_and_manifest(tmp_path):
+    (tmp_path / "campaign" / "cuts").mkdir(parents=True)
+    for name in ("campaign/a.mp4", "campaign/cuts/b.MOV", "campaign/notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+
+    found = discover_videos(str(tmp_path / "campaign"))
+    assert [os.path.basename(item["video_path"]) for item in found] == ["a.mp4", "b.MOV"]
+
+    found = discover_videos(str(tmp_path / "campaign" / "*.mp4"))
+    assert [os.path.basename(item["video_path"]) for item in found] == ["a.mp4"]
+
+    manifest = tmp_path / "campaign" / "batch.jsonl"
+    manifest.write_text('"cuts/b.MOV"\n"https://example.com/c.mp4"\n')
+    assert discover_videos(str(manifest)) == [
+        {"video_path": str(tmp_path / "campaign" / "cuts" / "b.MOV")},
+        {"video_url": "https://example.com/c.mp4"},
+    ]
+
+
+def test_records_serialize_and_feed_the_summary():
+    final_state = {
+        "video_id": "vid_1",
+        "final_status": "FAIL",
+        "final_report": "Two issues.",
+        "compliance_results": [{"category": "Claims"}, {"category": "Disclosure"}],
+        "errors": [],
+    }
+    records = [
+        result_record(0, "a.mp4", "s1", final_state, 12.345),
+        result_record(1, "b.mp4", "s2", {"final_status": "PASS"}, 3.0),
+        error_record(2, "c.mp4", "Video Indexer timed out"),
+    ]
+    assert records[0]["elapsed_seconds"] == 12.35
+    assert records[1]["compliance_results"] == [] and records[1]["final_report"] == "No Report Generated."
+    #one NDJSON line per record
+    assert all("\n" not in json.dumps(record) for record in records)
+
+    summary = BatchSummary(total=4)
+    for record in records:
+        summary.add(record)
+    result = summary.as_record()
+    assert result["type"] == "summary"
+    assert (result["total"], result["completed"]) == (4, 3)
+    assert (result["passed"], result["failed"], result["errors"], result["issues"]) == (1, 1, 1, 2)
@@ -0,0 +1,119 @@
+import os
+import json
+
+import pytest
+from langchain_core.documents import Document
+
+from backend.src.services import cache, retrieval_cache
+from backend.src.services.cache import MemoryLRUCache, make_key, rulebook_version
+from backend.src.services.retrieval_cache import CachedRetriever, normalize_query
+
+
+class StubStore:
+    '''
+    Vector store that counts its searches and reloads
+    '''
+
+    def __init__(self):
+        self.searches = 0
+        self.refreshes = 0
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.searches += 1
+        return [Document(page_content=f"rule for {query}", metadata={"source": "rules.pdf"})]
+
+    def refresh(self):
+        self.refreshes += 1
+        return True
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    '''
+    Points the caches at a manifest in tmp_path; returns a writer that
+    bumps its mtime on every call
+    '''
+    path = tmp_path / "manifest.json"
+    monkeypatch.setattr(retrieval_cache, "INDEX_MANIFEST_PATH", str(path))
+    monkeypatch.setattr(cache, "load_index_manifest", lambda: json.loads(path.read_text()) if path.exists() else {})
+    monkeypatch.delenv("RULEBOOK_VERSION", raising=False)
+    writes = {"count": 0}
+
+    def write(version, files=None):
+        writes["count"] += 1
+        path.write_text(json.dumps({"version": version, "files": files or {}}))
+        os.utime(path, (1_000_000 + writes["count"], 1_000_000 + writes["count"]))
+
+    return write
+
+
+def test_make_key_is_stable_and_ignores_dict_order():
+    assert make_key("video", {"a": 1, "b": 2}) == make_key("video", {"b": 2, "a": 1})
+    assert make_key("video", 1) != make_key("video", "1")
+    assert make_key("video", "v1") != make_key("video", "v2")
+
+
+def test_rulebook_version_prefers_override_then_manifest(manifest, monkeypatch):
+    manifest("abc123")
+    assert rulebook_version() == "abc123"
+    monkeypatch.setenv("RULEBOOK_VERSION", "2024-q3")
+    assert rulebook_version() == "2024-q3"
+    assert rulebook_version(explicit=False) == "abc123"
+
+
+def test_memory_cache_evicts_least_recently_used():
+    lru = MemoryLRUCache("test", max_entries=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.stats.evictions == 1
+
+
+def test_normalized_queries_share_an_entry(manifest):
+    manifest("v1")
+    store = StubStore()
+    retriever = CachedRetriever(store)
+    retriever.similarity_search("Is a discount  CLAIM allowed?", k=3)
+    docs = retriever.similarity_search("is a discount claim allowed", k=3)
+    assert store.searches == 1
+    assert docs[0].page_content == "rule for Is a discount  CLAIM allowed?"
+    retriever.similarity_search("is a discount claim allowed", k=5)
+    assert store.searches == 2
+    assert normalize_query("  Ünïcode,  TEXT! ") == "ünïcode text"
+
+
+def test_new_index_version_refreshes_store_and_drops_entries(manifest):
+    manifest("v1")
+    store = StubStore()
+    retriever = CachedRetriever(store)
+    retriever.similarity_search("alcohol ads", k=3)
+    manifest("v2")
+    retriever.similarity_search("alcohol ads", k=3)
+    assert store.searches == 2
+    assert store.refreshes == 1
+    assert retriever.stats()["version"] == "v2"
+
+
+def test_manifest_rewrite_with_same_version_still_refreshes(manifest):
+    '''
+    A re-index saves the manifest after each file but only moves the
+    version at the end; the chunks are already different
+    '''
+    manifest("v1")
+    store = StubStore()
+    retriever = CachedRetriever(store)
+    retriever.similarity_search("alcohol ads", k=3)
+    manifest("v1", files={"rules.pdf": {"sha256": "new"}})
+    retriever.similarity_search("alcohol ads", k=3)
+    assert store.searches == 2
+    assert store.refreshes == 1
+
+
+def test_rulebook_override_does_not_key_retrieval(manifest, monkeypatch):
+    manifest("v1")
+    monkeypatch.setenv("RULEBOOK_VERSION", "pinned")
+    retriever = CachedRetriever(StubStore())
+    assert retriever.index_version() == "v1"
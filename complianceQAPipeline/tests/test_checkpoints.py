@@ -0,0 +1,131 @@
+import sqlite3
+
+import pytest
+
+from backend.src.graph import workflow
+from backend.src.graph.categories import enabled_categories
+from backend.src.graph.checkpoints import SQLCheckpointSaver, discard_completed, resume_point, thread_config
+
+
+INPUTS = {"video_path": "ad.mp4", "video_id": "vid_test", "compliance_results": [], "errors": []}
+
+
+@pytest.fixture
+def saver(tmp_path):
+    return SQLCheckpointSaver(lambda: sqlite3.connect(str(tmp_path / "checkpoints.sqlite3"), check_same_thread=False))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    '''
+    Replaces the indexer and the auditors with stubs that count their runs;
+    the first category's auditor fails (raises or records an error) while
+    calls["fail"] is set
+    '''
+    calls = {"indexer": 0, "fail": None}
+    failing = enabled_categories()[0]["key"]
+
+    def index(state, config=None):
+        calls["indexer"] += 1
+        if calls["fail"] == "indexer":
+            raise RuntimeError("indexer crashed")
+        return {"transcript": "My morning routine, coffee first.", "ocr_text": [], "video_metadata": {}}
+
+    async def aindex(state, config=None):
+        return index(state, config)
+
+    def make_auditor(category):
+        def auditor(state):
+            calls[category["key"]] = calls.get(category["key"], 0) + 1
+            if category["key"] == failing and calls["fail"] == "raise":
+                raise RuntimeError("auditor crashed")
+            if category["key"] == failing and calls["fail"] == "error":
+                return {"errors": [f"{category['name']}: LLM timed out"]}
+            return {"category_reports": [{"category": category["name"], "status": "PASS", "report": "ok"}]}
+        auditor.__name__ = f"{category['key']}_auditor_node"
+        return auditor
+
+    monkeypatch.setattr(workflow, "index_video_node", index)
+    monkeypatch.setattr(workflow, "aindex_video_node", aindex)
+    monkeypatch.setattr(workflow, "make_category_auditor", make_auditor)
+    calls["failing"] = failing
+    return calls
+
+
+def test_resume_after_crash_reruns_only_the_failed_node(saver, calls):
+    graph = workflow.create_graph(mode="fanout", checkpointer=saver)
+    calls["fail"] = "raise"
+    with pytest.raises(RuntimeError):
+        graph.invoke(INPUTS, thread_config("crashed"))
+
+    calls["fail"] = None
+    config = resume_point(graph, "crashed")
+    assert config is not None
+    final_state = graph.invoke(None, config)
+
+    assert final_state["final_status"] == "PASS"
+    assert calls["indexer"] == 1
+    assert calls[calls["failing"]] == 2
+    #the branches that finished before the crash are not audited again
+    for category in enabled_categories()[1:]:
+        assert calls[category["key"]] == 1
+
+
+def test_resume_after_recorded_error_skips_the_indexer(saver, calls):
+    graph = workflow.create_graph(mode="fanout", checkpointer=saver)
+    calls["fail"] = "error"
+    final_state = graph.invoke(INPUTS, thread_config("errored"))
+    assert final_state["errors"]
+
+    calls["fail"] = None
+    final_state = graph.invoke(None, resume_point(graph, "errored"))
+
+    assert not final_state["errors"]
+    assert final_state["final_status"] == "PASS"
+    assert calls["indexer"] == 1
+
+
+def test_run_interrupted_while_indexing_is_not_resumable(saver, calls):
+    graph = workflow.create_graph(mode="fanout", checkpointer=saver)
+    calls["fail"] = "indexer"
+    with pytest.raises(RuntimeError):
+        graph.invoke(INPUTS, thread_config("indexing"))
+
+    assert graph.get_state(thread_config("indexing")).next == ("indexer",)
+    assert resume_point(graph, "indexing") is None
+
+
+def test_discard_completed_keeps_failed_runs(saver, calls):
+    graph = workflow.create_graph(mode="fanout", checkpointer=saver)
+    for session_id, fail in (("clean", None), ("errored", "error")):
+        calls["fail"] = fail
+        final_state = graph.invoke(INPUTS, thread_config(session_id))
+        discard_completed(saver, session_id, final_state)
+
+    assert saver.get_tuple(thread_config("clean")) is None
+    assert resume_point(graph, "errored") is not None
+
+
+def test_failed_statement_is_rolled_back():
+    class Connection:
+        def __init__(self):
+            self.conn = sqlite3.connect(":memory:")
+            self.rollbacks = 0
+
+        def cursor(self):
+            return self.conn.cursor()
+
+        def commit(self):
+            self.conn.commit()
+
+        def rollback(self):
+            self.rollbacks += 1
+            self.conn.rollback()
+
+    connection = Connection()
+    saver = SQLCheckpointSaver(lambda: connection)
+    with pytest.raises(sqlite3.OperationalError):
+        saver._execute("SELECT * FROM missing_table")
+    assert connection.rollbacks == 1
+    #the connection is still usable
+    assert saver.get_tuple(thread_config("none")) is None
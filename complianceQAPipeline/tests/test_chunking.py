@@ -0,0 +1,37 @@
+from backend.src.graph.chunking import format_seconds, merge_issues, window_segments
+
+
+def test_window_segments_groups_by_start_and_drops_empty_windows():
+    transcript = [
+        {"text": "Hi everyone", "start": 2},
+        {"text": "this cream cures acne", "start": 58},
+        {"text": "link in bio", "start": 130},
+    ]
+    ocr = [{"text": "#ad", "start": 5}, {"text": "#ad", "start": 9}, {"text": "50% OFF", "start": 125}]
+    windows = window_segments(transcript, ocr, 60)
+
+    assert [(window["start"], window["end"]) for window in windows] == [(0, 60), (120, 180)]
+    assert windows[0]["transcript"] == "Hi everyone this cream cures acne"
+    #the same OCR line seen on consecutive frames is kept once
+    assert windows[0]["ocr_text"] == ["#ad"]
+    assert windows[1]["ocr_text"] == ["50% OFF"]
+
+
+def test_merge_issues_keeps_highest_severity_and_every_timestamp():
+    issues = [
+        {"category": "Claims", "description": "Cure claim.", "severity": "MEDIUM", "timestamp": "0:00:58"},
+        {"category": "claims", "description": "cure  claim", "severity": "CRITICAL", "timestamp": "0:01:10"},
+        {"category": "Claims", "description": "Cure claim", "severity": "LOW", "timestamp": "0:00:58"},
+        {"category": "Disclosure", "description": "No #ad", "severity": "LOW", "timestamp": None},
+    ]
+    merged = merge_issues(issues)
+
+    assert len(merged) == 2
+    assert merged[0]["severity"] == "CRITICAL"
+    assert merged[0]["timestamp"] == "0:00:58, 0:01:10"
+    assert merged[1]["timestamp"] is None
+
+
+def test_format_seconds():
+    assert format_seconds(0) == "0:00:00"
+    assert format_seconds(3725.9) == "1:02:05"
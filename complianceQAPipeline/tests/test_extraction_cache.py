@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+from backend.src.graph import nodes
+from backend.src.services.cache import MemoryLRUCache
+
+
+class StubVideoIndexer:
+    '''
+    Video Indexer stand-in that counts uploads
+    '''
+
+    uploads = 0
+
+    async def upload_video(self, video_path, video_name):
+        StubVideoIndexer.uploads += 1
+        return "azure-id"
+
+    async def wait_for_processing(self, video_id, on_progress=None, cancel_event=None):
+        return {}
+
+    def extract_data(self, vi_json):
+        return {"transcript": f"upload {StubVideoIndexer.uploads}", "ocr_text": [], "video_metadata": {}}
+
+    async def delete_video(self, video_id):
+        pass
+
+
+class StubTranscoder:
+    def __init__(self, profile, produces_proxy=True):
+        self.profile = profile
+        self.enabled = profile != "off"
+        self.produces_proxy = produces_proxy
+
+    def submit(self, source):
+        #the indexer deletes the proxy after the upload
+        proxy = None
+        if self.produces_proxy:
+            proxy = {"path": source + ".proxy", "profile": self.profile}
+            open(proxy["path"], "wb").close()
+        future = Future()
+        future.set_result(proxy)
+        return future
+
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    '''
+    Runs the indexer node on one video file under a given proxy setup
+    '''
+    video = tmp_path / "ad.mp4"
+    video.write_bytes(b"video bytes")
+    StubVideoIndexer.uploads = 0
+    monkeypatch.setattr(nodes, "extraction_cache", MemoryLRUCache("extraction"))
+    monkeypatch.setattr(nodes, "AsyncVideoIndexerService", StubVideoIndexer)
+
+    def run(transcoder):
+        monkeypatch.setattr(nodes, "proxy_transcoder", transcoder)
+        return asyncio.run(nodes.aindex_video_node({"video_path": str(video), "video_id": "vid"}))
+
+    return run
+
+
+def test_proxy_extraction_is_not_served_for_other_profiles(indexer):
+    assert indexer(StubTranscoder("480p"))["transcript"] == "upload 1"
+    assert indexer(StubTranscoder("480p"))["transcript"] == "upload 1"
+    assert indexer(StubTranscoder("off"))["transcript"] == "upload 2"
+    assert StubVideoIndexer.uploads == 2
+
+
+def test_original_extraction_serves_any_profile(indexer):
+    indexer(StubTranscoder("off"))
+    assert indexer(StubTranscoder("720p"))["transcript"] == "upload 1"
+    assert StubVideoIndexer.uploads == 1
+
+
+def test_skipped_proxy_is_cached_as_original(indexer):
+    indexer(StubTranscoder("720p", produces_proxy=False))
+    assert indexer(StubTranscoder("off"))["transcript"] == "upload 1"
+    assert StubVideoIndexer.uploads == 1
@@ -0,0 +1,98 @@
+import pytest
+
+from backend.src.graph import nodes
+from backend.src.graph.categories import CATEGORIES
+from backend.src.graph.chunking import format_seconds
+from backend.src.graph.fast_rules import RuleSet
+
+CLAIMS = next(category for category in CATEGORIES if category["key"] == "claims")
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return RuleSet.load()
+
+
+def decisions(rules, transcript, ocr_text=()):
+    return rules.screen({"transcript": transcript, "ocr_text": list(ocr_text)})["decisions"]
+
+
+@pytest.mark.parametrize("transcript", [
+    "This tea detoxes your liver and boosts immunity",
+    "Dermatologists recommend it, my skin is flawless now",
+    "I lost weight in a month and my energy is through the roof",
+    "Studies show this serum works better than retinol",
+    "Get 50% off today only",
+])
+def test_claim_wording_is_left_to_the_llm(rules, transcript):
+    assert decisions(rules, transcript)["claims"] is None
+
+
+def test_clip_without_claim_wording_passes_the_screen(rules):
+    assert decisions(rules, "Here is my morning routine, coffee first and then a walk with the dog.")["claims"] == "pass"
+
+
+def test_decisive_claim_fails(rules):
+    screen = rules.screen({"transcript_segments": [
+        {"start": 3.0, "text": "Honestly this is the best day"},
+        {"start": 12.5, "text": "It is guaranteed to clear your acne"},
+    ]})
+    assert screen["decisions"]["claims"] == "fail"
+    issue = screen["issues"]["claims"][0]
+    assert issue["category"] == CLAIMS["name"]
+    assert issue["timestamp"] == format_seconds(12.5)
+
+
+def test_discount_code_needs_a_disclosure(rules):
+    assert decisions(rules, "Use my code SAVE10 at checkout")["disclosure"] == "fail"
+    assert decisions(rules, "Use my code SAVE10 at checkout", ["#ad"])["disclosure"] is None
+
+
+def test_vague_disclosure_fails(rules):
+    assert decisions(rules, "Loving this new palette #spon")["disclosure"] == "fail"
+
+
+@pytest.mark.parametrize("mode, screened, expected", [
+    ("annotate", "pass", None),
+    ("annotate", "fail", None),
+    ("narrow", "pass", None),
+    ("narrow", "fail", None),
+    ("skip", "pass", "pass"),
+    ("skip", "fail", "fail"),
+])
+def test_only_skip_mode_skips_the_llm(monkeypatch, mode, screened, expected):
+    monkeypatch.setattr(nodes, "FAST_RULES_MODE", mode)
+    state = {"rule_screen": {"decisions": {"claims": screened}, "issues": {}}}
+    assert nodes._fast_path_decision(state, CLAIMS) == expected
+
+
+def test_annotate_mode_keeps_the_llm_verdict(monkeypatch, rules):
+    monkeypatch.setattr(nodes, "FAST_RULES_MODE", "annotate")
+    monkeypatch.setattr(nodes, "rule_set", rules)
+    monkeypatch.setattr(nodes, "_run_audit", lambda state, category=None: {
+        "compliance_results": [], "final_status": "PASS", "final_report": "Nothing found.",
+    })
+    state = {"transcript": "It is guaranteed to clear your acne"}
+    update = nodes.make_screener([CLAIMS])(state)
+    #rule findings are not issues in annotate mode, so they cannot duplicate the LLM's
+    assert "compliance_results" not in update
+
+    result = nodes.make_category_auditor(CLAIMS)({**state, **update})
+    report = result["category_reports"][0]
+    assert report["status"] == "PASS"
+    assert result["compliance_results"] == []
+    assert "claims.guaranteed_results" in report["report"]
+
+
+def test_narrow_mode_reports_rule_issues(monkeypatch, rules):
+    monkeypatch.setattr(nodes, "FAST_RULES_MODE", "narrow")
+    monkeypatch.setattr(nodes, "rule_set", rules)
+    monkeypatch.setattr(nodes, "_run_audit", lambda state, category=None: {
+        "compliance_results": [], "final_status": "PASS", "final_report": "Nothing else found.",
+    })
+    state = {"transcript": "It is guaranteed to clear your acne"}
+    update = nodes.make_screener([CLAIMS])(state)
+    assert len(update["compliance_results"]) == 1
+
+    result = nodes.make_category_auditor(CLAIMS)({**state, **update})
+    assert result["category_reports"][0]["status"] == "FAIL"
@@ -0,0 +1,108 @@
+import json
+import asyncio
+import threading
+
+import pytest
+
+from backend.src.api.events import EventStream, format_sse
+from backend.src.api.jobs import AuditJob, JobExistsError, JobManager, QueueFullError
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, max_queue_depth=2)
+    yield manager
+    manager.shutdown()
+
+
+def test_active_job_id_cannot_be_submitted_twice(manager):
+    release = threading.Event()
+    job = manager.submit(release.wait, job_id="session-1")
+    with pytest.raises(JobExistsError):
+        manager.submit(lambda: None, job_id="session-1")
+
+    release.set()
+    job.future.result(timeout=5)
+    assert job.status == AuditJob.COMPLETED
+    #a finished job can be resumed under the same id
+    again = manager.submit(lambda: "resumed", job_id="session-1")
+    assert again.future.result(timeout=5) == "resumed"
+
+
+def test_full_queue_rejects_new_jobs(manager):
+    release = threading.Event()
+    jobs = [manager.submit(release.wait) for _ in range(2)]
+    with pytest.raises(QueueFullError):
+        manager.submit(lambda: None)
+
+    release.set()
+    for job in jobs:
+        job.future.result(timeout=5)
+    assert manager.depth == 0
+
+
+def test_cancelled_queued_job_never_runs_and_drops_its_upload(manager, tmp_path):
+    release = threading.Event()
+    upload = tmp_path / "upload.mp4"
+    upload.write_bytes(b"video")
+    ran = []
+    running = manager.submit(release.wait)
+    queued = manager.submit(ran.append, "ran", temp_path=str(upload))
+
+    assert manager.cancel(queued.job_id) is queued
+    release.set()
+    running.future.result(timeout=5)
+
+    assert queued.status == AuditJob.CANCELLED
+    assert not ran
+    assert not upload.exists()
+    assert manager.cancel("unknown") is None
+
+
+def test_failed_job_publishes_a_final_status(manager):
+    def crash():
+        raise RuntimeError("indexer down")
+
+    job = manager.submit(crash)
+    with pytest.raises(RuntimeError):
+        job.future.result(timeout=5)
+
+    assert job.status == AuditJob.FAILED
+    assert job.events.closed
+
+    async def read():
+        return [entry async for entry in job.events.subscribe()]
+
+    events = asyncio.run(read())
+    assert [event for _, event, _ in events] == ["status", "status", "status"]
+    assert events[-1][2] == {"status": "FAILED", "error": "indexer down"}
+
+
+def test_subscribe_resumes_after_last_event_id():
+    stream = EventStream()
+    for node in ("indexer", "auditor_claims"):
+        stream.publish("node_start", {"node": node})
+
+    async def read(after):
+        entries = []
+        async for entry in stream.subscribe(after=after, heartbeat=0.01):
+            if entry is None:
+                #the heartbeat fired, nothing new is waiting: finish the stream
+                stream.publish("result", {"status": "PASS"}, final=True)
+                continue
+            entries.append(entry)
+        return entries
+
+    entries = asyncio.run(read(after=0))
+    assert [entry[0] for entry in entries] == [1, 2]
+    assert entries[-1][1] == "result"
+    #nothing is published after the final event
+    stream.publish("node_start", {"node": "late"})
+    assert asyncio.run(read(after=2)) == []
+
+
+def test_format_sse_frames():
+    frame = format_sse((3, "vi_progress", {"progress": 42.5}))
+    assert frame == 'id: 3\nevent: vi_progress\ndata: {"progress": 42.5}\n\n'
+    assert json.loads(frame.split("data: ", 1)[1]) == {"progress": 42.5}
+    assert format_sse(None) == ": keep-alive\n\n"
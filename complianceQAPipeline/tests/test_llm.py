@@ -0,0 +1,85 @@
+import time
+import threading
+from contextlib import closing
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from backend.src.services.llm import LLMClient
+
+PROMPT = [HumanMessage(content="audit this")]
+
+
+class StreamingChatModel(BaseChatModel):
+    '''
+    Streams a fixed answer word by word; no native batching
+    '''
+
+    words: list = ["{", "\"status\":", "\"PASS\"", "}", " trailing"]
+    delay_s: float = 0.01
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-test"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self.words)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        for word in self.words:
+            time.sleep(self.delay_s)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+def test_stream_streams_with_a_batch_window():
+    client = LLMClient(StreamingChatModel(), backend="test", batch_window_ms=5)
+    chunks = [chunk.content for chunk in client.stream(PROMPT) if chunk.content]
+    assert chunks == StreamingChatModel().words
+    assert client.stats.as_dict()["backend_calls"] == 1
+
+
+def test_concurrent_identical_streams_share_one_call():
+    model = StreamingChatModel(delay_s=0.05)
+    client = LLMClient(model, backend="test", batch_window_ms=5)
+    results = []
+
+    def run():
+        results.append("".join(chunk.content for chunk in client.stream(PROMPT)))
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    threads[0].start()
+    time.sleep(0.02)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert results == ["".join(model.words)] * 3
+    assert client.stats.as_dict()["coalesced"] == 2
+
+
+def test_waiting_caller_gets_text_up_to_early_close():
+    model = StreamingChatModel(delay_s=0.05)
+    client = LLMClient(model, backend="test", batch_window_ms=5)
+    shared = []
+
+    def follow():
+        shared.append("".join(chunk.content for chunk in client.stream(PROMPT)))
+
+    follower = threading.Thread(target=follow)
+    with closing(client.stream(PROMPT)) as stream:
+        for i, chunk in enumerate(stream):
+            if i == 0:
+                follower.start()
+                time.sleep(0.02)
+            if chunk.content == "}":
+                break
+    follower.join()
+
+    assert shared == ["{\"status\":\"PASS\"}"]
+    assert model.calls == 1
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from backend.src.graph.parsing import (
+    AuditOutputError,
+    JSONObjectExtractor,
+    extract_json_object,
+    repair_json,
+    validate_audit
+)
+
+AUDIT = {
+    "compliance_results": [{"category": "Claims", "severity": "high", "description": "Cure claim"}],
+    "status": "fail",
+    "final_report": "One issue."
+}
+
+
+def test_extractor_skips_fences_prose_and_braces_in_strings():
+    text = (
+        "Here is the audit {as requested}:\n```json\n"
+        '{"final_report": "uses {braces} and \\"quotes\\"", "status": "PASS", "compliance_results": []}'
+        "\n```\nLet me know {if} you need more."
+    )
+    assert extract_json_object(text)["final_report"] == 'uses {braces} and "quotes"'
+
+
+def test_extractor_completes_on_the_closing_brace_while_streaming():
+    text = json.dumps(AUDIT) + " trailing text"
+    extractor = JSONObjectExtractor()
+    fed = 0
+    for start in range(0, len(text), 7):
+        fed = start + 7
+        if extractor.feed(text[start:fed]):
+            break
+    assert json.loads(extractor.result) == AUDIT
+    #generation can stop before the trailing text arrives
+    assert fed < len(text)
+
+
+def test_extract_without_object_raises():
+    with pytest.raises(AuditOutputError):
+        extract_json_object("I could not audit this video.")
+
+
+@pytest.mark.parametrize("broken", [
+    '{"status": "PASS", "compliance_results": [],}',
+    '{"status": "PASS", "compliance_results": [{"category": "Claims", "severity": "LOW", "description": "cut off',
+    'Sure: {"status": "PASS", "final_report": "ok", "compliance_results": [',
+])
+def test_repair_fixes_trailing_commas_and_truncation(broken):
+    repaired = repair_json(broken)
+    assert repaired is not None
+    assert repaired["status"] == "PASS"
+
+
+def test_repair_gives_up_on_non_json():
+    assert repair_json("no json here") is None
+
+
+def test_validate_normalizes_severity_and_status():
+    audit = validate_audit(AUDIT)
+    assert audit["status"] == "FAIL"
+    assert audit["compliance_results"][0]["severity"] == "HIGH"
+    assert audit["compliance_results"][0]["timestamp"] is None
+
+
+def test_validate_lists_every_problem():
+    with pytest.raises(AuditOutputError) as error:
+        validate_audit({"compliance_results": [{"category": "Claims", "severity": "SEVERE"}], "status": "MAYBE"})
+    message = str(error.value)
+    assert "missing ['description']" in message
+    assert "status must be" in message
@@ -0,0 +1,28 @@
+import pytest
+
+from backend.src.services import vi_poller
+from backend.src.services.vi_poller import next_interval, parse_progress
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(vi_poller, "POLL_JITTER", 0)
+
+
+def test_parse_progress():
+    assert parse_progress({"videos": [{"processingProgress": "42%"}]}) == 42.0
+    assert parse_progress({"videos": [{"processingProgress": ""}]}) is None
+    assert parse_progress({"videos": [{"processingProgress": "soon"}]}) is None
+    assert parse_progress({}) is None
+
+
+def test_interval_follows_the_estimated_time_left():
+    #25% after 40s: ~120s left, checked again halfway through it
+    assert next_interval(5, 25, 40, max_interval=300) == 60
+    #almost done: back to the minimum interval
+    assert next_interval(30, 99, 300) == vi_poller.POLL_INITIAL_INTERVAL
+
+
+def test_interval_backs_off_without_progress_up_to_the_maximum():
+    assert next_interval(10, None, 30) == 10 * vi_poller.POLL_BACKOFF_FACTOR
+    assert next_interval(50, None, 300, max_interval=60) == 60
@@ -0,0 +1,58 @@
+import subprocess
+
+import pytest
+
+from backend.src.services import transcode
+from backend.src.services.transcode import PROFILES, ProxyTranscoder, build_ffmpeg_command
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcode, "PROXY_TEMP_DIR", str(tmp_path / "proxies"))
+    path = tmp_path / "master.mov"
+    path.write_bytes(b"x" * 1000)
+    return str(path)
+
+
+def fake_ffmpeg(monkeypatch, proxy_bytes=None, error=None):
+    def run(command, **kwargs):
+        if error is not None:
+            raise error
+        with open(command[-1], "wb") as f:
+            f.write(b"y" * proxy_bytes)
+    monkeypatch.setattr(transcode.subprocess, "run", run)
+
+
+def test_small_files_are_uploaded_as_they_are(source, monkeypatch):
+    fake_ffmpeg(monkeypatch, error=AssertionError("ffmpeg should not run"))
+    assert ProxyTranscoder("720p", min_bytes=10_000).transcode(source) is None
+
+
+def test_failed_transcode_falls_back_to_the_original(source, monkeypatch, tmp_path):
+    fake_ffmpeg(monkeypatch, error=subprocess.CalledProcessError(1, "ffmpeg", stderr=b"bad codec"))
+    assert ProxyTranscoder("720p", min_bytes=0).transcode(source) is None
+    assert not list((tmp_path / "proxies").iterdir())
+
+
+def test_proxy_that_saves_too_little_is_discarded(source, monkeypatch, tmp_path):
+    fake_ffmpeg(monkeypatch, proxy_bytes=950)
+    assert ProxyTranscoder("720p", min_bytes=0).transcode(source) is None
+    assert not list((tmp_path / "proxies").iterdir())
+
+
+def test_proxy_info(source, monkeypatch):
+    fake_ffmpeg(monkeypatch, proxy_bytes=200)
+    proxy = ProxyTranscoder("480p", min_bytes=0).transcode(source)
+    assert (proxy["profile"], proxy["source_bytes"], proxy["proxy_bytes"]) == ("480p", 1000, 200)
+
+
+def test_unknown_profile_disables_the_stage():
+    transcoder = ProxyTranscoder("4k")
+    assert not transcoder.enabled
+    assert transcoder.profile == "off"
+
+
+def test_ffmpeg_command_never_upscales():
+    command = build_ffmpeg_command("in.mov", "out.mp4", PROFILES["540p"])
+    assert "scale=-2:'min(540,ih)',fps=12" in command
+    assert command[-1] == "out.mp4"
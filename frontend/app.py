@@ -6,6 +6,53 @@ import os
 
 API_URL = "https://brand-guardian-api.grayriver-3197115b.centralindia.azurecontainerapps.io/audit"
 
+NODE_LABELS = {
+    "indexer": "Processing video in Azure Video Indexer",
+    "aggregator": "Writing the final report",
+}
+
+
+def iter_sse(response):
+    '''
+    Parses a Server-Sent Events response into (event, data) pairs
+    '''
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if event and data:
+                yield event, json.loads("\n".join(data))
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def render_issue(issue):
+    with st.container():
+        st.markdown(
+            f"""
+            **Category:** {issue['category']}  
+            **Severity:** {issue['severity']}  
+            **Description:** {issue['description']}
+            """
+        )
+        if issue.get("timestamp"):
+            st.caption(f"At {issue['timestamp']}")
+        st.markdown("---")
+
+
+def cancel_audit(job_id):
+    '''
+    Cancel button callback; it runs at the start of the rerun the click
+    triggers, after the streaming loop of the previous run was stopped
+    '''
+    requests.post(f"{API_URL}/{job_id}/cancel", timeout=30)
+    st.session_state["job_id"] = None
+    st.session_state["cancelled"] = True
+
 st.set_page_config(
     page_title="Brand Guardian AI",
     layout="wide"
@@ -42,27 +89,75 @@ if uploaded_file:
     with col2:
         st.subheader("Compliance Report")
 
+        if st.session_state.pop("cancelled", False):
+            st.warning("Audit cancelled.")
+
         if st.button("Run Audit"):
 
-            with st.spinner("Running compliance workflow..."):
-
-                try:
-                    files = {
-                        "file": (
-                            uploaded_file.name,
-                            open(temp_video_path, "rb"),
-                            uploaded_file.type
-                        )
-                    }
-
-                    response = requests.post(
-                        API_URL,
-                        files=files,
-                        timeout=600  # 10 minutes
+            try:
+                files = {
+                    "file": (
+                        uploaded_file.name,
+                        open(temp_video_path, "rb"),
+                        uploaded_file.type
                     )
-
-                    if response.status_code == 200:
-                        data = response.json()
+                }
+
+                # Queue the audit, then follow its progress events
+                response = requests.post(
+                    API_URL,
+                    params={"mode": "job"},
+                    files=files,
+                    timeout=600  # 10 minutes
+                )
+
+                if response.status_code == 202:
+                    job_id = response.json()["job_id"]
+                    st.session_state["job_id"] = job_id
+
+                    # Shown only while the events stream; clicking it stops this run
+                    cancel_slot = st.empty()
+                    cancel_slot.button("Cancel Audit", key="cancel_audit", on_click=cancel_audit, args=(job_id,))
+                    stage = st.empty()
+                    progress_bar = st.progress(0, text="Queued...")
+                    st.markdown("### ⚠ Compliance Issues")
+                    issues_box = st.container()
+                    data = None
+                    issue_count = 0
+
+                    with requests.get(f"{API_URL}/{job_id}/events", stream=True, timeout=(10, 600)) as events:
+                        for event, payload in iter_sse(events):
+                            if event == "node_start":
+                                node = payload["node"]
+                                label = NODE_LABELS.get(node, f"Auditing: {node.replace('auditor_', '')}")
+                                stage.info(f"{label}...")
+                            elif event == "vi_progress":
+                                progress_bar.progress(
+                                    min(int(payload["progress"]), 100),
+                                    text=f"Video Indexer: {payload['progress']:.0f}%"
+                                )
+                            elif event == "node_end" and payload["node"] == "indexer":
+                                progress_bar.progress(100, text="Video processed")
+                            elif event == "issues":
+                                # Partial results, shown as each auditor finishes
+                                with issues_box:
+                                    for issue in payload["issues"]:
+                                        render_issue(issue)
+                                issue_count += len(payload["issues"])
+                            elif event == "result":
+                                data = payload
+                            elif event == "status" and payload["status"] in ("FAILED", "CANCELLED"):
+                                stage.error(f"Audit {payload['status'].lower()}: {payload.get('error')}")
+
+                    # The stream ends with the job's terminal event
+                    st.session_state["job_id"] = None
+                    cancel_slot.empty()
+
+                    # A failed or cancelled run keeps its error in the stage slot
+                    if data:
+                        stage.empty()
+                        if not issue_count:
+                            issues_box.success("No compliance issues detected.")
 
                         st.success(f"Status: {data['status']}")
                         st.markdown("---")
@@ -70,32 +165,15 @@ if uploaded_file:
                         st.markdown("###Final Report")
                         st.write(data["final_report"])
 
-                        st.markdown("---")
-                        st.markdown("### ⚠ Compliance Issues")
-
-                        if data["compliance_results"]:
-                            for issue in data["compliance_results"]:
-                                with st.container():
-                                    st.markdown(
-                                        f"""
-                                        **Category:** {issue['category']}  
-                                        **Severity:** {issue['severity']}  
-                                        **Description:** {issue['description']}
-                                        """
-                                    )
-                                    st.markdown("---")
-                        else:
-                            st.success("No compliance issues detected.")
-
                         # Optional raw JSON
                         with st.expander("View Raw JSON"):
                             st.json(data)
 
-                    else:
-                        st.error(f"API Error: {response.text}")
+                else:
+                    st.error(f"API Error: {response.text}")
 
-                except Exception as e:
-                    st.error(f"Request Failed: {str(e)}")
+            except Exception as e:
+                st.error(f"Request Failed: {str(e)}")
 
     # Cleanup temp file
     if os.path.exists(temp_video_path):